@@ -3,9 +3,10 @@ import os
 import logging
 import argparse
 import glob
-from scripts.pdf_to_excel import ExportPDFToExcel
+from scripts.extraction_backends import get_backend
 from scripts.excel_to_data import process_excel_file
-from scripts.reshape_assets_excel import multiply_quantities
+from scripts.reshape_assets_excel import multiply_quantities, quantities_path
+from scripts.llm_ledger import CallLedger, ledger_scope, log_summary
 import shutil
 
 # Set up logging
@@ -31,13 +32,31 @@ def ensure_directories_exist():
     # Create final output directory
     os.makedirs('./final-output', exist_ok=True)
 
-def process_pdf(pdf_path, language='english'):
+def process_pdf(pdf_path, language='english', backend='adobe', max_workers=1, use_cache=True, taxonomy_top_k=None,
+                compact_tables=False, pack_small_sheets=False, max_sheet_tokens=None, escalation_threshold=None,
+                prefilter_sheets=False, local_extraction=False, reuse_header_roles=False,
+                stitch_continuations=False, fuzzy_consensus=False, resume=False, compact_quantities=False):
     """
     Process a single PDF file through the entire pipeline
     
     Args:
         pdf_path: Path to the PDF file
         language: Language to use for processing ('english' or 'nederlands')
+        backend: Table extraction backend ('adobe', 'textract' or 'azure')
+        max_workers: Number of sheets sent to the LLMs concurrently
+        use_cache: Whether to reuse cached LLM replies for unchanged tables
+        taxonomy_top_k: Only list the k best matching asset types in each prompt
+        compact_tables: Send compacted tables (no empty rows/columns) to the LLMs
+        pack_small_sheets: Send consecutive small sheets to the LLMs in one request
+        max_sheet_tokens: Split sheets above this estimated token count into chunks
+        escalation_threshold: Only ask Sonnet when GPT's confidence is below this threshold
+        prefilter_sheets: Skip sheets without asset terms instead of sending them to the LLMs
+        local_extraction: Parse well-formed asset register sheets without the LLMs
+        reuse_header_roles: Learn the column roles once per shared header row and parse those sheets locally
+        stitch_continuations: Merge tables that continue over several page sheets before extraction
+        fuzzy_consensus: Compare the GPT and Sonnet assets one by one and flag only the disagreements
+        resume: Skip the sheets that an earlier, interrupted run already finished
+        compact_quantities: Keep the (type, location, count) table as the final file instead of a row per asset
         
     Returns:
         Tuple of (success, output_path) where output_path is the path to the final Excel file
@@ -53,13 +72,12 @@ def process_pdf(pdf_path, language='english'):
         logger.info(f"Copied PDF to {input_pdf_path}")
         
         # Step 2: Convert PDF to Excel
-        processor = ExportPDFToExcel()
-        processor.process(
+        get_backend(backend).extract(
             file_name=file_nickname, 
             input_path='./output-batch-processing/1-FilteredManually/', 
             output_path='./output-batch-processing/2-ExportPDFToExcel/'
         )
-        logger.info(f"PDF converted to Excel successfully")
+        logger.info(f"PDF converted to Excel successfully with {backend} backend")
         
         # Step 3: Convert Excel to Data
         process_excel_file(
@@ -67,7 +85,20 @@ def process_pdf(pdf_path, language='english'):
             input_path='./output-batch-processing/2-ExportPDFToExcel/', 
             output_path='./output-batch-processing/3-ExcelToData/', 
             assets_known=True,
-            language=language
+            language=language,
+            max_workers=max_workers,
+            use_cache=use_cache,
+            taxonomy_top_k=taxonomy_top_k,
+            compact_tables=compact_tables,
+            pack_small_sheets=pack_small_sheets,
+            max_sheet_tokens=max_sheet_tokens,
+            escalation_threshold=escalation_threshold,
+            prefilter_sheets=prefilter_sheets,
+            local_extraction=local_extraction,
+            reuse_header_roles=reuse_header_roles,
+            stitch_continuations=stitch_continuations,
+            fuzzy_consensus=fuzzy_consensus,
+            resume=resume
         )
         logger.info(f"Excel processed to data successfully")
         
@@ -81,13 +112,15 @@ def process_pdf(pdf_path, language='english'):
         # Step 5: Multiply quantities
         multiply_quantities(
             file_name=file_nickname, 
-            folder_path='./output-batch-processing/'
+            folder_path='./output-batch-processing/',
+            compact=compact_quantities,
+            language=language
         )
         logger.info(f"Quantities multiplied successfully")
         
         # Copy the final output file to the final output directory
-        final_output_file = f'./output-batch-processing/5-MultipliedQuantities/{file_nickname}-assets-multiplied.xlsx'
-        final_destination = f'./final-output/{file_nickname}-final.xlsx'
+        final_output_file = quantities_path(file_nickname, './output-batch-processing/', compact=compact_quantities)
+        final_destination = f'./final-output/{file_nickname}-final{"-compact" if compact_quantities else ""}.xlsx'
         shutil.copy2(final_output_file, final_destination)
         logger.info(f"Final Excel file saved to: {final_destination}")
         
@@ -105,6 +138,36 @@ def main():
     parser.add_argument('--input-folder', required=True, help='Folder containing PDF files to process')
     parser.add_argument('--language', choices=['english', 'nederlands'], default='english', 
                         help='Language to use for processing')
+    parser.add_argument('--backend', choices=['adobe', 'textract', 'azure'], default='adobe',
+                        help='Table extraction backend to convert the PDFs with')
+    parser.add_argument('--max-workers', type=int, default=1,
+                        help='Number of sheets sent to the LLMs concurrently')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Send every table to the LLMs again instead of reusing cached replies')
+    parser.add_argument('--taxonomy-top-k', type=int, default=None,
+                        help='Only list the k asset types that best match each table in its prompt')
+    parser.add_argument('--compact-tables', action='store_true',
+                        help='Drop empty rows/columns and placeholder headers from the tables sent to the LLMs')
+    parser.add_argument('--pack-small-sheets', action='store_true',
+                        help='Send consecutive small sheets to the LLMs together in one request')
+    parser.add_argument('--max-sheet-tokens', type=int, default=None,
+                        help='Split sheets above this estimated token count into chunks that repeat the header')
+    parser.add_argument('--escalation-threshold', type=float, default=None,
+                        help='Ask GPT first and Sonnet only when GPT\'s confidence is below this threshold (e.g. 0.9)')
+    parser.add_argument('--prefilter-sheets', action='store_true',
+                        help='Skip sheets without any asset term instead of sending them to the LLMs')
+    parser.add_argument('--local-extraction', action='store_true',
+                        help='Parse well-formed asset register sheets locally instead of with the LLMs')
+    parser.add_argument('--reuse-header-roles', action='store_true',
+                        help='Learn the column roles once per header row shared by several sheets and parse them locally')
+    parser.add_argument('--stitch-continuations', action='store_true',
+                        help='Merge tables that continue over several page sheets before extraction')
+    parser.add_argument('--fuzzy-consensus', action='store_true',
+                        help='Compare the GPT and Sonnet assets one by one and only flag the ones they disagree on')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip the sheets that an earlier, interrupted run already finished')
+    parser.add_argument('--compact-quantities', action='store_true',
+                        help='Write one row per asset line with its count instead of one row per asset')
     args = parser.parse_args()
     
     # Ensure all necessary directories exist
@@ -118,6 +181,10 @@ def main():
         return
     
     logger.info(f"Found {len(pdf_files)} PDF files to process")
+
+    # One ledger of all LLM calls of this run
+    run_ledger = CallLedger()
+    run_ledger.open('./output-batch-processing/llm-ledger.jsonl')
     
     # Process each PDF file
     successful = 0
@@ -125,7 +192,26 @@ def main():
     output_files = []
     
     for pdf_file in pdf_files:
-        success, output_path = process_pdf(pdf_file, args.language)
+        with ledger_scope(run_ledger):
+            success, output_path = process_pdf(
+                pdf_file,
+                language=args.language,
+                backend=args.backend,
+                max_workers=args.max_workers,
+                use_cache=not args.no_cache,
+                taxonomy_top_k=args.taxonomy_top_k,
+                compact_tables=args.compact_tables,
+                pack_small_sheets=args.pack_small_sheets,
+                max_sheet_tokens=args.max_sheet_tokens,
+                escalation_threshold=args.escalation_threshold,
+                prefilter_sheets=args.prefilter_sheets,
+                local_extraction=args.local_extraction,
+                reuse_header_roles=args.reuse_header_roles,
+                stitch_continuations=args.stitch_continuations,
+                fuzzy_consensus=args.fuzzy_consensus,
+                resume=args.resume,
+                compact_quantities=args.compact_quantities
+            )
         if success:
             successful += 1
             output_files.append(output_path)
@@ -138,6 +224,7 @@ def main():
     logger.info("Output files:")
     for output_file in output_files:
         logger.info(f"  - {output_file}")
+    log_summary(run_ledger.records, "LLM calls of this run")
     logger.info("=" * 50)
 
 if __name__ == "__main__":
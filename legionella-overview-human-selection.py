@@ -285,7 +285,7 @@ if st.session_state.start_phase_b and not st.session_state.phase_b_completed:
         f.write(uploaded_excel.getvalue())
 
     ### Step 5 ### Multiply quantities
-    multiply_quantities(file_name=file_nickname, folder_path='./output-human-selection-pages/')
+    multiply_quantities(file_name=file_nickname, folder_path='./output-human-selection-pages/', language='nederlands')
     
     logging.info("Excel processed successfully!")
     st.success("Excel processed successfully! Download your multiplied quantities file below:")
@@ -0,0 +1,76 @@
+"""
+Local comparison of the asset lists of two models.
+
+The lists are matched as multisets: every asset of one list is paired with at
+most one asset of the other, best pairs first, on the fuzzy similarity of the
+asset type and location and on the count.
+"""
+import numpy as np
+
+from scripts.asset_records import parse_asset_count
+
+# Agreement from which two assets are taken to be the same; both the type and the
+# location must score this much
+MIN_AGREEMENT = 0.9
+
+
+def _normalized(assets, field):
+    from rapidfuzz import utils
+
+    # default_process turns punctuation into spaces; 'School - WC' and 'School WC' should read the same
+    return [' '.join(utils.default_process(str(asset.get(field, ""))).split()) for asset in assets]
+
+
+def agreement_matrix(assets, reference):
+    """
+    Pairwise agreement (0-1) of assets with the reference assets.
+
+    The agreement is the lower of the type and the location similarity, so a pair
+    differing in either field does not agree. Types are compared with RapidFuzz's
+    token_sort_ratio and locations with the plain ratio; WRatio's partial matching
+    would score 'Hot tap' and 'Cold tap', or two rooms of one building, as close.
+    The agreement is halved when the counts differ, so such a pair never agrees.
+    """
+    from rapidfuzz import fuzz, process
+
+    type_scores = process.cdist(_normalized(assets, "asset_type"), _normalized(reference, "asset_type"),
+                                scorer=fuzz.token_sort_ratio, processor=None)
+    location_scores = process.cdist(_normalized(assets, "asset_location"), _normalized(reference, "asset_location"),
+                                    scorer=fuzz.ratio, processor=None)
+    scores = np.minimum(type_scores, location_scores) / 100
+
+    counts = np.array([parse_asset_count(asset.get("asset_count")) for asset in assets])
+    reference_counts = np.array([parse_asset_count(asset.get("asset_count")) for asset in reference])
+    same_count = counts[:, None] == reference_counts[None, :]
+    return np.where(same_count, scores, scores / 2)
+
+
+def match_asset_lists(assets, reference):
+    """
+    Multiset match of assets against reference assets.
+
+    Returns:
+        Tuple of (agreement of each asset with the reference asset it is paired
+        with, 0 if it is not paired; indices of the reference assets that have no
+        pair of at least MIN_AGREEMENT)
+    """
+    if not assets or not reference:
+        return [0.0] * len(assets), list(range(len(reference)))
+
+    scores = agreement_matrix(assets, reference)
+    agreement = [0.0] * len(assets)
+    pairs, paired_reference = {}, set()
+
+    # Greedy on the best pairs first; the lists of one sheet are short
+    for flat in np.argsort(-scores, axis=None, kind='stable'):
+        i, j = divmod(int(flat), scores.shape[1])
+        if i in pairs or j in paired_reference:
+            continue
+        agreement[i] = float(scores[i, j])
+        pairs[i] = j
+        paired_reference.add(j)
+        if len(pairs) == min(scores.shape):
+            break
+
+    agreeing = {j for i, j in pairs.items() if agreement[i] >= MIN_AGREEMENT}
+    return agreement, [j for j in range(len(reference)) if j not in agreeing]
@@ -0,0 +1,102 @@
+"""
+Column-wise accumulation of asset rows.
+
+Building a DataFrame by concatenating one-row DataFrames copies every earlier
+row on each append. AssetRecords collects plain per-column lists instead and
+builds the DataFrame once.
+"""
+import re
+
+import pandas as pd
+
+# Column order of the assets data and human review files
+REVIEW_COLUMNS = ['asset_count', 'asset_type', 'asset_location', 'sheet_name', 'flag']
+
+# Counts as the models write them: '6', '6.0', '6x', 'x6'
+_COUNT = re.compile(r'^\s*[x×]?\s*(-?\d+(?:\.\d+)?)\s*[x×]?\s*$', re.IGNORECASE)
+
+
+def parse_asset_count(value):
+    """A single asset count as parse_asset_counts does it, for short lists where pandas costs more than it saves."""
+    match = _COUNT.match(str(value))
+    return float(match.group(1)) if match else float('nan')
+
+
+def clean_asset_count(value):
+    """
+    A count as written to the review file: the parsed integer for a whole count
+    ('6x' -> 6, '2.0' -> 2), the value unchanged otherwise.
+
+    Later stages only read plain numbers, so '6x' left as is would be dropped
+    when the quantities are multiplied.
+    """
+    parsed = parse_asset_count(value)
+    return int(parsed) if parsed == parsed and parsed.is_integer() else value
+
+
+def is_whole_count(value):
+    """Whether a count parses to a whole number."""
+    parsed = parse_asset_count(value)
+    return parsed == parsed and parsed.is_integer()
+
+
+def parse_asset_counts(values):
+    """
+    Numeric asset counts, parsed in one vectorized pass.
+
+    Args:
+        values: iterable of counts as numbers or strings, e.g. 6, '6', '6.0', '6x'
+
+    Returns:
+        Series: float counts, NaN where a value is not a count
+    """
+    text = pd.Series(list(values), dtype=object).astype(str)
+    return pd.to_numeric(text.str.extract(_COUNT, expand=False), errors='coerce')
+
+
+class AssetRecords:
+    """
+    Asset rows kept as one list per column.
+
+    Appending is amortized constant time, so building n rows is linear;
+    to_dataframe materializes them once in the fixed column order.
+    """
+
+    __slots__ = ('columns', '_data')
+
+    def __init__(self, columns=REVIEW_COLUMNS):
+        self.columns = list(columns)
+        self._data = {column: [] for column in self.columns}
+
+    def __len__(self):
+        return len(self._data[self.columns[0]])
+
+    def append(self, **values):
+        """Add one row; missing columns are left empty. Counts are cleaned with clean_asset_count."""
+        for column in self.columns:
+            value = values.get(column, "")
+            self._data[column].append(clean_asset_count(value) if column == 'asset_count' and value != "" else value)
+
+    def extend(self, assets, **shared):
+        """
+        Add a row per asset.
+
+        Args:
+            assets (list): asset dicts as the models return them; every column not
+                given in shared must be a key of each asset
+            **shared: values for every row, e.g. sheet_name and flag
+        """
+        for column in self.columns:
+            if column in shared:
+                self._data[column].extend([shared[column]] * len(assets))
+            elif column == 'asset_count':
+                self._data[column].extend(clean_asset_count(asset[column]) for asset in assets)
+            else:
+                self._data[column].extend(asset[column] for asset in assets)
+
+    def counts(self):
+        """Parsed asset_count of every row, see parse_asset_counts."""
+        return parse_asset_counts(self._data['asset_count'])
+
+    def to_dataframe(self):
+        return pd.DataFrame(self._data, columns=self.columns)
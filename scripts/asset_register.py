@@ -0,0 +1,188 @@
+"""
+Local extraction of well-formed asset register tables.
+
+An asset register has one row per asset with explicit type, location and
+(optionally) count columns. Such tables are parsed here without an LLM; any
+table that does not fit the pattern is left to the LLM extraction.
+"""
+import re
+
+import pandas as pd
+
+from scripts.asset_taxonomy import get_taxonomy_index
+
+# Normalized location headers and their scope, biggest first. Several location
+# columns are combined from the biggest scope to the smallest, as the prompts ask.
+LOCATION_SCOPES = {
+    'building': 0, 'block': 0, 'gebouw': 0,
+    'floor': 1, 'level': 1, 'verdieping': 1, 'bouwlaag': 1,
+    'area': 2,
+    'location': 3, 'asset location': 3, 'room': 3, 'room name': 3, 'locatie': 3, 'ruimte': 3,
+}
+
+# Normalized header texts of each column role
+HEADER_ROLES = {
+    'asset_type': {
+        'asset', 'asset type', 'asset description', 'type of asset', 'type of outlet', 'outlet type', 'outlet',
+        'type tappunt', 'tappunt', 'soort tappunt', 'asset omschrijving',
+    },
+    'asset_location': set(LOCATION_SCOPES),
+    'asset_count': {
+        'count', 'qty', 'quantity', 'number of outlets', 'no of outlets', 'aantal',
+    },
+}
+
+# Headers that label a quantity in some registers and a row or reference number in
+# others; a table with one is left to the LLMs
+AMBIGUOUS_HEADERS = {'no', 'no.', 'nr', 'nr.', 'number', 'ref', 'ref.', 'item'}
+
+# Rows about supplies are left out by the prompts; a register that has them goes to the LLM
+_SUPPLY = re.compile(r'\b(supply|supplies|toevoer|voeding)\b', re.IGNORECASE)
+_COUNT = re.compile(r'^x?\s*(\d+)\s*x?$', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_header(column):
+    return _WHITESPACE.sub(' ', str(column)).strip().strip(':').lower()
+
+
+def detect_column_roles(columns):
+    """
+    Map the headers of a table to asset_type, asset_location and asset_count.
+
+    Returns:
+        dict: role to column (asset_location to a list of columns ordered by
+        LOCATION_SCOPES, asset_count to a column or None), or None if there is not
+        exactly one type column and at least one location column, or a header is in
+        AMBIGUOUS_HEADERS
+    """
+    roles = {'asset_type': [], 'asset_location': [], 'asset_count': []}
+    for column in columns:
+        header = normalize_header(column)
+        if header in AMBIGUOUS_HEADERS:
+            return None
+        for role, headers in HEADER_ROLES.items():
+            if header in headers:
+                roles[role].append(column)
+
+    if len(roles['asset_type']) != 1 or not roles['asset_location'] or len(roles['asset_count']) > 1:
+        return None
+
+    return {
+        'asset_type': roles['asset_type'][0],
+        'asset_location': sorted(roles['asset_location'], key=lambda column: LOCATION_SCOPES[normalize_header(column)]),
+        'asset_count': roles['asset_count'][0] if roles['asset_count'] else None,
+    }
+
+
+def parse_count(value):
+    """Asset count of a cell ('6', 6.0, '6x', 'x6'), 1 when empty, or None when not a count."""
+    if pd.isna(value) or str(value).strip() == '':
+        return 1
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    match = _COUNT.match(str(value).strip())
+    return int(match.group(1)) if match else None
+
+
+def normalize_asset_type(asset_type, language='english', score_cutoff=90):
+    """The closest taxonomy asset type if it matches well enough, otherwise the type as written."""
+    match = get_taxonomy_index(language).best_match(asset_type, score_cutoff=score_cutoff)
+    return match if match is not None else asset_type
+
+
+def looks_like_numbering(values, min_rows=3):
+    """Whether a column's counts rise strictly from row to row, as row or reference numbers do."""
+    counts = [parse_count(value) for value in values if not pd.isna(value) and str(value).strip()]
+    if len(counts) < min_rows or None in counts:
+        return False
+    return all(a < b for a, b in zip(counts, counts[1:]))
+
+
+def parse_with_roles(df, roles, language='english'):
+    """
+    Assets of a table whose column roles are known.
+
+    Returns:
+        list: assets in the reply format of the LLMs ({"asset_type", "asset_location",
+        "asset_count"} strings), or None if a row does not fit the register pattern
+        or the count column looks like a row numbering
+    """
+    if roles['asset_count'] is not None and looks_like_numbering(df[roles['asset_count']]):
+        return None
+
+    assets = []
+    for row in df.itertuples(index=False):
+        row = dict(zip(df.columns, row))
+        asset_type = row[roles['asset_type']]
+        locations = [str(row[column]).strip() for column in roles['asset_location']
+                     if not pd.isna(row[column]) and str(row[column]).strip()]
+        count = parse_count(row[roles['asset_count']]) if roles['asset_count'] is not None else 1
+
+        if pd.isna(asset_type) or not str(asset_type).strip():
+            if not locations:
+                continue  # Empty row
+            return None
+        asset_type = str(asset_type).strip()
+        if not locations or count is None or _SUPPLY.search(asset_type):
+            return None
+        if count == 0:
+            continue
+
+        assets.append({
+            'asset_type': normalize_asset_type(asset_type, language),
+            'asset_location': ' - '.join(locations),
+            'asset_count': str(count),
+        })
+    return assets
+
+
+def extract_register_assets(df, language='english'):
+    """
+    Assets of a well-formed asset register table, parsed locally.
+
+    Returns:
+        list: assets as parse_with_roles, or None if the table is not a clean register
+        and should go to the LLMs
+    """
+    roles = detect_column_roles(df.columns)
+    if roles is None:
+        return None
+    assets = parse_with_roles(df, roles, language)
+    return assets or None
+
+
+def header_signature(columns):
+    """
+    Normalized header row of a table, shared by the per-page sheets of one register.
+
+    Returns:
+        tuple: normalized headers ('' for Adobe's 'Unnamed: N'), or None if the table
+        has no named header
+    """
+    signature = tuple('' if str(column).startswith('Unnamed:') else normalize_header(column) for column in columns)
+    return signature if any(signature) else None
+
+
+def roles_from_reply(assets, columns):
+    """
+    Column roles from a reply to the column roles prompt, in which the asset fields
+    hold column names instead of values.
+
+    Returns:
+        dict: roles as detect_column_roles, or None if the reply does not name
+        existing columns
+    """
+    if not assets or len(assets) != 1 or not isinstance(assets[0], dict):
+        return None
+
+    by_name = {str(column).strip(): column for column in columns}
+    reply = assets[0]
+    asset_type = by_name.get(str(reply.get('asset_type', '')).strip())
+    locations = [by_name.get(name.strip()) for name in str(reply.get('asset_location', '')).split('|') if name.strip()]
+    count_name = str(reply.get('asset_count') or '').strip()
+    asset_count = by_name.get(count_name) if count_name else None
+
+    if asset_type is None or not locations or None in locations or (count_name and asset_count is None):
+        return None
+    return {'asset_type': asset_type, 'asset_location': locations, 'asset_count': asset_count}
@@ -0,0 +1,910 @@
+"""
+Asset types of the legionella asset register.
+
+These are the asset types listed in the extraction prompts, in English and in
+Dutch, kept in the order in which the prompts present them.
+"""
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+ASSET_TYPES_ENGLISH = [
+    "Above Ground Grease Separator",
+    "Alternative techniques",
+    "Anodic oxidation",
+    "Asset Register",
+    "Au bain marie",
+    "Autoclave",
+    "Automatic CV degasser",
+    "Automatic filling unit",
+    "Automatic flush valve",
+    "Automatic flushing device",
+    "Automatic solenoid",
+    "Automatic sprinkler system",
+    "Backwash filter",
+    "Balancing valve",
+    "Bar tap",
+    "Baseboard integrated heater",
+    "Basket strainer",
+    "Bath mixer",
+    "Bath thermostatic mixer",
+    "Bath/shower combination mixer",
+    "Bath/shower combination thermostatic mixer",
+    "Bedpan washer",
+    "Beer tap installation with tank cleaning installation",
+    "Bib tap",
+    "Bidet",
+    "Bleed solenoid valve",
+    "Blending valve",
+    "Blowdown valve",
+    "Boiling kettle",
+    "Boiling water heater",
+    "Boiling water tap",
+    "Boot cleaner",
+    "Borewell",
+    "Breaktank",
+    "Brominator",
+    "Buffer vessel",
+    "Buffer vessel with heater",
+    "Buffer vessel with hot and cold storage",
+    "Buffer vessel with plate heat exchanger",
+    "Butler sink",
+    "Bypass (cold water)",
+    "Calorifier",
+    "Canister demineralised water",
+    "Chemical dosing pump",
+    "Chemical dosing unit",
+    "Chemical stock tank",
+    "Chemical toilet",
+    "Chemical water treatment",
+    "Chilled water dispenser",
+    "Chiller",
+    "Coffee machine",
+    "Cold water storage tank",
+    "Combi boiler",
+    "Combi steamer",
+    "Combi water heater",
+    "Condenser bleed tank",
+    "Condenser pump",
+    "Condenser pump strainer",
+    "Conductivity meter",
+    "config.components.Flexibletapconnector.name",
+    "config.components.ldtestcoolingtowerdefault.name",
+    "Cooling tower",
+    "Cooling tower drain",
+    "Copper-silver ionisation",
+    "Crushed ice machine",
+    "Cyclone",
+    "Dead end (drinking water)",
+    "Dead end (hot water)",
+    "Deadleg",
+    "Degasser",
+    "Demineralised water",
+    "Dental chair",
+    "Direct gas fired heater",
+    "Dishwasher",
+    "Dosing pump",
+    "Drain",
+    "Drain valve",
+    "Drift eliminator",
+    "Drinking bowl",
+    "Drinking water circulation pump",
+    "Drinks Dispenser",
+    "Duplicate pump set",
+    "Electric shower",
+    "Electric water heater",
+    "Emergency eye wash",
+    "Emergency eye wash & shower",
+    "Emergency shower",
+    "Evaporative condenser",
+    "Expansion Automats",
+    "Expansion vessel",
+    "Fan",
+    "Fill pack",
+    "Filling loop tap",
+    "Filling loop tap > 45kW",
+    "Fine filter",
+    "Fire",
+    "Fire fighting system",
+    "Fire hose reel",
+    "Firehydrant",
+    "Foot washbasin",
+    "Fountain tap",
+    "Fumehood",
+    "Gas water heater",
+    "Glass rinser",
+    "Glass Rinser (Beer)",
+    "Grease Separator Sludge Separator",
+    "Hairdresser shower",
+    "Hand shower",
+    "Hand washbasin",
+    "Heat Exchange Coils",
+    "Heat pump",
+    "Heating boiler",
+    "Height adjustable bath",
+    "High pressure cleaner",
+    "High pressure cleaner",
+    "Hose tap",
+    "Hose Union Bib Tap",
+    "Hot drinks machine",
+    "Hot Water Circulation Pump",
+    "Humidifier",
+    "Ice cream dipper well",
+    "Ice machine",
+    "Ice maker",
+    "Incoming mains",
+    "Incubator",
+    "Indirect fired heater",
+    "Indirect fired heater with heater",
+    "Indirect fired heater with hot and cold storage",
+    "Indirect fired heater with plate heat exchanger",
+    "Indirect fired heater with solar thermal collectors",
+    "Industrial dishwasher",
+    "Industrial washing machine",
+    "Inline strainer",
+    "Instantaneous water heater",
+    "Instantaneous water heater (tankless)",
+    "Intermediate meter",
+    "Intermediate valve",
+    "Intermediate water meter",
+    "Kitchen spray outlet",
+    "Kitchen tap",
+    "Kitchen tap thermostatic",
+    "Knee wash basin",
+    "Laboratory mixer tap",
+    "Laboratory tap",
+    "Legionella Filter",
+    "Level Signaler",
+    "Low pressure mixer",
+    "Main valve",
+    "Make-up tank",
+    "Manual Quick Fill",
+    "Micro thermostatic mixer",
+    "Micron filter",
+    "Milk Frother",
+    "Mixer tap",
+    "Mixer valve",
+    "Multifunctional (smart) faucet",
+    "Open well",
+    "Other - Air conditioning system",
+    "Other - Industrial process water system",
+    "Other - Spa/Pool/Jacuzzi",
+    "Other - Water feature",
+    "Outlet",
+    "Outlet connection",
+    "Oven spray",
+    "Over Sink Heater",
+    "Ozone generator",
+    "pH meter",
+    "Pipework",
+    "Plate heat exchanger with heater",
+    "Plate heat exchanger with hot and cold storage",
+    "Plate heat exchanger with solar thermal collectors",
+    "Plate heat exchanger without buffer vessel",
+    "Point of use water heater",
+    "Pool fill/supplement",
+    "Post-mix installation",
+    "Pre-rinse/wash spray tap",
+    "Pressure booster with pressure vessel",
+    "Pressure booster with pressureless reservoir",
+    "Pressure booster with switch vessel",
+    "Pressure booster with switch vessel and variable rotation-frequency",
+    "Pressure booster without switch vessel and variable rotation-frequency",
+    "Pressure regulating valve",
+    "Pressurisation units for closed systems",
+    "Principal return loop",
+    "Process water",
+    "Public drinking water outlet",
+    "Quooker",
+    "Rain water harvesting system",
+    "Rain water harvesting tank",
+    "Reduced Pressure Zone Valve",
+    "Return pipe",
+    "Reverse osmosis",
+    "Roasting pan",
+    "Sample point",
+    "Sand filter",
+    "Scale inhibitor",
+    "Secondary Return Loop",
+    "Sensor Outlet",
+    "Separated fire hose reel installation",
+    "Shower",
+    "Shower mixer",
+    "Shower mixer thermostatic",
+    "Shower panel",
+    "Sink",
+    "Sink (thermostatic)",
+    "Sink with knee operation",
+    "Slop hopper",
+    "Sludge Separator",
+    "Soap Dispenser",
+    "Soup machine",
+    "Spray reel",
+    "Sprinkler",
+    "Stabilized Aqueous Ozone Generator",
+    "Star tap",
+    "Steamer",
+    "Subordinate return loop",
+    "Sump circulation pump",
+    "Tap",
+    "TapApplianceType.Bath",
+    "TapApplianceType.SprayOutlet",
+    "Tea point",
+    "Terrain Pipe",
+    "Tertiary Return Loop",
+    "Thermostatic mixer valve",
+    "Thermostatic mixing tap",
+    "Toilet",
+    "Ultrafiltration",
+    "Under rinse tap",
+    "Under Sink Heater",
+    "Underground Grease Separator",
+    "Underground water storage tank",
+    "Urinal",
+    "Utility sink",
+    "UV light",
+    "Valve",
+    "Veg Prep Sink",
+    "Wall Mounted Breaktank",
+    "Washbasin",
+    "Washbasin mixer",
+    "Washbasin mixer thermostatic",
+    "Washing machine",
+    "Washing through",
+    "Water booster",
+    "Water booster - Double pump set",
+    "Water booster - Quadruple pump set",
+    "Water booster - Single pump set",
+    "Water booster - Triple pump set",
+    "Water cooler",
+    "Water distribution system",
+    "Water filter",
+    "Water heater",
+    "Water heaters",
+    "Water Meter",
+    "Water softener",
+    "Water source",
+    "Water treatment",
+]
+
+ASSET_TYPES_NEDERLANDS = [
+    "Leveringspunt",
+    "Drukverhoger met schakelvat",
+    "Drukverhoger met schakelvat en variabele rotatie-frequentie",
+    "Drukverhoger zonder schakelvat en variabele rotatie-frequentie",
+    "Drukverhoger met druk(voorraad)ketel",
+    "Drukverhoger met drukloos hoogreservoir",
+    "Dubbele pompset",
+    "Waterreservoir",
+    "Ontharder",
+    "Omgekeerde osmose",
+    "Gedemineraliseerd water",
+    "Gede-mineraliseerd water",
+    "Overig",
+    "Doseerpomp",
+    "Ultrafiltratie",
+    "UV-licht",
+    "Koper-zilver ionisatie",
+    "Anodische oxidatie",
+    "Koeltoren",
+    "Combinatieboiler",
+    "Voorraadvat",
+    "Platenwisselaar met ketel",
+    "Platen-wisselaar met ketel",
+    "Platenwisselaar met zonnecollector",
+    "Platen-wisselaar met zonnecollector",
+    "Platenwisselaar met WKO",
+    "Platen-wisselaar met WKO",
+    "Warmtepomp",
+    "Direct gestookte boiler",
+    "Elektrische boiler",
+    "Close-in boiler",
+    "Close-up boiler",
+    "Indirect gestookte boiler",
+    "Indirect gestookte boiler met ketel",
+    "Indirect gestookte boiler met zonnecollector",
+    "Indirect gestookte boiler met platenwisselaar",
+    "Indirect gestookte boiler met platen-wisselaar",
+    "Indirect gestookte boiler met WKO",
+    "Voorraadvat met platenwisselaar",
+    "Voorraadvat met platen-wisselaar",
+    "Voorraadvat met doorstroomtoestel",
+    "Voorraadvat met doorstroom-toestel",
+    "Voorraadvat met WKO",
+    "Doorstroomtoestel",
+    "Doorstroom-toestel",
+    "Geiser",
+    "Gasboiler",
+    "Combiketel",
+    "Platenwisselaar zonder voorraadvat",
+    "Platen-wisselaar zonder voorraadvat",
+    "Warmwaterbereider",
+    "Warmwater-bereider",
+    "Plintboiler",
+    "Kokendwater-boiler",
+    "Enkelvoudig circulatiesysteem",
+    "Enkelvoudig circulatie-systeem",
+    "Meervoudig circulatiesysteem",
+    "Meervoudig circulatie-systeem",
+    "Deelcirculatieleiding",
+    "Deelcirculatie-leiding",
+    "Meervoudige uittapleiding (warmwater)",
+    "Mengwatersysteem",
+    "Mengwater-systeem",
+    "Circulerend mengwatersysteem",
+    "Circulerend mengwater-systeem",
+    "Drinkwaterringnet",
+    "Enkelvoudige uittapleiding (warmwater)",
+    "Hoofdleiding (warmwater)",
+    "Hoofdleiding (drinkwater)",
+    "Brandslanghaspel",
+    "Terreinleiding met brandkranen",
+    "Automatische sprinklerinstallatie",
+    "Automatische sprinkler-installatie",
+    "Gescheiden brandslanghaspel installatie",
+    "Gescheiden brandslang-haspel installatie",
+    "Sprinkler",
+    "Enkelvoudige uittapleiding (drinkwater)",
+    "Meervoudige uittapleiding (drinkwater)",
+    "Suppletieleiding (drinkwater)",
+    "Suppletie-leiding (drinkwater)",
+    "Bypass (drinkwater)",
+    "Verdeler (drinkwater)",
+    "Dode leiding (drinkwater)",
+    "Bad (mengkraan)",
+    "Bedpanspoeler",
+    "Bad (thermostatische mengkraan)",
+    "Bidet",
+    "CV-vulkraan",
+    "Aanrecht (mengkraan)",
+    "Aanrecht mengkraan",
+    "Aanrecht (thermostatische mengkraan)",
+    "Vaatwasser",
+    "Nooddouche",
+    "Oogdouche",
+    "Tappunt",
+    "Fontein",
+    "Gevelkraan",
+    "Handdouche",
+    "Slangwartelkraan",
+    "IJsmachine",
+    "Mengkraan",
+    "Mengventiel",
+    "Douche",
+    "Wastafel",
+    "Slophopper",
+    "Uitstortgootsteen",
+    "Spuithaspel",
+    "Knijpdouche",
+    "Stoombevochtiger",
+    "Toilet",
+    "Urinoir",
+    "Wasmachine",
+    "Suppletie koeling",
+    "Suppletie bevochtiger",
+    "Suppletie naar leidinggroep",
+    "Suppletie proceswater",
+    "Keukenmengkraan",
+    "Hoog/laagbad",
+    "Aansluiting",
+    "Koffieautomaat",
+    "Douchemengkraan thermostatisch",
+    "Tapkraan",
+    "Voetenwasbak",
+    "Wastrog",
+    "Douchemengkraan",
+    "Labkraan",
+    "Labmengkraan",
+    "Waterkoeler",
+    "Hogedrukreiniger",
+    "Reduceerventiel",
+    "Dode leiding (warmwater)",
+    "Bypass (warmwater)",
+    "Suppletieleiding (warmwater)",
+    "Suppletie-leiding (warmwater)",
+    "Inregelventiel",
+    "Sensorkraan",
+    "Lagedrukmengkraan",
+    "Steamer",
+    "Industriële vaatwasser",
+    "CV-vulkraan >45kW",
+    "Kappersdouche",
+    "Kappers-douche",
+    "Luchtbevochtiger",
+    "Lucht-bevochtiger",
+    "Onderspoelkraan",
+    "Onder-spoelkraan",
+    "Glazenspoeler",
+    "Industriële wasmachine",
+    "Zuurkast",
+    "Nood- & oogdouche",
+    "Au bain-marie",
+    "Zeepdoseersysteem",
+    "Zeepdoseer-systeem",
+    "Automatische spuiklep",
+    "Quooker",
+    "Soepautomaat",
+    "Drankautomaat",
+    "Drank-automaat",
+    "Grof filter",
+    "Fijn filter",
+    "Hoofdafsluiter",
+    "Tussenafsluiter",
+    "Tussen-afsluiter",
+    "Douchepaneel",
+    "Niveausignalering",
+    "Niveau-signalering",
+    "Geleidbaarheidsmeter",
+    "Geleidbaar-heidsmeter",
+    "Spuiklep",
+    "Circulatiepomp drinkwater",
+    "Circulatie-pomp drinkwater",
+    "Tussenwatermeter",
+    "Brandkraan",
+    "Kniewasbak",
+    "Automatische spoelinrichting",
+    "Break unit",
+    "tapApplianceType.Break+unit.button.label",
+    "Terugspoelfilter",
+    "Terugspoel-filter",
+    "Wasbak met kniebediening",
+    "Handwasbak",
+    "Zwembad vul/suppletie",
+    "Warme drankenmachine",
+    "Tandartsstoel",
+    "Postmix installatie",
+    "Laarzen reinigingstoestel",
+    "Patroon Demiwater",
+    "Pannenvulpunt",
+    "Wastafelmengkraan",
+    "Wastafel-mengkraan",
+    "Crushedijs machine",
+    "IJsblokjes machine",
+    "Combi-steamer",
+    "Kookketel",
+    "Braadslede",
+    "Thermostatisch mengventiel",
+    "Mengventiel thermo.",
+    "Expansieautomaat",
+    "Expansie-automaat",
+    "Tussenmeter",
+    "Toevoer koud",
+    "Toevoer warm",
+    "Toevoerleiding",
+    "Retourleiding",
+    "Voedingsleiding",
+    "Legionellafilter",
+    "Legionella-filter",
+    "Ontgasser",
+    "Wastafel-mengkraan thermo",
+    "Wastafel-mengkraan thermo.",
+    "Keuken mengkraan thermo",
+    "Keuken-mengkraan thermo.",
+    "Micro thermostatisch mengtoestel",
+    "Autoclaaf medisch sterilisatie instrument",
+    "Autoclaaf",
+    "Drinknippel(vee)",
+    "Drinknippel (vee)",
+    "Spoelkop(Bier)",
+    "Spoelkop (Bier)",
+    "Biertapinstallatie met fusten-reinigingsinstallatie",
+    "Biertapinstallatie met fusten – reinigingsinstallatie",
+    "Biertapinstallatie met tankreinigingsinstallatie",
+    "Biertapinstallatie met tankreiniging installatie",
+    "Automatische CV ontgasser",
+    "Chemisch toilet",
+    "Barkraan",
+    "Afsluiter",
+    "Drinkbak",
+    "--NIET SELECTEREN-- Waterreservoir",
+    "Automatische CV vulstation",
+    "Automatisch CV vulstation",
+    "Openbaar drinkwatertappunt",
+    "Aftapper",
+    "Automatisch C.V.-vulsysteem/ ontgasser",
+    "Barspoelkraan",
+    "Drankenautomaat",
+    "Bidet/toilet met randspoeling en onderdouche",
+    "Bidet / toilet met randspoeling en onderdouche",
+    "Kokendwaterkraan",
+    "Hose Union Bib Tap",
+    "Melkopschuimer",
+    "Melk Opschuimer",
+    "Heetwaterafsluiter (fail-safe)",
+    "Douchemengkraan thermostatisch met handdouche en regendouche",
+    "Bad/douche combinatie (mengkraan)",
+    "Bad/douche combinatie (thermostatische mengkraan)",
+    "Breaktank",
+    "Break tank",
+    "--NIET SELECTEREN-- Koudwaterreservoir (UK)",
+    "Voorspoeldouche",
+    "Dode leiding",
+    "Vulpunt CV - automatisch",
+    "Verwarmingsboiler",
+    "Ovenspray",
+    "Expansievat",
+    "Brandveiligheidssysteem",
+    "Chemische waterbehandeling",
+    "Waterkoelers",
+    "Theepunt",
+    "Water heater",
+    "Groentewastafel",
+    "Elektrische douche",
+    "Drukverhoger - Enkele pompset",
+    "Drukverhoger - dubbele pompset",
+    "Drukverhoger - Drievoudige pompset",
+    "Drukverhoger - Viervoudige pompset",
+    "Koelwaterbassin",
+    "Druppelafscheider",
+    "Vulpakket",
+    "Brominator",
+    "Chemische doseerinstallatie",
+    "Ozongenerator",
+    "Incubator",
+    "Afvoer koeltoren",
+    "Waterdistributiesysteem",
+    "Hydrocycloon",
+    "Zandfilter",
+    "Suppletietank",
+    "Aftap condensatorpomp",
+    "Filter condensatorpomp",
+    "Condensatorpomp",
+    "Bassincirculatiepomp",
+    "Koeler (tegenstroomapparaat)",
+    "Ventilator",
+    "Monsternamepunt",
+    "Aftap afsluiter",
+    "Voorraadvat chemicaliën",
+    "Chemicaliëndoseerpomp",
+    "Automatische ontluchtingsklep",
+    "Magneetklep",
+    "Verdampingscondensator",
+    "Andere - Airconditioningsysteem",
+    "Anders - Wellness/Zwembad/Jacuzzi",
+    "Anders - Industrieel proceswatersysteem",
+    "Inline-filter",
+    "Korffilter",
+    "Boorput",
+    "Open put",
+    "Warmtewisselaars",
+    "pH-meter",
+    "Proceswater",
+    "Anders - Fontein",
+    "Sediment filter",
+    "Elektrolytische ontkalker",
+    "Waterfilter",
+    "IJslepelbakje",
+    "Multifunctionele (slimme) kraan",
+    "Reinwaterkelder",
+    "Opvangsysteem voor regenwater",
+    "Opvangtank voor regenwater",
+    "Directe waterverwarmer",
+    "Tertiaire retour-lus",
+    "Secundaire retour-lus",
+    "Handmatig snel vullen",
+    "Verminderde Drukventiel",
+    "Bovengrondse vetafscheider",
+    "Bovengrondse vetsplitter",
+    "Ondergrondse vetafscheider",
+    "Ondergrondse vetsplitter",
+    "Vetafscheider Slipafscheider",
+    "Slibafscheider",
+    "Warm water circulatiepomp",
+    "Terrein leiding",
+    "Muur gemonteerde Breaktank",
+    "Gestabiliseerde Aqueous Ozongenerator",
+    "Sproei tappunt",
+    "TapApplianceType.SprayOutlet.Button.Label",
+    "TapApplianceType.Bath",
+    "TapApplianceType.Bath.Button.Label",
+    "Enkelvoudige Uittapleiding (Mengwater)",
+    "Meervoudige uittapleiding (mengwater)",
+    "Verdeelleiding",
+    "Sluice",
+    "Blusleiding",
+    "Steam boiler",
+    "Hoge druk tappunt",
+    "Lage druk tappunt",
+    "Indirect verwarmd voorraadvat met warmtepomp",
+    "Warmtepomp boiler",
+    "Douchemengkraan met handdouche en regendouche",
+    "Waseenheid",
+    "Gekoeld watersysteem",
+    "Laag temperatuur warmwater",
+    "Run-around warmtewisselaars",
+    "Condenser systeem",
+    "Medium temperatuur warmwater",
+    "Hoog temperatuur warmwater",
+    "Voeding en expansievat",
+    "Hoofdtank",
+    "Waterspeeltoestel",
+    "Water speel toestel",
+    "Bubbelbuis",
+    "Sensor apparaat",
+    "Drukventiel",
+    "Wastafel met handwasunit",
+    "Aanrecht met handwasunit",
+    "Aanrecht",
+]
+
+ASSET_TYPES = {
+    'english': ASSET_TYPES_ENGLISH,
+    'nederlands': ASSET_TYPES_NEDERLANDS,
+}
+
+
+class TaxonomyIndex:
+    """
+    Fuzzy retrieval index over the asset types of one language.
+
+    The asset types are normalized once; top_k then scores every asset type
+    against the terms of a table with RapidFuzz and keeps the best candidates, so
+    a prompt only needs to carry the asset types that are plausibly in the table.
+    """
+
+    def __init__(self, asset_types):
+        from rapidfuzz import utils
+
+        self.asset_types = list(asset_types)
+        self.normalized = [utils.default_process(asset_type) for asset_type in self.asset_types]
+
+    def scores(self, terms):
+        """Best WRatio score (0-100) of each asset type over the given terms."""
+        import numpy as np
+        from rapidfuzz import fuzz, process, utils
+
+        terms = [term for term in (utils.default_process(str(term)) for term in terms) if term]
+        if not terms:
+            return np.zeros(len(self.asset_types))
+
+        matrix = process.cdist(terms, self.normalized, scorer=fuzz.WRatio, processor=None, workers=-1)
+        return matrix.max(axis=0)
+
+    def top_k(self, terms, k):
+        """
+        The k asset types that best match the terms.
+
+        Returns:
+            list: asset types in taxonomy order, so prompts stay stable for the cache
+        """
+        import numpy as np
+
+        if k >= len(self.asset_types):
+            return list(self.asset_types)
+
+        best = np.argsort(-self.scores(terms), kind='stable')[:k]
+        return [self.asset_types[i] for i in sorted(best)]
+
+    def best_match(self, term, score_cutoff=90):
+        """
+        The asset type closest to term, or None if none scores score_cutoff.
+
+        Uses the plain edit-distance ratio rather than WRatio, so a short type like
+        'Tap' is not mapped onto a longer type that contains it ('Bar tap').
+        """
+        from rapidfuzz import fuzz, process, utils
+
+        match = process.extractOne(utils.default_process(str(term)), self.normalized, scorer=fuzz.ratio,
+                                   processor=None, score_cutoff=score_cutoff)
+        return self.asset_types[match[2]] if match else None
+
+
+@lru_cache(maxsize=None)
+def get_taxonomy_index(language):
+    """TaxonomyIndex of a language, built once per process."""
+    return TaxonomyIndex(ASSET_TYPES[language])
+
+
+# Abbreviations and everyday names of the surveyors, with the taxonomy type they stand for
+ASSET_ALIASES = {
+    'english': {
+        'whb': 'Hand washbasin', 'wash hand basin': 'Hand washbasin', 'hand wash basin': 'Hand washbasin',
+        'hand basin': 'Hand washbasin', 'wash basin': 'Washbasin', 'basin': 'Washbasin',
+        'wc': 'Toilet', 'water closet': 'Toilet', 'cwst': 'Cold water storage tank',
+        'cold water tank': 'Cold water storage tank', 'tmv': 'Thermostatic mixer valve',
+        'thermostatic mixing valve': 'Thermostatic mixer valve', 'pou': 'Point of use water heater',
+        'pou heater': 'Point of use water heater', 'point of use heater': 'Point of use water heater',
+        'dead leg': 'Deadleg', 'eye wash': 'Emergency eye wash', 'eyewash station': 'Emergency eye wash',
+        'hose reel': 'Fire hose reel', 'mixer': 'Mixer tap', 'sink mixer': 'Mixer tap',
+    },
+    'nederlands': {
+        'wc': 'Toilet', 'closet': 'Toilet', 'kraan': 'Tappunt', 'douchekop': 'Handdouche',
+        'dode leg': 'Dode leiding', 'doodlopende leiding': 'Dode leiding',
+    },
+}
+
+# Type ID of a value that matches no taxonomy type
+UNKNOWN_TYPE_ID = -1
+
+_PARENTHETICAL = re.compile(r'\([^)]*\)')
+
+
+class CanonicalTypeIndex:
+    """
+    Maps free-text asset types onto the taxonomy of one language.
+
+    A type's ID is its position in the taxonomy list. A value is looked up by its
+    normalized, space-free form among the taxonomy names and ASSET_ALIASES, then
+    without a parenthetical ('Sink (mixer)') and in the singular; the values that
+    are still unknown are scored against all names in one RapidFuzz cdist. Every
+    distinct value is resolved once per process, so a batch costs a dict lookup
+    per row once the common spellings have been seen.
+    """
+
+    def __init__(self, asset_types, aliases=None, score_cutoff=85):
+        self.asset_types = list(asset_types)
+        self.score_cutoff = score_cutoff
+        self.memo = {}
+
+        # Normalized taxonomy names and aliases; a taxonomy name wins over an alias that normalizes the same
+        names = {}
+        for type_id, asset_type in enumerate(self.asset_types):
+            names.setdefault(self._normalize(asset_type), type_id)
+        for alias, asset_type in (aliases or {}).items():
+            names.setdefault(self._normalize(alias), self.asset_types.index(asset_type))
+
+        self.exact = {}
+        for name, type_id in names.items():
+            self.exact.setdefault(name.replace(' ', ''), type_id)
+        self.choices = list(names)
+        self.choice_ids = list(names.values())
+
+    @staticmethod
+    def _normalize(value):
+        from rapidfuzz import utils
+
+        return ' '.join(utils.default_process(str(value)).split())
+
+    def _exact_id(self, value):
+        for form in (str(value), _PARENTHETICAL.sub(' ', str(value))):
+            key = self._normalize(form).replace(' ', '')
+            for candidate in (key, key[:-1] if key.endswith('s') else None):
+                if candidate and candidate in self.exact:
+                    return self.exact[candidate]
+        return None
+
+    def ids(self, values):
+        """
+        Type IDs of the values, UNKNOWN_TYPE_ID for empty values and values without a match.
+
+        Returns:
+            numpy.ndarray: int64 array aligned with values
+        """
+        import numpy as np
+        from rapidfuzz import fuzz, process
+
+        codes, uniques = pd.factorize(pd.Series(list(values), dtype=object))
+        unique_ids = np.full(len(uniques), UNKNOWN_TYPE_ID, dtype=np.int64)
+
+        unresolved = []
+        for i, value in enumerate(uniques):
+            if value in self.memo:
+                unique_ids[i] = self.memo[value]
+                continue
+            type_id = self._exact_id(value)
+            if type_id is None:
+                unresolved.append(i)
+            else:
+                unique_ids[i] = self.memo[value] = type_id
+
+        queries = [self._normalize(_PARENTHETICAL.sub(' ', str(uniques[i]))) for i in unresolved]
+        if queries:
+            scores = process.cdist(queries, self.choices, scorer=fuzz.ratio, processor=None, workers=-1)
+            best = scores.argmax(axis=1)
+            for i, choice, score in zip(unresolved, best, scores[np.arange(len(queries)), best]):
+                type_id = self.choice_ids[choice] if score >= self.score_cutoff else UNKNOWN_TYPE_ID
+                unique_ids[i] = self.memo[uniques[i]] = type_id
+
+        # pd.factorize codes empty values as -1
+        return np.where(codes >= 0, unique_ids[codes], UNKNOWN_TYPE_ID)
+
+    def name(self, type_id):
+        """Taxonomy name of a type ID, '' for UNKNOWN_TYPE_ID."""
+        return self.asset_types[type_id] if type_id != UNKNOWN_TYPE_ID else ''
+
+    def canonical_columns(self, asset_types):
+        """asset_type_id and asset_type_canonical columns for a Series of asset types."""
+        ids = self.ids(asset_types)
+        return pd.DataFrame({
+            'asset_type_id': ids,
+            'asset_type_canonical': [self.name(type_id) for type_id in ids],
+        }, index=asset_types.index)
+
+
+@lru_cache(maxsize=None)
+def get_canonical_index(language):
+    """CanonicalTypeIndex of a language, built once per process."""
+    return CanonicalTypeIndex(ASSET_TYPES[language], ASSET_ALIASES.get(language))
+
+
+def table_terms(df):
+    """Distinct non-empty cell values and headers of a table, the terms to retrieve asset types with."""
+    terms = {str(column) for column in df.columns if not str(column).startswith('Unnamed:')}
+    terms.update(str(value) for value in df.to_numpy().ravel() if not pd.isna(value))
+    return sorted(term for term in terms if term.strip())
+
+
+# Everyday names of assets that the taxonomy spells out differently
+ASSET_SYNONYMS = {
+    'english': [
+        "basin", "calorifier", "cistern", "cylinder", "cwst", "dead end", "dead leg", "drinking fountain",
+        "eye wash", "hand basin", "hose", "hydrant", "ice machine", "mixer", "outlet", "pou", "point of use",
+        "shower", "sink", "sluice", "spray", "tap", "tmv", "toilet", "urinal", "vending", "wc", "whb",
+        # Short terms only match as whole words, so their plurals are listed
+        "baths", "hoses", "pipes", "pumps", "sinks", "tanks", "taps", "tmvs", "wcs", "whbs",
+    ],
+    'nederlands': [
+        "buitenkraan", "closet", "doodlopende leiding", "dode leiding", "douche", "expansievat", "geiser",
+        "gootsteen", "keerklep", "kraan", "kranen", "mengkraan", "pompen", "spoelbak", "tappunt",
+        "thermostaatkraan", "urinoir", "wastafel",
+    ],
+}
+
+# Taxonomy words that also turn up in contact details, survey dates and risk scoring
+GENERIC_WORDS = {
+    'above', 'adjustable', 'alternative', 'and', 'aqueous', 'asset', 'automatic', 'closed', 'cold', 'combination',
+    'components', 'config', 'connection', 'device', 'direct', 'double', 'end', 'fine', 'for', 'frequency',
+    'ground', 'height', 'high', 'hot', 'indirect', 'industrial', 'installation', 'integrated', 'intermediate',
+    'ldtestcoolingtowerdefault', 'legionella', 'level', 'light', 'low', 'machine', 'main', 'mains', 'make',
+    'manual', 'micro', 'name', 'open', 'operation', 'other', 'over', 'pack', 'point', 'post', 'pre', 'pressure',
+    'principal', 'process', 'public', 'quick', 'reduced', 'register', 'return', 'sample', 'secondary', 'set',
+    'single', 'smart', 'source', 'star', 'subordinate', 'system', 'systems', 'tapappliancetype', 'techniques',
+    'tertiary', 'through', 'under', 'unit', 'units', 'use', 'utility', 'variable', 'water', 'with', 'without',
+    'zone',
+    # Asset words that are also everyday words ('as well as', 'emergency contact', 'bar chart') or that start
+    # unrelated words ('breakfast', 'chairman'); the asset types keep a more specific word
+    'air', 'bar', 'break', 'chair', 'emergency', 'eye', 'fire', 'gas', 'hand', 'heat', 'scale', 'spa', 'stock',
+    'union', 'wall', 'well',
+    'andere', 'anders', 'apparaat', 'around', 'automatisch', 'automatische', 'button', 'close', 'combinatie',
+    'directe', 'drievoudige', 'druk', 'dubbele', 'enkele', 'enkelvoudig', 'enkelvoudige', 'fail', 'fijn',
+    'gede', 'gescheiden', 'gestabiliseerde', 'grof', 'heidsmeter', 'hoge', 'hoog', 'industrieel', 'industriële',
+    'installatie', 'instrument', 'koud', 'laag', 'label', 'lage', 'licht', 'medisch', 'medium', 'meervoudig',
+    'meervoudige', 'met', 'mineraliseerd', 'naar', 'niet', 'niveau', 'onder', 'openbaar', 'overig', 'run',
+    'safe', 'secundaire', 'selecteren', 'snel', 'systeem', 'temperatuur', 'tertiaire', 'toestel', 'tussen',
+    'variabele', 'verminderde', 'viervoudige', 'voor', 'warm', 'warme', 'zonder',
+    # Dutch counterparts: 'bad' and 'put' are also English words, 'leiding' also means management ('leidinggevende')
+    'bad', 'leiding', 'nood', 'put', 'vee', 'vul',
+}
+
+
+class AssetTermMatcher:
+    """
+    Screens tables for asset vocabulary with one precompiled pattern.
+
+    The vocabulary is every distinctive word of the English and Dutch taxonomy
+    plus ASSET_SYNONYMS. Terms of at least MIN_PREFIX_LENGTH characters match at
+    the start of a word, so plurals and Dutch compounds that start with an asset
+    word (e.g. 'douchemengkraan') are found; shorter terms only match as whole
+    words, so 'vul' does not match 'vulnerable' nor 'tea' 'team'.
+    """
+
+    MIN_PREFIX_LENGTH = 5
+
+    def __init__(self, terms):
+        self.terms = sorted(set(terms), key=lambda term: (-len(term), term))
+        prefixes = [re.escape(term) for term in self.terms if len(term) >= self.MIN_PREFIX_LENGTH]
+        words = [re.escape(term) for term in self.terms if len(term) < self.MIN_PREFIX_LENGTH]
+        self.pattern = re.compile(r'\b(?:' + '|'.join(prefixes) + r'|(?:' + '|'.join(words) + r')\b)', re.IGNORECASE)
+
+    def find(self, text):
+        """Distinct asset terms in text, lowercased."""
+        return sorted({match.lower() for match in self.pattern.findall(text)})
+
+    def matches_table(self, df):
+        """Whether a table's headers or cells contain any asset term."""
+        return any(self.pattern.search(term) for term in table_terms(df))
+
+
+def asset_vocabulary():
+    """Distinctive words of both taxonomies and their synonyms."""
+    words = {word for asset_types in ASSET_TYPES.values() for asset_type in asset_types
+             for word in re.findall(r'[^\W\d_]{3,}', asset_type.lower())}
+    words.update(synonym for synonyms in ASSET_SYNONYMS.values() for synonym in synonyms)
+    return sorted(words - GENERIC_WORDS)
+
+
+@lru_cache(maxsize=None)
+def get_asset_term_matcher():
+    """AssetTermMatcher over both languages, built once per process."""
+    return AssetTermMatcher(asset_vocabulary())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Latency/cost benchmark of the table extraction backends.
+
+Live runs are recorded once into a fixtures folder:
+
+    {fixtures}/{backend}/{file_name}-pdf-extract.xlsx   the workbook the backend wrote
+    {fixtures}/{backend}/{file_name}.json               pages and measured latency
+
+The benchmark itself replays those recordings, so it costs nothing and can be
+rerun to compare backends per page on latency, throughput, cost and yield.
+The backends convert a document in one call, so only the document latency is
+recorded; the per-page latency is that total divided by the document's pages.
+
+    python -m scripts.benchmark_backends --record adobe --input-folder ./pdfs
+    python -m scripts.benchmark_backends --fixtures ./benchmark-fixtures
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+from scripts.extraction_backends import ExtractionBackend, get_backend, run_backend, workbook_path, COST_PER_PAGE
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class RecordedBackend(ExtractionBackend):
+    """Replays a workbook recorded from a live backend run."""
+
+    def __init__(self, name, fixtures_dir):
+        self.name = name
+        self.fixtures_dir = os.path.join(fixtures_dir, name)
+
+    def recording(self, file_name):
+        with open(os.path.join(self.fixtures_dir, f'{file_name}.json')) as f:
+            return json.load(f)
+
+    def extract(self, file_name, input_path, output_path):
+        os.makedirs(output_path, exist_ok=True)
+        output_file = workbook_path(output_path, file_name)
+        shutil.copy2(workbook_path(self.fixtures_dir, file_name), output_file)
+        return output_file
+
+
+def record(backend_name, input_folder, fixtures_dir):
+    """Run a live backend on every PDF in input_folder and store the recordings."""
+    backend = get_backend(backend_name)
+    backend_dir = os.path.join(fixtures_dir, backend_name)
+    os.makedirs(backend_dir, exist_ok=True)
+
+    for pdf_path in sorted(glob.glob(os.path.join(input_folder, '*.pdf'))):
+        file_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_path = os.path.join(tmp_dir, '')
+            shutil.copy2(pdf_path, f'{input_path}{file_name}-filtered-pages.pdf')
+            try:
+                result = run_backend(backend, file_name, input_path, input_path)
+            except Exception as e:
+                logger.error(f"Recording {backend_name} on {pdf_path} failed: {str(e)}")
+                continue
+            shutil.copy2(result['output_file'], workbook_path(backend_dir, file_name))
+
+        with open(os.path.join(backend_dir, f'{file_name}.json'), 'w') as f:
+            json.dump({'pages': result['pages'], 'latency_s': result['latency_s']}, f, indent=2)
+        logger.info(f"Recorded {backend_name} on {file_name}: {result['pages']} pages in {result['latency_s']:.1f}s")
+
+
+def workbook_yield(workbook_file):
+    """Number of sheets and of non-empty cells, a rough proxy for extraction coverage."""
+    sheets = pd.read_excel(workbook_file, sheet_name=None)
+    cells = sum(int(df.notna().sum().sum()) + len(df.columns) for df in sheets.values())
+    return len(sheets), cells
+
+
+def benchmark(fixtures_dir):
+    """
+    Compare every recorded backend on every recorded document.
+
+    Each recording is replayed through RecordedBackend.extract and the yield is
+    measured on the replayed workbook. latency_per_page_s is the document's
+    latency divided by its pages, an average rather than a page-level timing, and
+    the p50/max per-page latencies of the summary are taken over documents.
+
+    Returns:
+        Tuple of (per-document results, per-backend summary) DataFrames
+    """
+    rows = []
+    for backend_dir in sorted(glob.glob(os.path.join(fixtures_dir, '*', ''))):
+        backend = RecordedBackend(os.path.basename(os.path.dirname(backend_dir)), fixtures_dir)
+        for recording_file in sorted(glob.glob(os.path.join(backend_dir, '*.json'))):
+            file_name = os.path.splitext(os.path.basename(recording_file))[0]
+            recording = backend.recording(file_name)
+            pages, latency = recording['pages'], recording['latency_s']
+            with tempfile.TemporaryDirectory() as output_path:
+                sheets, cells = workbook_yield(backend.extract(file_name, None, output_path))
+            rows.append({
+                'backend': backend.name,
+                'file_name': file_name,
+                'pages': pages,
+                'latency_s': latency,
+                'latency_per_page_s': latency / pages if pages else 0.0,
+                'pages_per_s': pages / latency if latency > 0 else 0.0,
+                'cost_usd': pages * COST_PER_PAGE.get(backend.name, 0.0),
+                'sheets': sheets,
+                'cells': cells,
+            })
+
+    results = pd.DataFrame(rows)
+    if results.empty:
+        return results, results
+
+    summary = results.groupby('backend').agg(
+        documents=('file_name', 'count'),
+        pages=('pages', 'sum'),
+        latency_s=('latency_s', 'sum'),
+        p50_latency_per_page_s=('latency_per_page_s', 'median'),
+        max_latency_per_page_s=('latency_per_page_s', 'max'),
+        cost_usd=('cost_usd', 'sum'),
+        cells=('cells', 'sum'),
+    )
+    summary['pages_per_s'] = summary['pages'] / summary['latency_s']
+    summary['cost_per_page_usd'] = summary['cost_usd'] / summary['pages']
+    return results, summary.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the table extraction backends')
+    parser.add_argument('--fixtures', default='./benchmark-fixtures', help='Folder with recorded backend runs')
+    parser.add_argument('--record', choices=['adobe', 'textract', 'azure'],
+                        help='Record a live run of this backend instead of benchmarking')
+    parser.add_argument('--input-folder', help='Folder containing PDF files to record')
+    parser.add_argument('--output', default='./benchmark-fixtures/benchmark-results.xlsx',
+                        help='Excel file to write the results to')
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.input_folder:
+            parser.error('--record requires --input-folder')
+        record(args.record, args.input_folder, args.fixtures)
+        return
+
+    results, summary = benchmark(args.fixtures)
+    if results.empty:
+        logger.error(f"No recordings found in {args.fixtures}")
+        return
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with pd.ExcelWriter(args.output) as writer:
+        summary.to_excel(writer, sheet_name='summary', index=False)
+        results.to_excel(writer, sheet_name='per_document', index=False)
+
+    logger.info("\n" + summary.to_string(index=False))
+    logger.info(f"Benchmark results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
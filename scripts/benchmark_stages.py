@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks of the local pipeline stages on synthetic data.
+
+Each stage is timed at growing sizes, against the implementation it replaced
+where that is still feasible, so the scaling of both can be compared:
+
+    python -m scripts.benchmark_stages --stage records
+    python -m scripts.benchmark_stages --stage quantities --sizes 100000
+    python -m scripts.benchmark_stages --stage compare --legacy-limit 500
+
+The imports stage tracks how long a fresh interpreter takes to import the entry
+modules (python -X importtime), which bounds the start-up of the app and the CLI.
+"""
+import argparse
+import logging
+import random
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from scripts.asset_records import AssetRecords
+from scripts.reshape_assets_excel import expand_quantities
+from scripts.compare_excels import greedy_matches
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ASSET_TYPES = ['Shower', 'Bib tap', 'Wash hand basin', 'Toilet', 'Urinal', 'Sink', 'Calorifier']
+LOCATIONS = ['Main School - Kitchen', 'Main School - Gym', 'Annex - WC 1', 'Annex - Hall', 'Sports Hall']
+COUNTS = ['1', '2', '3', '6x', '1', '4']
+
+
+def synthetic_assets(n, seed=0):
+    """n assets in the reply format of the models."""
+    rng = random.Random(seed)
+    return [{'asset_type': rng.choice(ASSET_TYPES),
+             'asset_location': rng.choice(LOCATIONS),
+             'asset_count': rng.choice(COUNTS)} for _ in range(n)]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def build_with_concat(assets):
+    """The former build: one pd.concat per asset."""
+    df_assets = pd.DataFrame()
+    for asset in assets:
+        new_row = pd.DataFrame({
+            'asset_count': [asset['asset_count']],
+            'asset_type': [asset['asset_type']],
+            'asset_location': [asset['asset_location']],
+            'sheet_name': ['page_1'],
+            'flag': ['']
+        })
+        df_assets = pd.concat([df_assets, new_row], ignore_index=True)
+    return df_assets
+
+
+def build_with_records(assets):
+    records = AssetRecords()
+    records.extend(assets, sheet_name='page_1', flag='')
+    records.counts()
+    return records.to_dataframe()
+
+
+def benchmark_records(sizes, legacy_limit):
+    rows = []
+    for n in sizes:
+        assets = synthetic_assets(n)
+        rows.append({
+            'stage': 'records',
+            'n': n,
+            'legacy_s': timed(build_with_concat, assets) if n <= legacy_limit else None,
+            'new_s': timed(build_with_records, assets),
+        })
+    return rows
+
+
+def synthetic_review_rows(expanded_rows, seed=0):
+    """Human review rows whose valid counts add up to expanded_rows, with invalid and empty counts mixed in."""
+    rng = random.Random(seed)
+    rows, total = [], 0
+    while total < expanded_rows:
+        count = rng.choice(['1', '2', '3', '6x', '', '0', '-1', '2.7', 4.0, '10'])
+        parsed = int(float(count)) if count not in ('6x', '') else 0
+        if parsed > expanded_rows - total:
+            count = parsed = expanded_rows - total
+        total += max(parsed, 0)
+        rows.append({'asset_count': count if count != '' else None,
+                     'asset_type': rng.choice(ASSET_TYPES),
+                     'asset_location': rng.choice(LOCATIONS),
+                     'sheet_name': f'page_{rng.randint(1, 40)}'})
+    # Stand-in type IDs; expansion only carries them along
+    return pd.DataFrame(rows).assign(asset_type_id=lambda df: df['asset_type'].map(ASSET_TYPES.index))
+
+
+def expand_with_concat(df):
+    """The former multiply_quantities loop: one pd.concat per expanded row."""
+    expanded_df = pd.DataFrame(columns=['asset_type', 'asset_location', 'sheet_name'])
+    for _, row in df.iterrows():
+        if pd.isna(row['asset_type']) or pd.isna(row['asset_count']):
+            continue
+        try:
+            count = int(float(row['asset_count']))
+            if count <= 0:
+                continue
+        except (ValueError, TypeError):
+            continue
+        for _ in range(count):
+            new_row = pd.DataFrame({
+                'asset_type': [row['asset_type']],
+                'asset_location': [row['asset_location']],
+                'sheet_name': [row['sheet_name']]
+            })
+            expanded_df = pd.concat([expanded_df, new_row], ignore_index=True)
+    return expanded_df
+
+
+def benchmark_quantities(sizes, legacy_limit):
+    """Expansion of human review rows into sizes expanded rows."""
+    rows = []
+    for n in sizes:
+        df = synthetic_review_rows(n)
+        legacy_s = None
+        if n <= legacy_limit:
+            legacy_s = timed(expand_with_concat, df)
+            legacy = expand_with_concat(df)
+            pd.testing.assert_frame_equal(expand_quantities(df)[legacy.columns], legacy, check_dtype=False)
+        rows.append({'stage': 'quantities', 'n': n, 'legacy_s': legacy_s, 'new_s': timed(expand_quantities, df)})
+    return rows
+
+
+def synthetic_comparison(n, seed=0):
+    """Golden and created (asset_type, asset_location) rows, normalized as compare_excel_files does."""
+    rng = random.Random(seed)
+    types = [t.lower() for t in ASSET_TYPES] + ['whb', 'tap', 'nan', 'shower mixer', 'wash hand basin']
+    rooms = [f'{block} - {room} {i}' for block in ['main school', 'annex', 'sports hall'] for room in
+             ['wc', 'kitchen', 'classroom', 'store', 'plant room/boiler'] for i in range(1, n // 50 + 3)]
+
+    def rows(k):
+        return pd.DataFrame({'asset_type': [rng.choice(types) for _ in range(k)],
+                             'asset_location': [rng.choice(rooms) for _ in range(k)]})
+
+    return rows(n), rows(n)
+
+
+def match_with_loops(golden_compare, created_compare):
+    """The former nested loop of compare_excel_files, without its printing."""
+    pairs, created_indices_to_drop = [], []
+    for golden_idx, golden_row in golden_compare.iterrows():
+        for created_idx, created_row in created_compare.iterrows():
+            if created_idx in created_indices_to_drop:
+                continue
+            golden_type_words = set(golden_row['asset_type'].split())
+            golden_location_cleaned = golden_row['asset_location'].replace('/', ' ').replace('-', ' ').replace('  ', ' ')
+            created_type_words = set(created_row['asset_type'].split())
+            created_location_cleaned = created_row['asset_location'].replace('/', ' ').replace('-', ' ').replace('  ', ' ')
+            golden_location_words = set(golden_location_cleaned.split())
+            created_location_words = set(created_location_cleaned.split())
+            type_match = all(word in created_row['asset_type'] for word in golden_type_words) or \
+                         all(word in golden_row['asset_type'] for word in created_type_words)
+            location_match = all(word in created_location_cleaned for word in golden_location_words) or \
+                             all(word in golden_location_cleaned for word in created_location_words)
+            if type_match and location_match:
+                pairs.append((golden_idx, created_idx))
+                created_indices_to_drop.append(created_idx)
+                break
+    return pairs
+
+
+def benchmark_compare(sizes, legacy_limit):
+    """Golden against created rows, n of each."""
+    rows = []
+    for n in sizes:
+        golden, created = synthetic_comparison(n)
+        legacy_s = None
+        if n <= legacy_limit:
+            legacy_s = timed(match_with_loops, golden, created)
+            assert greedy_matches(golden, created) == match_with_loops(golden, created)
+        rows.append({'stage': 'compare', 'n': n, 'legacy_s': legacy_s, 'new_s': timed(greedy_matches, golden, created)})
+    return rows
+
+
+# Modules the Streamlit app and the batch CLI import at start-up
+ENTRY_MODULES = ['scripts.excel_to_data', 'scripts.pdf_to_excel', 'scripts.pdf_processor',
+                 'scripts.reshape_assets_excel', 'scripts.compare_excels', 'scripts.extraction_backends']
+
+
+def import_time(module):
+    """Cumulative import time of module in a fresh interpreter, in seconds, or None if it fails to import."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        logger.warning(f"Importing {module} failed: {result.stderr.strip().splitlines()[-1]}")
+        return None
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1e6
+    return None
+
+
+def benchmark_imports(sizes, legacy_limit):
+    """Import time of each entry module; the sizes and legacy limit do not apply."""
+    return [{'stage': 'imports', 'module': module, 'n': 1, 'legacy_s': None, 'new_s': import_time(module)}
+            for module in ENTRY_MODULES]
+
+
+STAGES = {
+    'records': (benchmark_records, [1000, 5000, 50000]),
+    'quantities': (benchmark_quantities, [1000, 5000, 100000]),
+    'compare': (benchmark_compare, [200, 500, 20000]),
+    'imports': (benchmark_imports, [1]),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the local pipeline stages')
+    parser.add_argument('--stage', choices=sorted(STAGES), action='append',
+                        help='Stage to benchmark, may be repeated. Default all stages')
+    parser.add_argument('--sizes', type=int, nargs='+', help='Input sizes, overriding the stage defaults')
+    parser.add_argument('--legacy-limit', type=int, default=5000,
+                        help='Largest size to also time the replaced implementation at')
+    args = parser.parse_args()
+
+    rows = []
+    for stage in args.stage or sorted(STAGES):
+        benchmark, sizes = STAGES[stage]
+        rows.extend(benchmark(args.sizes or sizes, args.legacy_limit))
+
+    results = pd.DataFrame(rows)
+    results['per_item_us'] = results['new_s'] / results['n'] * 1e6
+    logger.info("\n" + results.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,217 @@
+import heapq
+from collections import deque
+
 import pandas as pd
 from difflib import SequenceMatcher
 
+from scripts.asset_taxonomy import get_canonical_index, UNKNOWN_TYPE_ID
+from scripts.reshape_assets_excel import load_expanded_assets
+
 def normalize_string(s):
     return s.strip().lower()
 
 def string_similarity(a, b):
     return SequenceMatcher(None, a, b).ratio()
 
-def compare_excel_files(golden_file_path, created_file_name, folder_path='./output'):
+
+def clean_location(location):
+    """Location with '/' and '-' as word separators, as the matching compares it."""
+    return location.replace('/', ' ').replace('-', ' ').replace('  ', ' ')
+
+
+def words_match(a, b):
+    """Whether every word of a occurs in b, or every word of b occurs in a (substring containment)."""
+    return all(word in b for word in set(a.split())) or all(word in a for word in set(b.split()))
+
+
+class ContainmentIndex:
+    """
+    Finds, among distinct strings, those that words_match a query string.
+
+    The forward direction (every query word occurs in the string) looks up the
+    strings' words that contain a query word through a trigram index. The reverse
+    direction (every word of the string occurs in the query) collects the words
+    that are substrings of the query and only checks the strings anchored on one
+    of them, each string being anchored on its rarest word. Results are exact and
+    memoized per query.
+    """
+
+    def __init__(self, strings):
+        self.strings = list(strings)
+        self.words = []
+        self.word_ids = {}
+        self.strings_by_word = []
+        self.string_words = []
+        for string_id, string in enumerate(self.strings):
+            word_ids = []
+            for word in set(string.split()):
+                if word not in self.word_ids:
+                    self.word_ids[word] = len(self.words)
+                    self.words.append(word)
+                    self.strings_by_word.append(set())
+                self.strings_by_word[self.word_ids[word]].add(string_id)
+                word_ids.append(self.word_ids[word])
+            self.string_words.append(word_ids)
+
+        self.wordless = {string_id for string_id, word_ids in enumerate(self.string_words) if not word_ids}
+        self.strings_by_anchor = [[] for _ in self.words]
+        for string_id, word_ids in enumerate(self.string_words):
+            if word_ids:
+                anchor = min(word_ids, key=lambda word_id: len(self.strings_by_word[word_id]))
+                self.strings_by_anchor[anchor].append(string_id)
+        self.max_word_length = max(map(len, self.words), default=0)
+
+        self.trigrams = {}
+        for word_id, word in enumerate(self.words):
+            for i in range(len(word) - 2):
+                self.trigrams.setdefault(word[i:i + 3], set()).add(word_id)
+        self.short_memo = {}
+        self.memo = {}
+
+    def _words_containing(self, fragment):
+        if len(fragment) < 3:
+            # Too short for the trigrams; short words recur, so the scan is done once per fragment
+            if fragment not in self.short_memo:
+                self.short_memo[fragment] = [word_id for word_id, word in enumerate(self.words) if fragment in word]
+            return self.short_memo[fragment]
+        candidates = None
+        for i in range(len(fragment) - 2):
+            posting = self.trigrams.get(fragment[i:i + 3], set())
+            candidates = posting if candidates is None else candidates & posting
+            if not candidates:
+                return []
+        return [word_id for word_id in candidates if fragment in self.words[word_id]]
+
+    def _containing_all(self, query_words):
+        """Strings in which every query word occurs."""
+        if not query_words:
+            return set(range(len(self.strings)))
+
+        # Candidates from the query word that occurs in the fewest strings, filtered on the others
+        postings = [[self.strings_by_word[word_id] for word_id in self._words_containing(query_word)]
+                    for query_word in query_words]
+        sizes = [sum(map(len, posting)) for posting in postings]
+        rarest = sizes.index(min(sizes))
+        others = [query_word for i, query_word in enumerate(query_words) if i != rarest]
+
+        result = set().union(*postings[rarest])
+        if others:
+            result = {string_id for string_id in result
+                      if all(query_word in self.strings[string_id] for query_word in others)}
+        return result
+
+    def _contained_in(self, query_words):
+        """Strings whose every word occurs in the query."""
+        hit = set()
+        for query_word in query_words:
+            for i in range(len(query_word)):
+                for j in range(i + 1, min(len(query_word), i + self.max_word_length) + 1):
+                    word_id = self.word_ids.get(query_word[i:j])
+                    if word_id is not None:
+                        hit.add(word_id)
+
+        result = set(self.wordless)
+        for word_id in hit:
+            for string_id in self.strings_by_anchor[word_id]:
+                if all(other in hit for other in self.string_words[string_id]):
+                    result.add(string_id)
+        return result
+
+    def matches(self, query):
+        """Ids of the strings s with words_match(query, s)."""
+        if query not in self.memo:
+            query_words = list(set(query.split()))
+            self.memo[query] = self._containing_all(query_words) | self._contained_in(query_words)
+        return self.memo[query]
+
+
+def greedy_matches(golden_compare, created_compare):
+    """
+    Pair golden with created rows, as the former nested loop did.
+
+    Every golden row, in order, takes the first created row not taken yet whose
+    asset type and cleaned asset_location both match its own. Asset types match
+    on their asset_type_id when both frames have one and both IDs are known, and
+    otherwise when the asset_type strings words_match. Created rows are grouped
+    by (type, location, type ID) with a queue of their indices, candidate groups
+    come from a ContainmentIndex per column and the type IDs, and a lazy heap per
+    golden group yields the first free row, so the pairs are those of the loop.
+
+    Returns:
+        list: (golden index, created index) tuples, in golden order
+    """
+    created_types = created_compare['asset_type'].tolist()
+    created_locations = [clean_location(location) for location in created_compare['asset_location']]
+    created_ids = type_ids(created_compare, golden_compare)
+
+    queues = {}
+    # Queues hold row positions, the order in which the loop visited the created rows
+    for position, key in enumerate(zip(created_types, created_locations, created_ids)):
+        queues.setdefault(key, deque()).append(position)
+    keys_by_type, keys_by_location, keys_by_id = {}, {}, {}
+    for key in queues:
+        keys_by_type.setdefault(key[0], []).append(key)
+        keys_by_location.setdefault(key[1], []).append(key)
+        keys_by_id.setdefault(key[2], []).append(key)
+
+    type_index = ContainmentIndex(keys_by_type)
+    location_index = ContainmentIndex(keys_by_location)
+
+    heaps = {}
+    pairs = []
+    golden_locations = [clean_location(location) for location in golden_compare['asset_location']]
+    golden_ids = type_ids(golden_compare, created_compare)
+    for golden_idx, key in zip(golden_compare.index, zip(golden_compare['asset_type'], golden_locations, golden_ids)):
+        if key not in heaps:
+            type_id = key[2]
+            types = {type_index.strings[i] for i in type_index.matches(key[0])}
+            locations = {location_index.strings[i] for i in location_index.matches(key[1])}
+
+            def type_matches(created_key):
+                if type_id != UNKNOWN_TYPE_ID and created_key[2] != UNKNOWN_TYPE_ID:
+                    return created_key[2] == type_id
+                return created_key[0] in types
+
+            # Walk the groups of the column with the fewer candidate groups, filter on the other
+            type_groups = [keys_by_type[t] for t in types]
+            if type_id != UNKNOWN_TYPE_ID:
+                type_groups.append(keys_by_id.get(type_id, []))
+            location_groups = [keys_by_location[l] for l in locations]
+            if sum(map(len, type_groups)) <= sum(map(len, location_groups)):
+                candidates = {created_key for group in type_groups for created_key in group
+                              if created_key[1] in locations and type_matches(created_key)}
+            else:
+                candidates = {created_key for group in location_groups for created_key in group
+                              if type_matches(created_key)}
+            heaps[key] = [(queues[created_key][0], created_key) for created_key in candidates if queues[created_key]]
+            heapq.heapify(heaps[key])
+
+        heap = heaps[key]
+        while heap:
+            head, created_key = heap[0]
+            queue = queues[created_key]
+            if not queue:
+                heapq.heappop(heap)
+            elif queue[0] != head:
+                # Taken by another golden row since; queue heads only grow
+                heapq.heapreplace(heap, (queue[0], created_key))
+            else:
+                pairs.append((golden_idx, created_compare.index[queue.popleft()]))
+                break
+    return pairs
+
+
+def type_ids(compare, other):
+    """The asset_type_id column of compare, or UNKNOWN_TYPE_ID throughout when either frame has none."""
+    if 'asset_type_id' in compare.columns and 'asset_type_id' in other.columns:
+        return compare['asset_type_id'].tolist()
+    return [UNKNOWN_TYPE_ID] * len(compare)
+
+def compare_excel_files(golden_file_path, created_file_name, folder_path='./output', language='english'):
     # Read the excel files
     golden_df = pd.read_excel(golden_file_path, header=0)
-    created_file_path = f'{folder_path}/5-MultipliedQuantities/{created_file_name}-assets-multiplied.xlsx'
-    created_df = pd.read_excel(created_file_path, header=0)
+    # Per-asset rows, expanded from the compact file if the run only wrote that
+    created_df = load_expanded_assets(created_file_name, folder_path)
     
     # Create copies with standardized column names for comparison
     golden_compare = golden_df[['Asset Type', '*Room']].copy()
@@ -31,6 +231,12 @@ def compare_excel_files(golden_file_path, created_file_name, folder_path='./outp
     golden_compare['asset_type'] = golden_compare['asset_type'].apply(normalize_string)
     golden_compare['asset_location'] = golden_compare['asset_location'].apply(normalize_string)
 
+    # Canonical type IDs, so 'WHB' and 'Hand washbasin' match. Both sides use the index of
+    # language: a stored asset_type_id may come from the other language's taxonomy
+    canonical_index = get_canonical_index(language)
+    golden_compare['asset_type_id'] = canonical_index.ids(golden_df['Asset Type'])
+    created_compare['asset_type_id'] = canonical_index.ids(created_df['asset_type'])
+
     # Instead of merge, we'll use word-by-word comparison
     missing_in_created = golden_compare.copy()
     extra_in_created = created_compare.copy()
@@ -39,43 +245,16 @@ def compare_excel_files(golden_file_path, created_file_name, folder_path='./outp
     golden_indices_to_drop = []
     created_indices_to_drop = []
     
-    # Compare each row in golden with all rows in created
-    for golden_idx, golden_row in missing_in_created.iterrows():
-        for created_idx, created_row in extra_in_created.iterrows():
-
-            # Needed since there are a lot of duplicates
-            if created_idx in created_indices_to_drop:
-                continue
-            
-            # Split strings into words
-            golden_type_words = set(golden_row['asset_type'].split())
-            golden_location_cleaned = golden_row['asset_location'].replace('/', ' ').replace('-', ' ').replace('  ', ' ')
-            created_type_words = set(created_row['asset_type'].split())
-            created_location_cleaned = created_row['asset_location'].replace('/', ' ').replace('-', ' ').replace('  ', ' ')
-            
-            # Split cleaned strings into words
-            golden_location_words = set(golden_location_cleaned.split())
-            created_location_words = set(created_location_cleaned.split())
-            
-            # Check if all separate words in asset_type are substrings of any strings in the other DataFrame
-            type_match = all(word in created_row['asset_type'] for word in golden_type_words) or \
-                         all(word in golden_row['asset_type'] for word in created_type_words)
-            
-            # Check if all separate words in asset_location are substrings of any strings in the other DataFrame
-            location_match = all(word in created_location_cleaned for word in golden_location_words) or \
-                             all(word in golden_location_cleaned for word in created_location_words)
-            
-            # If both type and location match
-            if type_match and location_match:
-                # Debugging output
-                print(f"Match found: Golden Index {golden_idx} with Created Index {created_idx}")
-                print(f"Golden: {golden_row['asset_type']} - {golden_row['asset_location']}")
-                print(f"Created: {created_row['asset_type']} - {created_row['asset_location']}\n")
-                
-                # Mark these indices for removal
-                golden_indices_to_drop.append(golden_idx)
-                created_indices_to_drop.append(created_idx)
-                break
+    # Each golden row is matched to the first free created row, see greedy_matches
+    for golden_idx, created_idx in greedy_matches(missing_in_created, extra_in_created):
+        # Debugging output
+        print(f"Match found: Golden Index {golden_idx} with Created Index {created_idx}")
+        print(f"Golden: {missing_in_created.at[golden_idx, 'asset_type']} - {missing_in_created.at[golden_idx, 'asset_location']}")
+        print(f"Created: {extra_in_created.at[created_idx, 'asset_type']} - {extra_in_created.at[created_idx, 'asset_location']}\n")
+
+        # Mark these indices for removal
+        golden_indices_to_drop.append(golden_idx)
+        created_indices_to_drop.append(created_idx)
 
     print(f"length of golden_indices_to_drop: {len(golden_indices_to_drop)}")
     print(f"length of created_indices_to_drop: {len(created_indices_to_drop)}")
@@ -2,25 +2,570 @@ import logging
 import pandas as pd
 import json
 import os
-from orq_ai_sdk import Orq
-from dotenv import load_dotenv
-import streamlit as st
-import openpyxl  # Explicitly import openpyxl
-
-load_dotenv()
-
-# Initialize the Orq client using environment variable directly
-orq_api_key = os.environ.get("ORQ_API_KEY")
-if not orq_api_key:
-    logging.error("ORQ API key is missing from environment variables")
-    raise ValueError("ORQ_API_KEY must be set in environment variables")
-
-orq_client = Orq(api_key=orq_api_key)
-
-def process_excel_file(file_name, input_path='./output/2-ExportPDFToExcel/', output_path='./output/3-ExcelToData/', assets_known=False, language='english'):
-
-    check_counter = 0
-
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache, partial
+from scripts.llm_cache import LLMResponseCache, make_cache_key
+from scripts.prompts import get_prompt_template, estimate_tokens, render_packed_tables, COLUMN_ROLES_PROMPT
+from scripts.asset_taxonomy import get_taxonomy_index, table_terms, get_asset_term_matcher, get_canonical_index
+from scripts.table_serialization import serialize_table, split_table
+from scripts.table_stitching import stitch_continuation_sheets
+from scripts.asset_records import AssetRecords, parse_asset_counts, is_whole_count, REVIEW_COLUMNS
+from scripts.asset_consensus import match_asset_lists, MIN_AGREEMENT
+from scripts.run_journal import SheetJournal, task_key
+from scripts.orq_invoke import invoke_deployment, get_orq_client, submit_in_context, with_retry_budget
+from scripts.llm_ledger import CallLedger, current_ledger, ledger_scope, log_summary
+from scripts.reply_checks import logprob_confidence, structural_issues
+from scripts.asset_register import extract_register_assets, detect_column_roles, header_signature, parse_with_roles, roles_from_reply
+
+TABLE_EXTRACTION_DEPLOYMENT = "legionella-table-extraction-v2"
+
+# Sheets up to this many estimated tokens can be packed into one request
+SMALL_SHEET_TOKENS = 300
+
+# Flag of the review row of a sheet that the local pre-filter did not send to the LLMs
+SKIPPED_FLAG = "Skipped, no asset terms"
+
+# Flag of a sheet whose request raised; such sheets are not checkpointed, so a resumed run retries them
+FAILED_FLAG = "Check, processing failed"
+
+# Guards the switch that turns packing off for the rest of a run
+_packing_lock = threading.Lock()
+
+# Replies are cached on disk, so re-running an unchanged workbook does not call the LLMs again
+response_cache = LLMResponseCache()
+
+
+def invoke_table_extraction(prompt, sheet_name, model_choice=None, use_cache=True, return_confidence=False):
+    """
+    Send a table extraction prompt to the legionella-table-extraction-v2 deployment.
+
+    Args:
+        prompt (str): Fully rendered prompt including the CSV table
+        sheet_name (str): Sheet the table comes from, sent along as metadata
+        model_choice (str): Model routing of the deployment, e.g. 'sonnet'. Default
+            None uses the deployment's default (GPT) model.
+        use_cache (bool): Look the prompt up in, and store valid JSON replies to, the
+            response cache. Default True.
+        return_confidence (bool): Also return the reply's logprob confidence (see
+            reply_checks.logprob_confidence). Default False.
+
+    Returns:
+        str: Stripped content of the model's reply, or a tuple of (content,
+        confidence) with return_confidence
+    """
+    cache_key = make_cache_key(TABLE_EXTRACTION_DEPLOYMENT, model_choice, prompt)
+    if use_cache:
+        cached = response_cache.get_entry(cache_key)
+        if cached is not None:
+            logging.info(f"Using cached {model_choice or 'default'} reply for sheet {sheet_name}")
+            if return_confidence:
+                return cached.get("content"), cached.get("confidence")
+            return cached.get("content")
+
+    context = {
+        "environments": []
+    }
+    if model_choice:
+        context["model_choice"] = [model_choice]
+
+    # Cost: 0.001 
+    response = invoke_deployment(
+        get_orq_client(),
+        key=TABLE_EXTRACTION_DEPLOYMENT,
+        context=context,
+        metadata={
+            "page-number": sheet_name
+        }, 
+        messages=[
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": prompt},
+                ],
+            }
+        ],
+    )
+
+    result_content = response.choices[0].message.content.strip()
+    confidence = logprob_confidence(getattr(response.choices[0], "logprobs", None))
+
+    # Only cache replies that parse, so a rerun retries the failed ones
+    if use_cache:
+        try:
+            json.loads(result_content)
+            response_cache.set(cache_key, result_content, confidence=confidence)
+        except json.JSONDecodeError:
+            pass
+
+    if return_confidence:
+        return result_content, confidence
+    return result_content
+
+
+def build_prompt(table_string, tables, label, assets_known=False, language='english', taxonomy_top_k=None):
+    """
+    Render the extraction prompt for a table string.
+
+    Args:
+        table_string (str): CSV table(s) to put in the prompt
+        tables (list): DataFrames behind table_string, used to retrieve the asset types
+        label (str): Sheet name(s), for logging
+        assets_known (bool): Whether the tables were selected by a human as containing assets
+        language (str): Prompt language ('english' or 'nederlands')
+        taxonomy_top_k (int): Only list the k asset types that best match the tables'
+            terms in the prompt. Default None lists the full taxonomy.
+    """
+    template = get_prompt_template(language, assets_known)
+    if not taxonomy_top_k:
+        return template.render(table_string)
+
+    # Only carry the asset types that plausibly occur in these tables
+    terms = sorted(set().union(*(table_terms(table) for table in tables)))
+    asset_types = get_taxonomy_index(language).top_k(terms, taxonomy_top_k)
+    prompt = template.render(table_string, asset_types=asset_types)
+    logging.info(f"Sheet {label}: pruned taxonomy to {len(asset_types)} asset types, "
+                 f"~{template.token_count + estimate_tokens(table_string) - estimate_tokens(prompt)} tokens saved")
+    return prompt
+
+
+def extract_with_both_models(prompt, label, use_cache=True):
+    """
+    Send the prompt to GPT and Sonnet 3.5.
+
+    The two calls are independent, so they run at once and are joined before
+    the consensus check.
+
+    Returns:
+        Tuple of (GPT's assets, Sonnet's assets). GPT's assets are empty and Sonnet's
+        are None when the model's reply is not valid JSON.
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        gpt_future = submit_in_context(executor, invoke_table_extraction, prompt, label, use_cache=use_cache)
+        sonnet_future = submit_in_context(executor, invoke_table_extraction, prompt, label, model_choice="sonnet",
+                                          use_cache=use_cache)
+        result_content_gpt = gpt_future.result()
+        result_content_sonnet = sonnet_future.result()
+
+    assetsGPT = parse_assets(result_content_gpt, "GPT")
+    assetsSonnet = parse_assets(result_content_sonnet, "Sonnet 3.5")
+    return assetsGPT if assetsGPT is not None else [], assetsSonnet
+
+
+def extract_with_escalation(prompt, label, use_cache=True, escalation_threshold=0.9, assets_known=False):
+    """
+    Send the prompt to GPT, and to Sonnet 3.5 only when GPT's reply is doubtful.
+
+    GPT's reply is accepted when it has no structural issues (see
+    reply_checks.structural_issues) and its logprob confidence is at least
+    escalation_threshold. If the deployment returns no logprobs there is no
+    confidence to go by, so the reply is escalated as a doubtful one. An accepted
+    reply stands in for both models, so its assets are written without a 'Check'
+    flag.
+
+    Returns:
+        Tuple of (GPT's assets, Sonnet's assets) as extract_with_both_models
+    """
+    result_content_gpt, confidence = invoke_table_extraction(prompt, label, use_cache=use_cache, return_confidence=True)
+    issues = structural_issues(result_content_gpt, assets_known=assets_known)
+    if confidence is None:
+        warn_no_confidence()
+
+    if not issues and confidence is not None and confidence >= escalation_threshold:
+        logging.info(f"Sheet {label}: accepted GPT reply (confidence {confidence:.2f}), Sonnet not called")
+        assetsGPT = parse_assets(result_content_gpt, "GPT")
+        return assetsGPT, assetsGPT
+
+    if issues:
+        reason = "; ".join(issues)
+    elif confidence is None:
+        reason = "no logprob confidence"
+    else:
+        reason = f"confidence {confidence:.2f} below {escalation_threshold}"
+    logging.info(f"Sheet {label}: escalating to Sonnet 3.5 ({reason})")
+    assetsGPT = parse_assets(result_content_gpt, "GPT")
+    assetsSonnet = parse_assets(invoke_table_extraction(prompt, label, model_choice="sonnet", use_cache=use_cache), "Sonnet 3.5")
+    return assetsGPT if assetsGPT is not None else [], assetsSonnet
+
+
+@lru_cache(maxsize=None)
+def warn_no_confidence():
+    """Warn, once per process, that escalation cannot use the replies' confidence."""
+    logging.warning("The extraction deployment returns no logprobs, so every GPT reply is escalated to Sonnet 3.5")
+
+
+def parse_assets(result_content, model_name):
+    """The assets list of a reply, or None if the reply is not valid JSON."""
+    # Parse the JSON response
+    try:
+        data = json.loads(result_content)
+        return data.get("assets", [])
+    except json.JSONDecodeError as e:
+        print(f"JSON decoding failed with {model_name}: {e}")
+        return None
+
+
+def extract_assets(prompt, label, use_cache=True, escalation_threshold=None, assets_known=False):
+    """
+    Extract the assets with both models, or with escalation when escalation_threshold is set.
+
+    Returns:
+        Tuple of (GPT's assets, Sonnet's assets) as extract_with_both_models
+    """
+    if escalation_threshold is None:
+        return extract_with_both_models(prompt, label, use_cache=use_cache)
+    return extract_with_escalation(prompt, label, use_cache=use_cache, escalation_threshold=escalation_threshold,
+                                   assets_known=assets_known)
+
+
+def assets_to_dataframe(sheet_name, assetsGPT, assetsSonnet, fuzzy_consensus=False):
+    """
+    Rows of a sheet's assets for the review file.
+
+    Sonnet's assets are kept and flagged 'Check' when the models disagree on the
+    number of assets, or when a count is not a whole number. Counts are written as
+    parsed integers ('6x' -> 6), see asset_records.clean_asset_count. If Sonnet's reply could not
+    be parsed (assetsSonnet is None), GPT's assets are kept and flagged
+    'Check, Sonnet failed'.
+
+    With fuzzy_consensus the lists are matched asset by asset instead (see
+    asset_consensus.match_asset_lists): each of Sonnet's assets gets an 'agreement'
+    score and only the ones without an agreeing GPT asset are flagged 'Check'. GPT
+    assets that Sonnet does not have are listed in one extra 'Check' row.
+
+    Returns:
+        Tuple of (assets DataFrame, whether the sheet was flagged 'Check')
+    """
+    records = AssetRecords()
+
+    if assetsSonnet is None:
+        # TODO: also include LLama
+        records.extend(assetsGPT, sheet_name=sheet_name, flag="Check, Sonnet failed")
+        return records.to_dataframe(), False
+
+    if fuzzy_consensus and len(assetsSonnet) > 0:
+        return fuzzy_consensus_dataframe(sheet_name, assetsGPT, assetsSonnet)
+
+    # Check if total assets and total number of assets are the same
+    counts_gpt = parse_asset_counts(asset["asset_count"] for asset in assetsGPT)
+    counts_sonnet = parse_asset_counts(asset["asset_count"] for asset in assetsSonnet)
+    # A count that is not a whole number ('2.5', 'several') cannot be multiplied out later
+    counts_valid = all((counts % 1 == 0).all() for counts in (counts_gpt, counts_sonnet))
+    if len(assetsGPT) == len(assetsSonnet) and counts_valid and counts_gpt.sum() == counts_sonnet.sum():
+        flag = ""
+    else:
+        flag = "Check"
+
+    print(flag)
+
+    # Special case: If assetsSonnet is empty and assetsGPT is not empty, then still make a row 
+    # with flag = "Check". Sonnet is better than 4o-mini, but we want to manually check
+    if (len(assetsSonnet) == 0) & (len(assetsGPT) > 0):
+        records.append(sheet_name=sheet_name, flag="Sonnet assumed no assets, GPT did assume assets")
+    else:
+        records.extend(assetsSonnet, sheet_name=sheet_name, flag=flag)
+
+    return records.to_dataframe(), flag == "Check"
+
+
+def fuzzy_consensus_dataframe(sheet_name, assetsGPT, assetsSonnet):
+    """Rows of Sonnet's assets with their agreement with GPT's assets, see assets_to_dataframe."""
+    agreement, gpt_only = match_asset_lists(assetsSonnet, assetsGPT)
+
+    records = AssetRecords(REVIEW_COLUMNS + ['agreement'])
+    checked = bool(gpt_only)
+    for asset, score in zip(assetsSonnet, agreement):
+        # A count that is not a whole number cannot be multiplied out later
+        flag = "" if score >= MIN_AGREEMENT and is_whole_count(asset["asset_count"]) else "Check"
+        checked = checked or flag == "Check"
+        records.append(asset_count=asset["asset_count"], asset_type=asset["asset_type"],
+                       asset_location=asset["asset_location"], sheet_name=sheet_name,
+                       flag=flag, agreement=round(score, 2))
+    if gpt_only:
+        gpt_types = ", ".join(f'{assetsGPT[j]["asset_count"]}x {assetsGPT[j]["asset_type"]}' for j in gpt_only)
+        records.append(sheet_name=sheet_name, flag=f"Check, only GPT found: {gpt_types}", agreement=0.0)
+
+    print("Check" if checked else "")
+    return records.to_dataframe(), checked
+
+
+def process_sheet(sheet_name, df, assets_known=False, language='english', use_cache=True, taxonomy_top_k=None,
+                  compact_tables=False, collapse_repeats=False, escalation_threshold=None, fuzzy_consensus=False):
+    """
+    Extract the assets from one sheet of the table workbook.
+
+    Both models extract the assets from the sheet's CSV; Sonnet's assets are kept
+    and flagged 'Check' when the models disagree on the number of assets.
+
+    Args:
+        sheet_name (str): Name of the sheet, kept with every asset row
+        df (DataFrame): The sheet's table
+        assets_known (bool): Whether the tables were selected by a human as containing assets
+        language (str): Prompt language ('english' or 'nederlands')
+        use_cache (bool): Whether to use the LLM response cache
+        taxonomy_top_k (int): Only list the k asset types that best match the table's
+            terms in the prompt. Default None lists the full taxonomy.
+        compact_tables (bool): Send the compact serialization of the table (see
+            table_serialization.compact_table) instead of the raw CSV
+        collapse_repeats (bool): With compact_tables, blank out repeated merged-cell text
+        escalation_threshold (float): Ask GPT first and Sonnet only when GPT's reply is
+            doubtful (see extract_with_escalation). Default None always asks both.
+        fuzzy_consensus (bool): Compare the models asset by asset, see assets_to_dataframe
+
+    Returns:
+        Tuple of (assets DataFrame, whether the sheet was flagged 'Check')
+    """
+    # Save each sheet to a separate CSV file using the sheet name
+    df_string, tokens_saved = serialize_table(df, compact=compact_tables, collapse_repeats=collapse_repeats)
+    if compact_tables:
+        logging.info(f"Sheet {sheet_name}: compact table saved ~{tokens_saved} tokens")
+
+    # TODO : convert csv to row data: https://blog.langchain.dev/benchmarking-question-answering-over-csv-data/ https://python.langchain.com/docs/integrations/document_loaders/csv/?ref=blog.langchain.dev
+
+    prompt = build_prompt(df_string, [df], sheet_name, assets_known, language, taxonomy_top_k)
+    assetsGPT, assetsSonnet = extract_assets(prompt, sheet_name, use_cache=use_cache,
+                                             escalation_threshold=escalation_threshold, assets_known=assets_known)
+    return assets_to_dataframe(sheet_name, assetsGPT, assetsSonnet, fuzzy_consensus=fuzzy_consensus)
+
+
+def process_packed_sheets(sheets, **kwargs):
+    """
+    Extract the assets of several small sheets with one request per model.
+
+    The models tag every asset with its sheet_name, and the consensus check runs
+    per sheet on the split lists.
+
+    Args:
+        sheets (list): (sheet name, DataFrame) tuples
+        **kwargs: Options of process_sheet
+
+    Returns:
+        dict: sheet name to (assets DataFrame, whether the sheet was flagged 'Check'),
+        or None if a reply has assets without a known sheet_name
+    """
+    sheet_names = [sheet_name for sheet_name, _ in sheets]
+    label = f"{sheet_names[0]}..{sheet_names[-1]}"
+    language = kwargs.get('language', 'english')
+
+    tables = [(sheet_name, serialize_table(df, compact=kwargs.get('compact_tables', False),
+                                           collapse_repeats=kwargs.get('collapse_repeats', False))[0])
+              for sheet_name, df in sheets]
+    prompt = build_prompt(render_packed_tables(tables, language), [df for _, df in sheets], label,
+                          kwargs.get('assets_known', False), language, kwargs.get('taxonomy_top_k'))
+    assetsGPT, assetsSonnet = extract_assets(prompt, label, use_cache=kwargs.get('use_cache', True),
+                                             escalation_threshold=kwargs.get('escalation_threshold'),
+                                             assets_known=kwargs.get('assets_known', False))
+
+    replies = [assetsGPT] + ([assetsSonnet] if assetsSonnet is not None else [])
+    unknown_sheets = {str(asset.get("sheet_name")) for reply in replies for asset in reply} - set(sheet_names)
+    if unknown_sheets:
+        logging.info(f"Packed reply for sheets {label} has assets of unknown sheets {sorted(unknown_sheets)}")
+        return None
+
+    results = {}
+    for sheet_name in sheet_names:
+        sheet_gpt = [asset for asset in assetsGPT if asset["sheet_name"] == sheet_name]
+        sheet_sonnet = None if assetsSonnet is None else [asset for asset in assetsSonnet if asset["sheet_name"] == sheet_name]
+        results[sheet_name] = assets_to_dataframe(sheet_name, sheet_gpt, sheet_sonnet,
+                                                  fuzzy_consensus=kwargs.get('fuzzy_consensus', False))
+    return results
+
+
+def plan_sheet_packs(sheets, pack_token_budget, compact_tables=False, collapse_repeats=False):
+    """
+    Group consecutive small sheets into packs that stay under pack_token_budget.
+
+    Sheets estimated above SMALL_SHEET_TOKENS are not packed, and a pack holds
+    at most one chunk of a split sheet.
+
+    Args:
+        sheets (list): (sheet name, DataFrame) tuples
+
+    Returns:
+        list: lists of (sheet name, DataFrame) tuples, one list per request
+    """
+    tasks = []
+    pack, pack_tokens = [], 0
+    for sheet_name, df in sheets:
+        tokens = estimate_tokens(serialize_table(df, compact=compact_tables, collapse_repeats=collapse_repeats)[0])
+        if tokens > SMALL_SHEET_TOKENS or tokens > pack_token_budget:
+            tasks.append([(sheet_name, df)])
+            continue
+        if pack and (pack_tokens + tokens > pack_token_budget or sheet_name in dict(pack)):
+            tasks.append(pack)
+            pack, pack_tokens = [], 0
+        pack.append((sheet_name, df))
+        pack_tokens += tokens
+    if pack:
+        tasks.append(pack)
+    return tasks
+
+
+def learn_column_roles(sheet_name, df, use_cache=True):
+    """
+    Column roles of a table's header, from the header itself or else from one GPT call.
+
+    Returns:
+        dict: roles as asset_register.detect_column_roles, or None if the table is
+        not an asset register
+    """
+    roles = detect_column_roles(df.columns)
+    if roles is not None:
+        return roles
+
+    prompt = COLUMN_ROLES_PROMPT.format(table=df.head(5).to_csv(index=False))
+    assets = parse_assets(invoke_table_extraction(prompt, sheet_name, use_cache=use_cache), "GPT")
+    return roles_from_reply(assets, df.columns)
+
+
+def parse_shared_headers(sheets, language='english', use_cache=True):
+    """
+    Parse the sheets that share a header row with other sheets, learning the column
+    roles once per header signature.
+
+    Args:
+        sheets (list): (sheet name, DataFrame) tuples
+
+    Returns:
+        dict: sheet name to its assets, for the sheets that parsed with their
+        signature's roles
+    """
+    by_signature = {}
+    for sheet_name, df in sheets:
+        signature = header_signature(df.columns)
+        if signature is not None:
+            by_signature.setdefault(signature, []).append((sheet_name, df))
+
+    local_assets = {}
+    for signature, group in by_signature.items():
+        if len(group) < 2:
+            continue
+        try:
+            roles = learn_column_roles(group[0][0], group[0][1], use_cache=use_cache)
+        except Exception as e:
+            # The group's sheets stay on the normal LLM path, where failures are isolated per sheet
+            logging.error(f"Failed to learn the column roles of header {signature}: {str(e)}")
+            continue
+        if roles is None:
+            continue
+        for sheet_name, df in group:
+            assets = parse_with_roles(df, roles, language)
+            if assets is not None:
+                local_assets[sheet_name] = assets
+        logging.info(f"Header {signature}: parsed {sum(name in local_assets for name, _ in group)} of {len(group)} sheets with its column roles")
+    return local_assets
+
+
+def flag_row(sheet_name, flag):
+    """A review row without an asset, carrying a flag for the sheet."""
+    records = AssetRecords()
+    records.append(sheet_name=sheet_name, flag=flag)
+    return records.to_dataframe()
+
+
+def process_sheets_isolated(sheets, packing_off=None, **kwargs):
+    """
+    Process one sheet, or a pack of small sheets, turning a failure into a single
+    'Check' row per sheet so that one failing request does not lose the results
+    of the others.
+
+    A pack whose replies cannot be split by sheet is processed one sheet at a
+    time. The deployment will most likely drop the sheet names of the next packs
+    as well, so packing_off (a threading.Event of the run) is then set and the
+    later packs go one sheet at a time straight away.
+
+    Returns:
+        dict: sheet name to (assets DataFrame, whether the sheet was flagged 'Check')
+    """
+    try:
+        if len(sheets) > 1 and not (packing_off is not None and packing_off.is_set()):
+            results = process_packed_sheets(sheets, **kwargs)
+            if results is not None:
+                return results
+            if packing_off is not None:
+                with _packing_lock:
+                    first_failure = not packing_off.is_set()
+                    packing_off.set()
+                if first_failure:
+                    logging.warning("Packed replies have assets without a known sheet_name, "
+                                    "processing the sheets one by one for the rest of the run")
+        return {sheet_name: process_sheet(sheet_name, df, **kwargs) for sheet_name, df in sheets}
+    except Exception as e:
+        results = {}
+        for sheet_name, _ in sheets:
+            logging.error(f"Failed to process sheet {sheet_name}: {str(e)}")
+            results[sheet_name] = (flag_row(sheet_name, f"{FAILED_FLAG}: {str(e)}"), True)
+        return results
+
+
+@with_retry_budget
+def process_excel_file(file_name, input_path='./output/2-ExportPDFToExcel/', output_path='./output/3-ExcelToData/', assets_known=False, language='english', max_workers=1, use_cache=True, taxonomy_top_k=None,
+                       compact_tables=False, collapse_repeats=False, pack_small_sheets=False, pack_token_budget=1500,
+                       max_sheet_tokens=None, escalation_threshold=None, prefilter_sheets=False,
+                       local_extraction=False, reuse_header_roles=False, stitch_continuations=False,
+                       fuzzy_consensus=False, resume=False):
+    """
+    Extract the assets from every sheet of '{input_path}{file_name}-pdf-extract.xlsx'.
+
+    Writes '{file_name}-assets-data.xlsx' to output_path and a copy with the human
+    review columns to the 4-HumanReview folder next to it.
+
+    Args:
+        file_name (str): Nickname of the file (e.g., 'parkwood')
+        input_path (str): Folder containing the table workbook
+        output_path (str): Folder to write the assets data to
+        assets_known (bool): Whether the tables were selected by a human as containing assets
+        language (str): Prompt language ('english' or 'nederlands')
+        max_workers (int): Number of sheets processed concurrently. Default 1 processes
+            the sheets one at a time.
+        use_cache (bool): Reuse cached LLM replies for unchanged prompts. Default True,
+            False sends every prompt to the models again.
+        taxonomy_top_k (int): Prune the asset types in each prompt to the k best matches
+            for the sheet's table. Default None sends the full taxonomy.
+        compact_tables (bool): Drop empty rows/columns, 'Unnamed: N' headers and
+            redundant whitespace from the tables before sending them. Default False.
+        collapse_repeats (bool): With compact_tables, also blank out text cells that
+            repeat the cell above (formerly merged cells). Default False.
+        pack_small_sheets (bool): Send consecutive small sheets together in one request
+            per model, so they share the prompt's fixed cost. Default False.
+        pack_token_budget (int): Maximum estimated tokens of the tables in one pack
+        max_sheet_tokens (int): Split sheets whose CSV is estimated above this many
+            tokens into row chunks, each with the header row, that are processed as
+            separate requests and merged back under the sheet name. Default None
+            sends every sheet whole.
+        escalation_threshold (float): Ask GPT first and call Sonnet only when GPT's
+            reply has structural issues or a logprob confidence below this threshold
+            (e.g. 0.9); replies without logprobs are escalated too. Default None asks
+            both models for every sheet.
+        prefilter_sheets (bool): Skip sheets in which no asset term of the taxonomy or
+            its synonyms occurs (see asset_taxonomy.AssetTermMatcher). A skipped sheet
+            gets one review row flagged SKIPPED_FLAG instead of LLM calls. Default False.
+        local_extraction (bool): Parse well-formed asset registers (explicit asset type,
+            location and count columns) locally, see asset_register. Only the other
+            sheets go to the LLMs. Default False.
+        reuse_header_roles (bool): Learn which columns hold the asset type, location
+            and count once per header row shared by several sheets (asking GPT once
+            if the headers are not recognized) and parse those sheets locally with
+            it. Default False.
+        stitch_continuations (bool): Merge sheets that continue the table of the sheet
+            before them (same columns, repeated header or a header that is a row of
+            data) into one sheet named after all its pages, e.g. 'page_12, page_13'.
+            Default False.
+        fuzzy_consensus (bool): Match the GPT and Sonnet assets one by one on fuzzy
+            type/location similarity and count, adding an 'agreement' column and
+            flagging only the assets the models disagree on. Default False compares
+            the number of assets and their total count per sheet.
+        resume (bool): Every finished request is checkpointed to
+            '{file_name}-journal.jsonl' in output_path as soon as it is done. With
+            resume, the requests already in the journal of an earlier run with the
+            same options are not sent again. Default False starts a new journal.
+
+    Every LLM call is recorded in the caller's ledger (see llm_ledger.ledger_scope)
+    or, without one, in a ledger of this run written to '{file_name}-llm-ledger.jsonl'
+    in output_path; the calls are summarized at the end.
+    """
     logging.info("Processing file "+file_name)
 
     excel_file_path = input_path+file_name+'-pdf-extract.xlsx'
@@ -48,6 +593,8 @@ def process_excel_file(file_name, input_path='./output/2-ExportPDFToExcel/', out
     except Exception as e:
         logging.warning(f"Pandas failed to read Excel file: {str(e)}")
         try:
+            import openpyxl
+
             # Directly use openpyxl to read the workbook
             logging.info(f"Reading Excel file with openpyxl: {excel_file_path}")
             workbook = openpyxl.load_workbook(excel_file_path, read_only=True)
@@ -92,1013 +639,128 @@ def process_excel_file(file_name, input_path='./output/2-ExportPDFToExcel/', out
             logging.info("Using empty dataframe as fallback to continue processing")
             dfs = {'fallback_empty': pd.DataFrame()}
 
-    df_assets = pd.DataFrame()
-
-    # Process each sheet
-    for sheet_name, df in dfs.items():
-        # Save each sheet to a separate CSV file using the sheet name
-        df_string = df.to_csv(index=False)  # Gets CSV string format
-
-        # TODO : convert csv to row data: https://blog.langchain.dev/benchmarking-question-answering-over-csv-data/ https://python.langchain.com/docs/integrations/document_loaders/csv/?ref=blog.langchain.dev
-
-        # TODO: If table < 12 rows input as one input, otherwise in batches 
-
-        prompt_unknown_if_assets = """Below is a table extracted from an excel file in a CSV format. 
-                            The table is part of a legionella risk assessment. Examine it carefully. 
-                            You should extract specific data from the table if is present. The data you
-                            are looking for is specific assets. Assets are water-related equipment, like taps, showers etc. but may vary from anything to dead ends for example.
-
-                            First examine the table and see if any assets are explicitly mentioned, with explicit locations.
-
-                            If that is the case examine the table again and extract each asset and extract the following:
-                            -Asset type (like taps, showers, dead ends, anything that is water/plumbing related etc)
-                            -Asset location (like Main School, etc)
-                            -Asset count (like 6x, 1x etc, just put the number here)
-
-                            Assets my have supply sources or supply to other assets, so be careful to not extract assets that are mentioned in combination with 'supply' and do not have an explicit location.
-                            Ignore these 'supply' related assets. If the location seems to be an asset, it is highly probable that it is a supply related asset. 
-                            Assets that are mentioned in combination with 'supply' are not assets may be ignored since these are already mentioned elsewhere.
-
-                            Also, for each asset table be thorough in  what information to extract. 'Type of outlet' for example may be ignored if 'asset' is mentioned explicitly in the table.
-
-                            Return the data in the following format:
-
-                            {{ "assets" : [ {{ "asset_type" : "asset_type", "asset_location" : "asset_location", "asset_count" : "asset_count" }}, {{ "asset_type" : "asset_type", "asset_location  " : "asset_location", "asset_count" : "asset_count"  }}, ...] }}
-                            If multiples of assets are mentioned (like (6x Toilets	Main School)) then return each asset as a separate row, like
-                            {{ "assets" : [ {{ "asset_type" : "Toilets", "asset_location" : "Main School", "asset_count" : "6" }}, .... }}
-                            
-
-
-                            Only include assets if the asset type and location combination are explicitly mentioned. If the location in combination with the asset type is not explicitly mentioned, then ignore the asset. You cannot return an asset without a location.
-                            Only give the name of the location, nothing else. Be as specific as possible about the location.
-                            The location needs to be a physical location in a building. If mulitple scopes of locations are mentinioned, start with biggest scope and then combine with smaller scopes, connected with a hyphen.
-                            For example: "Main School - Kitchen - Toilets"
-
-                            For the asset count, the default value is 1, unless it is explicitly mentioned.
-
-                            If no assets are found, return an empty list."""
-        
-        prompt_unknown_if_assets_nederlands = """Hieronder staat een tabel geëxtraheerd uit een Excel bestand in CSV formaat.
-                            De tabel is onderdeel van een legionella risicobeoordeling. Onderzoek deze zorgvuldig.
-                            Je moet specifieke data uit de tabel halen indien aanwezig. De data waar je
-                            naar zoekt zijn specifieke assets. Assets zijn watergerelateerde apparatuur, zoals kranen, douches etc. maar kunnen variëren van alles tot doodlopende leidingen bijvoorbeeld.
-
-                            Onderzoek eerst de tabel en kijk of er expliciet assets worden genoemd, met expliciete locaties.
-
-                            Als dat het geval is, onderzoek de tabel nogmaals en haal voor elk asset de volgende informatie eruit:
-                            -Asset type (zoals kranen, douches, doodlopende leidingen, alles wat water/loodgieterswerk gerelateerd is etc)
-                            -Asset locatie (zoals Hoofdschool, etc)
-                            -Asset aantal (zoals 6x, 1x etc, zet hier alleen het nummer)
-
-                            Assets kunnen voedingsbronnen hebben of andere assets voeden, dus wees voorzichtig met assets die genoemd worden in combinatie met 'toevoer' en geen expliciete locatie hebben.
-                            Negeer deze 'toevoer' gerelateerde assets. Als de locatie een asset lijkt te zijn, is het zeer waarschijnlijk dat het een toevoer gerelateerde asset is.
-                            Assets die genoemd worden in combinatie met 'toevoer' zijn geen assets en mogen genegeerd worden aangezien deze al elders genoemd zijn.
-
-                            Wees ook voor elke asset tabel grondig in welke informatie je extraheert. 'Type tappunt' bijvoorbeeld mag genegeerd worden als 'asset' expliciet genoemd wordt in de tabel.
-
-                            Retourneer de data in het volgende formaat:
-
-                            {{ "assets" : [ {{ "asset_type" : "asset_type", "asset_location" : "asset_location", "asset_count" : "asset_count" }}, {{ "asset_type" : "asset_type", "asset_location" : "asset_location", "asset_count" : "asset_count" }}, ...] }}
-                            Als er meerdere assets genoemd worden (zoals (6x Toiletten Hoofdschool)) retourneer dan elk asset als een aparte rij, zoals
-                            {{ "assets" : [ {{ "asset_type" : "Toiletten", "asset_location" : "Hoofdschool", "asset_count" : "6" }}, .... }}
-
-                            Neem alleen assets op als de combinatie van asset type en locatie expliciet genoemd wordt. Als de locatie in combinatie met het asset type niet expliciet genoemd wordt, negeer dan het asset. Je kunt geen asset retourneren zonder locatie.
-                            Geef alleen de naam van de locatie, niets anders. Wees zo specifiek mogelijk over de locatie.
-                            De locatie moet een fysieke locatie in een gebouw zijn. Als er meerdere niveaus van locaties genoemd worden, begin dan met het grootste niveau en combineer met kleinere niveaus, verbonden met een koppelteken.
-                            Bijvoorbeeld: "Hoofdschool - Keuken - Toiletten"
-
-                            Voor het asset aantal is de standaardwaarde 1, tenzij het expliciet anders genoemd wordt.
-
-                            Als er geen assets gevonden worden, retourneer dan een lege lijst."""
-        
-        #TODO: add sheet name, only include sub-tables if multiple tables.
-        prompt_known_if_assets = """Below is a table extracted from an excel file in a CSV format. 
-                            The table is part of a legionella risk assessment. Examine it carefully. 
-                            You should extract specific data from the table if is present. The data you
-                            are looking for is specific assets. Assets are water/plumbing-related equipment, like taps, showers, dead ends etc.
-                            The tables are selected by a human, so they are extremely likely likely to contain assets. Take this into account when examing the table
-                            The tables are extracted from pages however, and one page may contain multiple tables.
-                            So it could be that case that you are examining a table from a page where another table contained the assets.
-                            In that case, you should not extract the assets from the table you are examining.
-                            
-
-                            First examine the table structure carefully.
-
-                            Then extract each asset and extract the following:
-                            -Asset type (like taps, showers, dead ends, anything that is water/plumbing related etc)
-                            -Asset location (like Main School, etc)
-                            -Asset count (like 6x, 1x etc, just put the number here)
-
-                            Assets my have supply sources or supply to other assets, so be careful to not extract assets that are mentioned in combination with 'supply' and do not have an explicit location.
-                            Ignore these 'supply' related assets. If the location seems to be an asset, it is highly probable that it is a supply related asset. 
-                            Assets that are mentioned in combination with 'supply' are not assets may be ignored since these are already mentioned elsewhere.
-
-                            Also, for each asset table be thorough in  what information to extract. 'Type of outlet' for example may be ignored if 'asset' is mentioned explicitly in the table.
-
-                            Return the data in the following format:
-
-                            {{ "assets" : [ {{ "asset_type" : "asset_type", "asset_location" : "asset_location", "asset_count" : "asset_count" }}, {{ "asset_type" : "asset_type", "asset_location  " : "asset_location", "asset_count" : "asset_count"  }}, ...] }}
-                            If multiples of assets are mentioned (like (6x Toilets	Main School)) then return each asset as a separate row, like
-                            {{ "assets" : [ {{ "asset_type" : "Toilets", "asset_location" : "Main School", "asset_count" : "6" }}, .... }}
-                            
-
-
-                            Only include assets if the asset type and location combination are explicitly mentioned. If the location in combination with the asset type is not explicitly mentioned, then ignore the asset. You cannot return an asset without a location.
-                            Only give the name of the location, nothing else. Be as specific as possible about the location.
-                            The location needs to be a physical location in a building. If mulitple scopes of locations are mentinioned, start with biggest scope and then combine with smaller scopes, connected with a hyphen.
-                            For example: "Main School - Kitchen - Toilets"
-
-                            For the asset count, the default value is 1, unless it is explicitly mentioned."""
-
-
-        prompt_known_if_assets_nederlands = """Hieronder staat een tabel geëxtraheerd uit een Excel bestand in CSV formaat.
-                            De tabel is onderdeel van een legionella risicobeoordeling. Onderzoek deze zorgvuldig.
-                            Je moet specifieke data uit de tabel halen indien aanwezig. De data waar je
-                            naar zoekt zijn specifieke assets. Assets zijn watergerelateerde apparatuur, zoals kranen, douches, doodlopende leidingen etc.
-                            De tabellen zijn geselecteerd door een mens, dus het is zeer waarschijnlijk dat ze assets bevatten. Houd hier rekening mee bij het onderzoeken van de tabel.
-                            De tabellen zijn echter geëxtraheerd uit pagina's, en één pagina kan meerdere tabellen bevatten.
-                            Het zou dus kunnen dat je een tabel onderzoekt van een pagina waar een andere tabel de assets bevatte.
-                            In dat geval moet je geen assets extraheren uit de tabel die je onderzoekt.
-
-                            Onderzoek eerst de tabelstructuur zorgvuldig.
-
-                            Extraheer vervolgens voor elk asset de volgende informatie:
-                            -Asset type (zoals kranen, douches, doodlopende leidingen, alles wat water/loodgieterswerk gerelateerd is etc)
-                            -Asset locatie (zoals Hoofdschool, etc)
-                            -Asset aantal (zoals 6x, 1x etc, zet hier alleen het nummer)
-
-                            Assets kunnen voedingsbronnen hebben of andere assets voeden, dus wees voorzichtig met assets die genoemd worden in combinatie met 'toevoer' en geen expliciete locatie hebben.
-                            Negeer deze 'toevoer' gerelateerde assets. Als de locatie een asset lijkt te zijn, is het zeer waarschijnlijk dat het een toevoer gerelateerde asset is.
-                            Assets die genoemd worden in combinatie met 'toevoer' zijn geen assets en mogen genegeerd worden aangezien deze al elders genoemd zijn.
-
-                            Wees ook voor elke asset tabel grondig in welke informatie je extraheert. 'Type tappunt' bijvoorbeeld mag genegeerd worden als 'asset' expliciet genoemd wordt in de tabel.
-
-                            Retourneer de data in het volgende formaat:
-
-                            {{ "assets" : [ {{ "asset_type" : "asset_type", "asset_location" : "asset_location", "asset_count" : "asset_count" }}, {{ "asset_type" : "asset_type", "asset_location" : "asset_location", "asset_count" : "asset_count" }}, ...] }}
-                            Als er meerdere assets genoemd worden (zoals (6x Toiletten Hoofdschool)) retourneer dan elk asset als een aparte rij, zoals
-                            {{ "assets" : [ {{ "asset_type" : "Toiletten", "asset_location" : "Hoofdschool", "asset_count" : "6" }}, .... }}
-
-                            Neem alleen assets op als de combinatie van asset type en locatie expliciet genoemd wordt. Als de locatie in combinatie met het asset type niet expliciet genoemd wordt, negeer dan het asset. Je kunt geen asset retourneren zonder locatie.
-                            Geef alleen de naam van de locatie, niets anders. Wees zo specifiek mogelijk over de locatie.
-                            De locatie moet een fysieke locatie in een gebouw zijn. Als er meerdere niveaus van locaties genoemd worden, begin dan met het grootste niveau en combineer met kleinere niveaus, verbonden met een koppelteken.
-                            Bijvoorbeeld: "Hoofdschool - Keuken - Toiletten"
-
-                            Voor het asset aantal is de standaardwaarde 1, tenzij het expliciet anders genoemd wordt."""
-        
-
-        # Two different prompts, one for known assets, one for unknown assets
-        if assets_known:
-            prompt_assets = prompt_known_if_assets
-        else:
-            prompt_assets = prompt_unknown_if_assets
-
-        prompt_english = f"""{prompt_assets}
-                            An asset can be any of the following (or a variation thereof) : 
-                                Above Ground Grease Separator
-                                Alternative techniques
-                                Anodic oxidation
-                                Asset Register
-                                Au bain marie
-                                Autoclave
-                                Automatic CV degasser
-                                Automatic filling unit
-                                Automatic flush valve
-                                Automatic flushing device
-                                Automatic solenoid
-                                Automatic sprinkler system
-                                Backwash filter
-                                Balancing valve
-                                Bar tap
-                                Baseboard integrated heater
-                                Basket strainer
-                                Bath mixer
-                                Bath thermostatic mixer
-                                Bath/shower combination mixer
-                                Bath/shower combination thermostatic mixer
-                                Bedpan washer
-                                Beer tap installation with tank cleaning installation
-                                Bib tap
-                                Bidet
-                                Bleed solenoid valve
-                                Blending valve
-                                Blowdown valve
-                                Boiling kettle
-                                Boiling water heater
-                                Boiling water tap
-                                Boot cleaner
-                                Borewell
-                                Breaktank
-                                Brominator
-                                Buffer vessel
-                                Buffer vessel with heater
-                                Buffer vessel with hot and cold storage
-                                Buffer vessel with plate heat exchanger
-                                Butler sink
-                                Bypass (cold water)
-                                Calorifier
-                                Canister demineralised water
-                                Chemical dosing pump
-                                Chemical dosing unit
-                                Chemical stock tank
-                                Chemical toilet
-                                Chemical water treatment
-                                Chilled water dispenser
-                                Chiller
-                                Coffee machine
-                                Cold water storage tank
-                                Combi boiler
-                                Combi steamer
-                                Combi water heater
-                                Condenser bleed tank
-                                Condenser pump
-                                Condenser pump strainer
-                                Conductivity meter
-                                config.components.Flexibletapconnector.name
-                                config.components.ldtestcoolingtowerdefault.name
-                                Cooling tower
-                                Cooling tower drain
-                                Copper-silver ionisation
-                                Crushed ice machine
-                                Cyclone
-                                Dead end (drinking water)
-                                Dead end (hot water)
-                                Deadleg
-                                Degasser
-                                Demineralised water
-                                Dental chair
-                                Direct gas fired heater
-                                Dishwasher
-                                Dosing pump
-                                Drain
-                                Drain valve
-                                Drift eliminator
-                                Drinking bowl
-                                Drinking water circulation pump
-                                Drinks Dispenser
-                                Duplicate pump set
-                                Electric shower
-                                Electric water heater
-                                Emergency eye wash
-                                Emergency eye wash & shower
-                                Emergency shower
-                                Evaporative condenser
-                                Expansion Automats
-                                Expansion vessel
-                                Fan
-                                Fill pack
-                                Filling loop tap
-                                Filling loop tap > 45kW
-                                Fine filter
-                                Fire
-                                Fire fighting system
-                                Fire hose reel
-                                Firehydrant
-                                Foot washbasin
-                                Fountain tap
-                                Fumehood
-                                Gas water heater
-                                Glass rinser
-                                Glass Rinser (Beer)
-                                Grease Separator Sludge Separator
-                                Hairdresser shower
-                                Hand shower
-                                Hand washbasin
-                                Heat Exchange Coils
-                                Heat pump
-                                Heating boiler
-                                Height adjustable bath
-                                High pressure cleaner
-                                High pressure cleaner
-                                Hose tap
-                                Hose Union Bib Tap
-                                Hot drinks machine
-                                Hot Water Circulation Pump
-                                Humidifier
-                                Ice cream dipper well
-                                Ice machine
-                                Ice maker
-                                Incoming mains
-                                Incubator
-                                Indirect fired heater
-                                Indirect fired heater with heater
-                                Indirect fired heater with hot and cold storage
-                                Indirect fired heater with plate heat exchanger
-                                Indirect fired heater with solar thermal collectors
-                                Industrial dishwasher
-                                Industrial washing machine
-                                Inline strainer
-                                Instantaneous water heater
-                                Instantaneous water heater (tankless)
-                                Intermediate meter
-                                Intermediate valve
-                                Intermediate water meter
-                                Kitchen spray outlet
-                                Kitchen tap
-                                Kitchen tap thermostatic
-                                Knee wash basin
-                                Laboratory mixer tap
-                                Laboratory tap
-                                Legionella Filter
-                                Level Signaler
-                                Low pressure mixer
-                                Main valve
-                                Make-up tank
-                                Manual Quick Fill
-                                Micro thermostatic mixer
-                                Micron filter
-                                Milk Frother
-                                Mixer tap
-                                Mixer valve
-                                Multifunctional (smart) faucet
-                                Open well
-                                Other - Air conditioning system
-                                Other - Industrial process water system
-                                Other - Spa/Pool/Jacuzzi
-                                Other - Water feature
-                                Outlet
-                                Outlet connection
-                                Oven spray
-                                Over Sink Heater
-                                Ozone generator
-                                pH meter
-                                Pipework
-                                Plate heat exchanger with heater
-                                Plate heat exchanger with hot and cold storage
-                                Plate heat exchanger with solar thermal collectors
-                                Plate heat exchanger without buffer vessel
-                                Point of use water heater
-                                Pool fill/supplement
-                                Post-mix installation
-                                Pre-rinse/wash spray tap
-                                Pressure booster with pressure vessel
-                                Pressure booster with pressureless reservoir
-                                Pressure booster with switch vessel
-                                Pressure booster with switch vessel and variable rotation-frequency
-                                Pressure booster without switch vessel and variable rotation-frequency
-                                Pressure regulating valve
-                                Pressurisation units for closed systems
-                                Principal return loop
-                                Process water
-                                Public drinking water outlet
-                                Quooker
-                                Rain water harvesting system
-                                Rain water harvesting tank
-                                Reduced Pressure Zone Valve
-                                Return pipe
-                                Reverse osmosis
-                                Roasting pan
-                                Sample point
-                                Sand filter
-                                Scale inhibitor
-                                Secondary Return Loop
-                                Sensor Outlet
-                                Separated fire hose reel installation
-                                Shower
-                                Shower mixer
-                                Shower mixer thermostatic
-                                Shower panel
-                                Sink
-                                Sink (thermostatic)
-                                Sink with knee operation
-                                Slop hopper
-                                Sludge Separator
-                                Soap Dispenser
-                                Soup machine
-                                Spray reel
-                                Sprinkler
-                                Stabilized Aqueous Ozone Generator
-                                Star tap
-                                Steamer
-                                Subordinate return loop
-                                Sump circulation pump
-                                Tap
-                                TapApplianceType.Bath
-                                TapApplianceType.SprayOutlet
-                                Tea point
-                                Terrain Pipe
-                                Tertiary Return Loop
-                                Thermostatic mixer valve
-                                Thermostatic mixing tap
-                                Toilet
-                                Ultrafiltration
-                                Under rinse tap
-                                Under Sink Heater
-                                Underground Grease Separator
-                                Underground water storage tank
-                                Urinal
-                                Utility sink
-                                UV light
-                                Valve
-                                Veg Prep Sink
-                                Wall Mounted Breaktank
-                                Washbasin
-                                Washbasin mixer
-                                Washbasin mixer thermostatic
-                                Washing machine
-                                Washing through
-                                Water booster
-                                Water booster - Double pump set
-                                Water booster - Quadruple pump set
-                                Water booster - Single pump set
-                                Water booster - Triple pump set
-                                Water cooler
-                                Water distribution system
-                                Water filter
-                                Water heater
-                                Water heaters
-                                Water Meter
-                                Water softener
-                                Water source
-                                Water treatment
-
-                                This is the CSV table:
-
-                                {df_string}         
-
-                                If there are empty values in the CSV this could also be due to formerly merged/split cells, as this CSV was extracted from an Excel file. 
-
-                                ONLY RETURN THE JSON, DO NOT RETURN ANYTHING ELSE.              """
-
-
-         # Two different prompts, one for known assets, one for unknown assets
-        if assets_known:
-            prompt_assets = prompt_known_if_assets_nederlands
-        else:
-            prompt_assets = prompt_unknown_if_assets_nederlands
-
-        prompt_nederlands = f"""{prompt_assets}
-                            Een asset kan een van de volgende zijn (of een variant daarvan) : 
-                            
-                                Leveringspunt
-                                Drukverhoger met schakelvat
-                                Drukverhoger met schakelvat en variabele rotatie-frequentie
-                                Drukverhoger zonder schakelvat en variabele rotatie-frequentie
-                                Drukverhoger met druk(voorraad)ketel
-                                Drukverhoger met drukloos hoogreservoir
-                                Dubbele pompset
-                                Waterreservoir
-                                Ontharder
-                                Omgekeerde osmose
-                                Gedemineraliseerd water
-                                Gede-mineraliseerd water
-                                Overig
-                                Doseerpomp
-                                Ultrafiltratie
-                                UV-licht
-                                Koper-zilver ionisatie
-                                Anodische oxidatie
-                                Koeltoren
-                                Combinatieboiler
-                                Voorraadvat
-                                Platenwisselaar met ketel
-                                Platen-wisselaar met ketel
-                                Platenwisselaar met zonnecollector
-                                Platen-wisselaar met zonnecollector
-                                Platenwisselaar met WKO
-                                Platen-wisselaar met WKO
-                                Warmtepomp
-                                Direct gestookte boiler
-                                Elektrische boiler
-                                Close-in boiler
-                                Close-up boiler
-                                Indirect gestookte boiler
-                                Indirect gestookte boiler met ketel
-                                Indirect gestookte boiler met zonnecollector
-                                Indirect gestookte boiler met platenwisselaar
-                                Indirect gestookte boiler met platen-wisselaar
-                                Indirect gestookte boiler met WKO
-                                Voorraadvat met platenwisselaar
-                                Voorraadvat met platen-wisselaar
-                                Voorraadvat met doorstroomtoestel
-                                Voorraadvat met doorstroom-toestel
-                                Voorraadvat met WKO
-                                Doorstroomtoestel
-                                Doorstroom-toestel
-                                Geiser
-                                Gasboiler
-                                Combiketel
-                                Platenwisselaar zonder voorraadvat
-                                Platen-wisselaar zonder voorraadvat
-                                Warmwaterbereider
-                                Warmwater-bereider
-                                Plintboiler
-                                Kokendwater-boiler
-                                Enkelvoudig circulatiesysteem
-                                Enkelvoudig circulatie-systeem
-                                Meervoudig circulatiesysteem
-                                Meervoudig circulatie-systeem
-                                Deelcirculatieleiding
-                                Deelcirculatie-leiding
-                                Meervoudige uittapleiding (warmwater)
-                                Mengwatersysteem
-                                Mengwater-systeem
-                                Circulerend mengwatersysteem
-                                Circulerend mengwater-systeem
-                                Drinkwaterringnet
-                                Enkelvoudige uittapleiding (warmwater)
-                                Hoofdleiding (warmwater)
-                                Hoofdleiding (drinkwater)
-                                Brandslanghaspel
-                                Terreinleiding met brandkranen
-                                Automatische sprinklerinstallatie
-                                Automatische sprinkler-installatie
-                                Gescheiden brandslanghaspel installatie
-                                Gescheiden brandslang-haspel installatie
-                                Sprinkler
-                                Enkelvoudige uittapleiding (drinkwater)
-                                Meervoudige uittapleiding (drinkwater)
-                                Suppletieleiding (drinkwater)
-                                Suppletie-leiding (drinkwater)
-                                Bypass (drinkwater)
-                                Verdeler (drinkwater)
-                                Dode leiding (drinkwater)
-                                Bad (mengkraan)
-                                Bedpanspoeler
-                                Bad (thermostatische mengkraan)
-                                Bidet
-                                CV-vulkraan
-                                Aanrecht (mengkraan)
-                                Aanrecht mengkraan
-                                Aanrecht (thermostatische mengkraan)
-                                Vaatwasser
-                                Nooddouche
-                                Oogdouche
-                                Tappunt
-                                Fontein
-                                Gevelkraan
-                                Handdouche
-                                Slangwartelkraan
-                                IJsmachine
-                                Mengkraan
-                                Mengventiel
-                                Douche
-                                Wastafel
-                                Slophopper
-                                Uitstortgootsteen
-                                Spuithaspel
-                                Knijpdouche
-                                Stoombevochtiger
-                                Toilet
-                                Urinoir
-                                Wasmachine
-                                Suppletie koeling
-                                Suppletie bevochtiger
-                                Suppletie naar leidinggroep
-                                Suppletie proceswater
-                                Keukenmengkraan
-                                Hoog/laagbad
-                                Aansluiting
-                                Koffieautomaat
-                                Douchemengkraan thermostatisch
-                                Tapkraan
-                                Voetenwasbak
-                                Wastrog
-                                Douchemengkraan
-                                Labkraan
-                                Labmengkraan
-                                Waterkoeler
-                                Hogedrukreiniger
-                                Reduceerventiel
-                                Dode leiding (warmwater)
-                                Bypass (warmwater)
-                                Suppletieleiding (warmwater)
-                                Suppletie-leiding (warmwater)
-                                Inregelventiel
-                                Sensorkraan
-                                Lagedrukmengkraan
-                                Steamer
-                                Industriële vaatwasser
-                                CV-vulkraan >45kW
-                                Kappersdouche
-                                Kappers-douche
-                                Luchtbevochtiger
-                                Lucht-bevochtiger
-                                Onderspoelkraan
-                                Onder-spoelkraan
-                                Glazenspoeler
-                                Industriële wasmachine
-                                Zuurkast
-                                Nood- & oogdouche
-                                Au bain-marie
-                                Zeepdoseersysteem
-                                Zeepdoseer-systeem
-                                Automatische spuiklep
-                                Quooker
-                                Soepautomaat
-                                Drankautomaat
-                                Drank-automaat
-                                Grof filter
-                                Fijn filter
-                                Hoofdafsluiter
-                                Tussenafsluiter
-                                Tussen-afsluiter
-                                Douchepaneel
-                                Niveausignalering
-                                Niveau-signalering
-                                Geleidbaarheidsmeter
-                                Geleidbaar-heidsmeter
-                                Spuiklep
-                                Circulatiepomp drinkwater
-                                Circulatie-pomp drinkwater
-                                Tussenwatermeter
-                                Brandkraan
-                                Kniewasbak
-                                Automatische spoelinrichting
-                                Break unit
-                                tapApplianceType.Break+unit.button.label
-                                Terugspoelfilter
-                                Terugspoel-filter
-                                Wasbak met kniebediening
-                                Handwasbak
-                                Zwembad vul/suppletie
-                                Warme drankenmachine
-                                Tandartsstoel
-                                Postmix installatie
-                                Laarzen reinigingstoestel
-                                Patroon Demiwater
-                                Pannenvulpunt
-                                Wastafelmengkraan
-                                Wastafel-mengkraan
-                                Crushedijs machine
-                                IJsblokjes machine
-                                Combi-steamer
-                                Kookketel
-                                Braadslede
-                                Thermostatisch mengventiel
-                                Mengventiel thermo.
-                                Expansieautomaat
-                                Expansie-automaat
-                                Tussenmeter
-                                Toevoer koud
-                                Toevoer warm
-                                Toevoerleiding
-                                Retourleiding
-                                Voedingsleiding
-                                Legionellafilter
-                                Legionella-filter
-                                Ontgasser
-                                Wastafel-mengkraan thermo
-                                Wastafel-mengkraan thermo.
-                                Keuken mengkraan thermo
-                                Keuken-mengkraan thermo.
-                                Micro thermostatisch mengtoestel
-                                Autoclaaf medisch sterilisatie instrument
-                                Autoclaaf
-                                Drinknippel(vee)
-                                Drinknippel (vee)
-                                Spoelkop(Bier)
-                                Spoelkop (Bier)
-                                Biertapinstallatie met fusten-reinigingsinstallatie
-                                Biertapinstallatie met fusten – reinigingsinstallatie
-                                Biertapinstallatie met tankreinigingsinstallatie
-                                Biertapinstallatie met tankreiniging installatie
-                                Automatische CV ontgasser
-                                Chemisch toilet
-                                Barkraan
-                                Afsluiter
-                                Drinkbak
-                                --NIET SELECTEREN-- Waterreservoir
-                                Automatische CV vulstation
-                                Automatisch CV vulstation
-                                Openbaar drinkwatertappunt
-                                Aftapper
-                                Automatisch C.V.-vulsysteem/ ontgasser
-                                Barspoelkraan
-                                Drankenautomaat
-                                Bidet/toilet met randspoeling en onderdouche
-                                Bidet / toilet met randspoeling en onderdouche
-                                Kokendwaterkraan
-                                Hose Union Bib Tap
-                                Melkopschuimer
-                                Melk Opschuimer
-                                Heetwaterafsluiter (fail-safe)
-                                Douchemengkraan thermostatisch met handdouche en regendouche
-                                Bad/douche combinatie (mengkraan)
-                                Bad/douche combinatie (thermostatische mengkraan)
-                                Breaktank
-                                Break tank
-                                --NIET SELECTEREN-- Koudwaterreservoir (UK)
-                                Voorspoeldouche
-                                Dode leiding
-                                Vulpunt CV - automatisch
-                                Verwarmingsboiler
-                                Ovenspray
-                                Expansievat
-                                Brandveiligheidssysteem
-                                Chemische waterbehandeling
-                                Waterkoelers
-                                Theepunt
-                                Water heater
-                                Groentewastafel
-                                Elektrische douche
-                                Drukverhoger - Enkele pompset
-                                Drukverhoger - dubbele pompset
-                                Drukverhoger - Drievoudige pompset
-                                Drukverhoger - Viervoudige pompset
-                                Koelwaterbassin
-                                Druppelafscheider
-                                Vulpakket
-                                Brominator
-                                Chemische doseerinstallatie
-                                Ozongenerator
-                                Incubator
-                                Afvoer koeltoren
-                                Waterdistributiesysteem
-                                Hydrocycloon
-                                Zandfilter
-                                Suppletietank
-                                Aftap condensatorpomp
-                                Filter condensatorpomp
-                                Condensatorpomp
-                                Bassincirculatiepomp
-                                Koeler (tegenstroomapparaat)
-                                Ventilator
-                                Monsternamepunt
-                                Aftap afsluiter
-                                Voorraadvat chemicaliën
-                                Chemicaliëndoseerpomp
-                                Automatische ontluchtingsklep
-                                Magneetklep
-                                Verdampingscondensator
-                                Andere - Airconditioningsysteem
-                                Anders - Wellness/Zwembad/Jacuzzi
-                                Anders - Industrieel proceswatersysteem
-                                Inline-filter
-                                Korffilter
-                                Boorput
-                                Open put
-                                Warmtewisselaars
-                                pH-meter
-                                Proceswater
-                                Anders - Fontein
-                                Sediment filter
-                                Elektrolytische ontkalker
-                                Waterfilter
-                                IJslepelbakje
-                                Multifunctionele (slimme) kraan
-                                Reinwaterkelder
-                                Opvangsysteem voor regenwater
-                                Opvangtank voor regenwater
-                                Directe waterverwarmer
-                                Tertiaire retour-lus
-                                Secundaire retour-lus
-                                Handmatig snel vullen
-                                Verminderde Drukventiel
-                                Bovengrondse vetafscheider
-                                Bovengrondse vetsplitter
-                                Ondergrondse vetafscheider
-                                Ondergrondse vetsplitter
-                                Vetafscheider Slipafscheider
-                                Slibafscheider
-                                Warm water circulatiepomp
-                                Terrein leiding
-                                Muur gemonteerde Breaktank
-                                Gestabiliseerde Aqueous Ozongenerator
-                                Sproei tappunt
-                                TapApplianceType.SprayOutlet.Button.Label
-                                TapApplianceType.Bath
-                                TapApplianceType.Bath.Button.Label
-                                Enkelvoudige Uittapleiding (Mengwater)
-                                Meervoudige uittapleiding (mengwater)
-                                Verdeelleiding
-                                Sluice
-                                Blusleiding
-                                Steam boiler
-                                Hoge druk tappunt
-                                Lage druk tappunt
-                                Indirect verwarmd voorraadvat met warmtepomp
-                                Warmtepomp boiler
-                                Douchemengkraan met handdouche en regendouche
-                                Waseenheid
-                                Gekoeld watersysteem
-                                Laag temperatuur warmwater
-                                Run-around warmtewisselaars
-                                Condenser systeem
-                                Medium temperatuur warmwater
-                                Hoog temperatuur warmwater
-                                Voeding en expansievat
-                                Hoofdtank
-                                Waterspeeltoestel
-                                Water speel toestel
-                                Bubbelbuis
-                                Sensor apparaat
-                                Drukventiel
-                                Wastafel met handwasunit
-                                Aanrecht met handwasunit
-                                Aanrecht
-
-                            This is the CSV table:
-
-                                {df_string}         
-
-                                Als er lege waarden in de CSV staan, kan dit ook komen door eerder samengevoegde/gesplitste cellen, aangezien deze CSV is geëxtraheerd uit een Excel bestand.
-
-                                GEEF ALLEEN DE JSON TERUG, GEEF NIETS ANDERS TERUG.              """
-
-        if language == 'english':
-            prompt = prompt_english
-        elif language == 'nederlands':
-            prompt = prompt_nederlands
-
-        # Cost: 0.001 
-        response = orq_client.deployments.invoke(
-            key="legionella-table-extraction-v2",
-            context={
-                "environments": []
-            },
-            metadata={
-                "page-number": sheet_name
-            }, 
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt},
-                    ],
-                }
-            ],
-        )
-
-        result_content = response.choices[0].message.content.strip()
-        #print(result_content)
-        
-        # Parse the JSON response
-        try:
-            data = json.loads(result_content)
-            assetsGPT = data.get("assets", [])
-        except json.JSONDecodeError as e:
-            print(f"JSON decoding failed with GPT: {e}")
-            assetsGPT = []
-
-        #if assetsGPT:
-
-        # Repeat with Sonnet 3.5
-        response = orq_client.deployments.invoke(
-            key="legionella-table-extraction-v2",
-            context={
-                "environments": [],
-                "model_choice": [
-                    "sonnet"
-                ]
-
-            },
-            metadata={
-                "page-number": sheet_name
-            }, 
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt},
-                    ],
-                }
-            ],
-        )
-
-        result_content = response.choices[0].message.content.strip()
-        # Parse the JSON response
-        try:
-            data = json.loads(result_content)
-            assetsSonnet = data.get("assets", [])
-
-            # Check if total assets and total number of assets are the same
-            total_assets_gpt = sum(int(asset["asset_count"]) for asset in assetsGPT)
-            total_assets_sonnet = sum(int(asset["asset_count"]) for asset in assetsSonnet)
-            if len(assetsGPT) == len(assetsSonnet) and total_assets_gpt == total_assets_sonnet:
-                flag = ""
+    if stitch_continuations:
+        sheet_count = len(dfs)
+        dfs = stitch_continuation_sheets(dfs)
+        logging.info(f"Stitched {sheet_count} sheets into {len(dfs)} tables")
+
+    # Create the output directory if it doesn't exist
+    output_dir = output_path
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Record the LLM calls in the caller's ledger, or in one of this run's own
+    run_ledger = current_ledger()
+    own_ledger = run_ledger is None
+    if own_ledger:
+        run_ledger = CallLedger()
+        run_ledger.open(os.path.join(output_dir, f"{file_name}-llm-ledger.jsonl"))
+    ledger_start = len(run_ledger)
+
+    # Compile the prompt once, only the CSV table differs per sheet
+    template = get_prompt_template(language, assets_known)
+    logging.info(f"Prompt size without table: ~{template.token_count} tokens")
+
+    if taxonomy_top_k:
+        # Build the retrieval index before the sheets start using it
+        get_taxonomy_index(language)
+
+    run_sheets = partial(process_sheets_isolated, assets_known=assets_known, language=language, use_cache=use_cache,
+                         taxonomy_top_k=taxonomy_top_k, compact_tables=compact_tables,
+                         collapse_repeats=collapse_repeats, escalation_threshold=escalation_threshold,
+                         fuzzy_consensus=fuzzy_consensus, packing_off=threading.Event())
+
+    sheets = list(dfs.items())
+    skipped = []
+    if prefilter_sheets:
+        matcher = get_asset_term_matcher()
+        skipped = [sheet_name for sheet_name, df in sheets if not matcher.matches_table(df)]
+        sheets = [(sheet_name, df) for sheet_name, df in sheets if sheet_name not in skipped]
+        logging.info(f"Skipped {len(skipped)} of {len(dfs)} sheets without asset terms")
+
+    local_assets = {}
+    if local_extraction:
+        for sheet_name, df in sheets:
+            assets = extract_register_assets(df, language)
+            if assets is not None:
+                local_assets[sheet_name] = assets
+        sheets = [(sheet_name, df) for sheet_name, df in sheets if sheet_name not in local_assets]
+        logging.info(f"Parsed {len(local_assets)} asset register sheets locally")
+
+    if reuse_header_roles:
+        with ledger_scope(run_ledger):
+            shared_assets = parse_shared_headers(sheets, language, use_cache=use_cache)
+        local_assets.update(shared_assets)
+        sheets = [(sheet_name, df) for sheet_name, df in sheets if sheet_name not in shared_assets]
+
+    if max_sheet_tokens:
+        # Oversized sheets become row chunks that keep the sheet's name
+        sheet_count = len(sheets)
+        sheets = [(sheet_name, chunk) for sheet_name, df in sheets for chunk in split_table(df, max_sheet_tokens)]
+        if len(sheets) > sheet_count:
+            logging.info(f"Split oversized sheets into {len(sheets) - sheet_count} extra chunks")
+
+    # One request per sheet, or per pack of small sheets
+    if pack_small_sheets:
+        tasks = plan_sheet_packs(sheets, pack_token_budget, compact_tables=compact_tables, collapse_repeats=collapse_repeats)
+        logging.info(f"Packed {len(sheets)} sheets into {len(tasks)} requests")
+    else:
+        tasks = [[sheet] for sheet in sheets]
+
+    # Checkpoint every finished request, and pick up the ones an earlier run finished
+    journal = SheetJournal(os.path.join(output_dir, f"{file_name}-journal.jsonl"), {
+        'assets_known': assets_known, 'language': language, 'taxonomy_top_k': taxonomy_top_k,
+        'compact_tables': compact_tables, 'collapse_repeats': collapse_repeats,
+        'escalation_threshold': escalation_threshold, 'fuzzy_consensus': fuzzy_consensus,
+    })
+    finished = journal.load() if resume else {}
+    journal.start(resume=resume)
+    task_keys = [task_key(task) for task in tasks]
+    task_results = [finished.get(key) for key in task_keys]
+    if resume:
+        logging.info(f"Resuming: {sum(result is not None for result in task_results)} of {len(tasks)} requests already done")
+
+    def checkpoint(i, results):
+        task_results[i] = results
+        if not any(df['flag'].astype(str).str.startswith(FAILED_FLAG).any() for df, _ in results.values()):
+            journal.record(task_keys[i], results)
+
+    # Process each sheet, concurrently if more than one worker is allowed
+    pending = [i for i, result in enumerate(task_results) if result is None]
+    try:
+        with ledger_scope(run_ledger):
+            if max_workers > 1:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = {submit_in_context(executor, run_sheets, tasks[i]): i for i in pending}
+                    for future in as_completed(futures):
+                        checkpoint(futures[future], future.result())
             else:
-                flag = "Check"
-
-            print(flag)
-
-            if flag == "Check":
-                check_counter += 1
-
-            # # Check if results are the same
-            # # Check in here because Sonnet cannot adhere to JSON Schema
-            # response = orq_client.deployments.invoke(
-            #     key="legionella-table-extraction-v2",
-            #     context={
-            #         "environments": [],
-            #         "model_choice": [
-            #             "4oCompare"
-            #         ]
-
-            #     },
-            #     metadata={
-            #         "page-number": sheet_name
-            #     }, 
-            #     messages=[
-            #         {
-            #             "role": "user",
-            #             "content": [
-            #                 {
-            #                     "type": "text",
-            #                     "text": f"""Below are two lists of assets. They are both structured like:
-                                
-            #                     {{ "assets" : [ {{ "asset_type" : "asset_type", "asset_location" : "asset_location", "asset_count" : "asset_count" }}, {{ "asset_type" : "asset_type", "asset_location  " : "asset_location", "asset_count" : "asset_count"  }}, ...] }}
-            #                     If multiples of assets are mentioned (like (6x Toilets	Main School)) then return each asset as a separate row, like
-            #                     {{ "assets" : [ {{ "asset_type" : "Toilets", "asset_location" : "Main School", "asset_count" : "6" }}, .... }} 
-                                
-            #                     Compare the two lists and determine if they are the same. The order does not matter. If the naming is slightly different,
-            #                     it is also not a problem. Most important is that the number of assets are the same.
-
-            #                     List 1: 
-            #                     {assetsGPT}
-
-            #                     List 2: 
-            #                     {assetsSonnet}
-
-            #                     If the lists are the same, return True. If they are not the same, return False. Do not reply with anything else.
-            #                     """},
-            #             ],
-            #         }
-            #     ],
-            # )
-
-            # result_content = response.choices[0].message.content.strip()
-            # print(result_content)
-            # if result_content == "True":
-            #     flag = ""
-            # else:
-            #     flag = "Check"
-            # Create the output directory if it doesn't exist
-
-
-            # Create the output directory if it doesn't exist
-            output_dir = output_path
-            os.makedirs(output_dir, exist_ok=True)
-
-            # Special case: If assetsSonnet is empty and assetsGPT is not empty, then still make a row 
-            # with flag = "Check". Sonnet is better than 4o-mini, but we want to manually check
-            if (len(assetsSonnet) == 0) & (len(assetsGPT) > 0):
-                new_row = pd.DataFrame({
-                        'asset_type': [""],
-                        'asset_location': [""],
-                        'asset_count': [""],
-                        'sheet_name': [sheet_name],
-                        'flag': ["Sonnet assumed no assets, GPT did assume assets"]
-                })
-                df_assets = pd.concat([df_assets, new_row], ignore_index=True)
-            
-            else: 
-                # Convert assets list to DataFrame
-                for asset in assetsSonnet:
-                    #for asset_type, asset_location in asset.items():
-                    asset_type_ = asset["asset_type"]
-                    asset_location_ = asset["asset_location"]
-                    asset_count_ = asset["asset_count"]
-                    flag_ = flag
-                    new_row = pd.DataFrame({
-                        'asset_count': [asset_count_],
-                        'asset_type': [asset_type_],
-                        'asset_location': [asset_location_],
-                        'sheet_name': [sheet_name],
-                        'flag': [flag_]
-                    })
-                    df_assets = pd.concat([df_assets, new_row], ignore_index=True)
-
-            # Don't go on to registering GPT's assets
-            continue
-
-
-        except json.JSONDecodeError as e:
-            print(f"JSON decoding failed with Sonnet 3.5: {e}")
-            assetsSonnet = []
-            flag = "Check, Sonnet failed"
-
-        # TODO: also include LLama
-
-    #print(result_content)
-
-    
-        # Create the output directory if it doesn't exist
-        output_dir = output_path
-        os.makedirs(output_dir, exist_ok=True)
-
-        # Convert assets list to DataFrame
-        for asset in assetsGPT:
-            #for asset_type, asset_location in asset.items():
-            asset_type_ = asset["asset_type"]
-            asset_location_ = asset["asset_location"]
-            asset_count_ = asset["asset_count"]
-            flag_ = flag
-            new_row = pd.DataFrame({
-                'asset_count': [asset_count_],
-                'asset_type': [asset_type_],
-                'asset_location': [asset_location_],
-                'sheet_name': [sheet_name],
-                'flag': [flag_]
-            })
-            df_assets = pd.concat([df_assets, new_row], ignore_index=True)
+                for i in pending:
+                    checkpoint(i, run_sheets(tasks[i]))
+    finally:
+        if own_ledger:
+            run_ledger.close()
+
+    # Assemble in the original sheet and chunk order, independent of completion order
+    sheet_parts = {sheet_name: [] for sheet_name in dfs}
+    for sheet_name in skipped:
+        sheet_parts[sheet_name].append((flag_row(sheet_name, SKIPPED_FLAG), False))
+    for sheet_name, assets in local_assets.items():
+        # A local parse is deterministic, so it stands in for both models
+        sheet_parts[sheet_name].append(assets_to_dataframe(sheet_name, assets, assets, fuzzy_consensus=fuzzy_consensus))
+    for results in task_results:
+        for sheet_name, result in results.items():
+            sheet_parts[sheet_name].append(result)
+    df_assets = pd.concat([df for parts in sheet_parts.values() for df, _ in parts], ignore_index=True) if dfs else AssetRecords().to_dataframe()
+    check_counter = sum(any(checked for _, checked in parts) for parts in sheet_parts.values())
 
     logging.info(f'Number of checks: {check_counter}')
+    if prefilter_sheets:
+        logging.info(f'Number of skipped sheets: {len(skipped)}')
     logging.info(f'Number of assets: {len(df_assets)}')
+    log_summary(run_ledger.records[ledger_start:], f"LLM calls for {file_name}")
+
+    # Canonical taxonomy type of every row, so later grouping and comparison work on integer IDs
+    df_assets = df_assets.join(get_canonical_index(language).canonical_columns(df_assets['asset_type']))
 
     # Save in output/3-ExcelToData
     df_assets.to_excel(os.path.join(output_dir, f"{file_name}-assets-data.xlsx"), index=False)
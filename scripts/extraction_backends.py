@@ -0,0 +1,182 @@
+import io
+import logging
+import os
+import time
+
+import pandas as pd
+
+# Estimated cost per PDF page in USD, used for the benchmark reports.
+# Adobe bills per ExportPDF transaction (one per page, as we split the PDF),
+# Textract per page with the TABLES feature, Azure per page of the Read model.
+COST_PER_PAGE = {
+    'adobe': 0.05,
+    'textract': 0.015,
+    'azure': 0.0015,
+}
+
+
+def workbook_path(output_path, file_name):
+    """Path of the per-page table workbook that process_excel_file reads."""
+    return os.path.join(output_path, f'{file_name}-pdf-extract.xlsx')
+
+
+def count_pdf_pages(pdf_path):
+    import PyPDF2
+
+    with open(pdf_path, 'rb') as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+class ExtractionBackend:
+    """
+    Common interface for the table extraction engines.
+
+    A backend reads '{input_path}{file_name}-filtered-pages.pdf' and writes the
+    per-page table workbook '{output_path}{file_name}-pdf-extract.xlsx', with one
+    sheet per page or table, so every engine can feed process_excel_file.
+    """
+
+    name = None
+
+    @property
+    def cost_per_page(self):
+        return COST_PER_PAGE.get(self.name, 0.0)
+
+    def input_pdf_path(self, file_name, input_path):
+        input_pdf_path = f'{input_path}{file_name}-filtered-pages.pdf'
+        if not os.path.exists(input_pdf_path):
+            error_msg = f"Input PDF file not found: {input_pdf_path}"
+            logging.error(error_msg)
+            raise FileNotFoundError(error_msg)
+        return input_pdf_path
+
+    def extract(self, file_name, input_path, output_path):
+        """Write the table workbook and return its path."""
+        raise NotImplementedError
+
+
+class AdobeBackend(ExtractionBackend):
+    """Adobe ExportPDF, one export job per page (ExportPDFToExcel)."""
+
+    name = 'adobe'
+
+    def extract(self, file_name, input_path, output_path):
+        from scripts.pdf_to_excel import ExportPDFToExcel
+
+        processor = ExportPDFToExcel()
+        processor.process(file_name=file_name, input_path=input_path, output_path=output_path)
+        return workbook_path(output_path, file_name)
+
+
+class TextractBackend(ExtractionBackend):
+    """Amazon Textract table analysis on a PDF uploaded to S3."""
+
+    name = 'textract'
+
+    def __init__(self, bucket=None):
+        self.bucket = bucket
+
+    def extract(self, file_name, input_path, output_path):
+        import streamlit as st
+        from scripts.textract_table_extractor import upload_to_s3, extract_tables_from_pdf
+
+        input_pdf_path = self.input_pdf_path(file_name, input_path)
+        bucket = self.bucket or st.secrets["AWS_S3_BUCKET"]
+
+        with open(input_pdf_path, 'rb') as f:
+            upload = io.BytesIO(f.read())
+        upload.name = os.path.basename(input_pdf_path)
+
+        document = upload_to_s3(upload, bucket)
+        if not document:
+            raise RuntimeError(f"Failed to upload {input_pdf_path} to S3")
+
+        tables = extract_tables_from_pdf(bucket, document)
+        if not tables:
+            raise RuntimeError("No tables were extracted by Textract")
+
+        os.makedirs(output_path, exist_ok=True)
+        output_file = workbook_path(output_path, file_name)
+        with pd.ExcelWriter(output_file, engine='xlsxwriter') as writer:
+            for i, table in enumerate(tables, 1):
+                # First row of a Textract table is the header row
+                df = pd.DataFrame(table[1:], columns=table[0]) if len(table) > 1 else pd.DataFrame(table)
+                df.to_excel(writer, sheet_name=f'table_{i}', index=False)
+
+        logging.info(f"Wrote {len(tables)} Textract tables to {output_file}")
+        return output_file
+
+
+class AzureReadBackend(ExtractionBackend):
+    """
+    Azure Form Recognizer Read OCR.
+
+    Read returns text lines only; the LLM table structuring in process_pdf_pages
+    is disabled, so each page is written as a single-column sheet of OCR lines
+    and the structuring is left to the LLM stage of process_excel_file.
+    """
+
+    name = 'azure'
+
+    def __init__(self, endpoint=None, key=None):
+        self.endpoint = endpoint or os.environ.get("AZURE_FORM_RECOGNIZER_ENDPOINT")
+        self.key = key or os.environ.get("AZURE_FORM_RECOGNIZER_KEY")
+
+    def extract(self, file_name, input_path, output_path):
+        from scripts.pdf_processor import extract_text_from_pdf
+
+        if not self.endpoint or not self.key:
+            raise ValueError("AZURE_FORM_RECOGNIZER_ENDPOINT and AZURE_FORM_RECOGNIZER_KEY must be set in environment variables")
+
+        input_pdf_path = self.input_pdf_path(file_name, input_path)
+        result = extract_text_from_pdf(input_pdf_path, self.endpoint, self.key)
+
+        os.makedirs(output_path, exist_ok=True)
+        output_file = workbook_path(output_path, file_name)
+        with pd.ExcelWriter(output_file, engine='xlsxwriter') as writer:
+            for page in result.pages:
+                df = pd.DataFrame({'text': [line.content for line in page.lines]})
+                df.to_excel(writer, sheet_name=f'page_{page.page_number}', index=False)
+
+        logging.info(f"Wrote {len(result.pages)} OCR pages to {output_file}")
+        return output_file
+
+
+BACKENDS = {
+    'adobe': AdobeBackend,
+    'textract': TextractBackend,
+    'azure': AzureReadBackend,
+}
+
+
+def get_backend(name, **kwargs):
+    """Instantiate the extraction backend registered under name."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown extraction backend '{name}', choose from {sorted(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
+
+
+def run_backend(backend, file_name, input_path, output_path):
+    """
+    Run a backend and time it.
+
+    Returns:
+        dict: backend name, page count, total and per-page latency (s),
+        throughput (pages/s) and estimated cost (USD)
+    """
+    pages = count_pdf_pages(backend.input_pdf_path(file_name, input_path))
+
+    start = time.perf_counter()
+    output_file = backend.extract(file_name, input_path, output_path)
+    latency = time.perf_counter() - start
+
+    return {
+        'backend': backend.name,
+        'file_name': file_name,
+        'output_file': output_file,
+        'pages': pages,
+        'latency_s': latency,
+        'latency_per_page_s': latency / pages if pages else 0.0,
+        'pages_per_s': pages / latency if latency > 0 else 0.0,
+        'cost_usd': pages * backend.cost_per_page,
+    }
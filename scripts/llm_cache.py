@@ -0,0 +1,139 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+DEFAULT_CACHE_DIR = os.environ.get("LLM_CACHE_DIR", "./.cache/llm-responses")
+
+
+def make_cache_key(deployment_key, model_choice, prompt):
+    """Hash of the deployment, the model routing and the fully rendered prompt."""
+    digest = hashlib.sha256()
+    for part in (deployment_key, model_choice or "", prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Disk-backed cache of LLM replies, one JSON file per prompt.
+
+    Entries older than ttl_seconds are ignored and removed on read; when more than
+    max_entries are stored the least recently written ones are evicted, down to
+    evict_to of max_entries. Writes go through a temporary file and os.replace, so
+    concurrent sheets can share a cache.
+
+    The directory is only listed on the first write and when an eviction is due:
+    in between, the writes keep an approximate count of the entries. Entries
+    written by other processes are not counted until the next listing.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl_seconds=30 * 24 * 3600, max_entries=20000, evict_to=0.9):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.evict_to = evict_to
+        self._count = None
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached reply for key, or None if missing or expired."""
+        entry = self.get_entry(key)
+        return entry.get("content") if entry is not None else None
+
+    def get_entry(self, key):
+        """Return the cached entry for key, with the reply and any extra fields, or None."""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if self.ttl_seconds is not None and time.time() - entry.get("created", 0) > self.ttl_seconds:
+            self._remove(path)
+            self._add_count(-1)
+            return None
+
+        return entry
+
+    def set(self, key, content, **fields):
+        """Store a reply, with optional extra JSON fields such as its confidence."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {"created": time.time(), "content": content, **fields}
+
+        path = self._path(key)
+        is_new = not os.path.exists(path)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        if self.max_entries is None:
+            return
+        with self._lock:
+            if self._count is None:
+                self._count = len(self._list_entries())
+            elif is_new:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict(int(self.max_entries * self.evict_to))
+
+    def evict(self):
+        """Drop the oldest entries until at most max_entries remain."""
+        if self.max_entries is None:
+            return
+        with self._lock:
+            self._evict(self.max_entries)
+
+    def _evict(self, target):
+        files = self._list_entries()
+        self._count = len(files)
+        if len(files) <= self.max_entries:
+            return
+
+        files.sort(key=self._mtime)
+        for entry in files[:len(files) - target]:
+            self._remove(entry.path)
+        self._count = target
+        logging.info(f"Evicted {len(files) - target} entries from LLM cache {self.cache_dir}")
+
+    def _list_entries(self):
+        try:
+            return [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".json")]
+        except OSError:
+            return []
+
+    def _add_count(self, delta):
+        with self._lock:
+            if self._count is not None:
+                self._count = max(self._count + delta, 0)
+
+    def clear(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for entry in os.scandir(self.cache_dir):
+            self._remove(entry.path)
+        with self._lock:
+            self._count = 0
+
+    @staticmethod
+    def _mtime(entry):
+        try:
+            return entry.stat().st_mtime
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,173 @@
+"""
+Ledger of the LLM calls of a run.
+
+invoke_deployment records every Orq call: deployment, model choice, sheet or
+page, latency, input/output tokens and an estimated cost. Records are kept in
+memory for the summaries and, once a ledger file is opened, appended to it as
+JSON lines as they happen.
+
+Every run has a CallLedger of its own, made current with ledger_scope, so
+concurrent runs (e.g. two Streamlit sessions) do not share records or files.
+Calls made outside a ledger_scope are not recorded.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from scripts.prompts import estimate_tokens
+
+# USD per million input and output tokens of the model choices of the deployments.
+# The deployments' default model is GPT-4o mini.
+MODEL_PRICES = {
+    'default': (0.15, 0.60),
+    'sonnet': (3.00, 15.00),
+}
+
+
+def message_text(messages):
+    """Text parts of the messages sent to a deployment; images are not counted."""
+    return ''.join(part.get('text', '') for message in messages or [] for part in message.get('content', [])
+                   if isinstance(part, dict) and part.get('type') == 'text')
+
+
+def response_tokens(response, messages):
+    """
+    Input and output tokens of a call, from the response's usage if the deployment
+    reports it, otherwise estimated from the text.
+
+    Returns:
+        Tuple of (input tokens, output tokens, whether they are estimated)
+    """
+    usage = getattr(response, 'usage', None)
+    input_tokens = getattr(usage, 'prompt_tokens', None)
+    output_tokens = getattr(usage, 'completion_tokens', None)
+    if input_tokens is not None and output_tokens is not None:
+        return input_tokens, output_tokens, False
+
+    content = response.choices[0].message.content or '' if response is not None else ''
+    return estimate_tokens(message_text(messages)), estimate_tokens(content), True
+
+
+def estimate_cost(model_choice, input_tokens, output_tokens):
+    input_price, output_price = MODEL_PRICES.get(model_choice or 'default', MODEL_PRICES['default'])
+    return (input_tokens * input_price + output_tokens * output_price) / 1e6
+
+
+class CallLedger:
+    """Thread-safe list of call records, optionally streamed to a JSONL file."""
+
+    def __init__(self):
+        self.records = []
+        self.path = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.records)
+
+    def open(self, path):
+        """Start streaming records to a new ledger file."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._lock:
+            self.path = path
+            open(path, 'w').close()
+        logging.info(f"Writing LLM call ledger to {path}")
+
+    def close(self):
+        """Stop streaming records to the ledger file; the records stay in memory."""
+        with self._lock:
+            self.path = None
+
+    def record(self, key, model_choice, page, latency_s, attempts, response=None, messages=None, error=None):
+        input_tokens, output_tokens, estimated = response_tokens(response, messages) if error is None else (
+            estimate_tokens(message_text(messages)), 0, True)
+        entry = {
+            'time': time.time(),
+            'deployment': key,
+            'model_choice': model_choice or 'default',
+            'page': None if page is None else str(page),
+            'latency_s': round(latency_s, 3),
+            'attempts': attempts,
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'tokens_estimated': estimated,
+            'cost_usd': round(estimate_cost(model_choice, input_tokens, output_tokens), 6),
+            'error': None if error is None else str(error),
+        }
+        with self._lock:
+            self.records.append(entry)
+            if self.path:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+# Ledger of the run in progress, None outside a run
+_run_ledger = contextvars.ContextVar('llm_ledger', default=None)
+
+
+def current_ledger():
+    """The CallLedger of the run in progress, or None."""
+    return _run_ledger.get()
+
+
+@contextmanager
+def ledger_scope(ledger):
+    """
+    Record the calls made inside in ledger.
+
+    Threads that do calls for the run must be started with
+    orq_invoke.submit_in_context to record in the same ledger.
+    """
+    token = _run_ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _run_ledger.reset(token)
+
+
+def summarize(records, top=5):
+    """
+    Spend and latency of the calls, per deployment and model, and the costliest pages.
+
+    Returns:
+        Tuple of (per deployment/model DataFrame, top pages by cost DataFrame)
+    """
+    df = pd.DataFrame(records)
+    if df.empty:
+        return df, df
+
+    df['failed'] = df['error'].notna()
+    by_call = df.groupby(['deployment', 'model_choice']).agg(
+        calls=('latency_s', 'size'),
+        failed=('failed', 'sum'),
+        retries=('attempts', lambda attempts: int((attempts - 1).sum())),
+        p50_latency_s=('latency_s', 'median'),
+        p95_latency_s=('latency_s', lambda latency: latency.quantile(0.95)),
+        max_latency_s=('latency_s', 'max'),
+        input_tokens=('input_tokens', 'sum'),
+        output_tokens=('output_tokens', 'sum'),
+        cost_usd=('cost_usd', 'sum'),
+    ).reset_index()
+
+    by_page = df.groupby('page', dropna=False).agg(
+        calls=('latency_s', 'size'),
+        latency_s=('latency_s', 'sum'),
+        max_latency_s=('latency_s', 'max'),
+        cost_usd=('cost_usd', 'sum'),
+    ).sort_values('cost_usd', ascending=False).head(top).reset_index()
+    return by_call, by_page
+
+
+def log_summary(records, title):
+    by_call, by_page = summarize(records)
+    if by_call.empty:
+        logging.info(f"{title}: no LLM calls")
+        return
+    logging.info(f"{title}: {int(by_call['calls'].sum())} LLM calls, ~${by_call['cost_usd'].sum():.4f}\n"
+                 + by_call.to_string(index=False))
+    logging.info("Costliest sheets/pages:\n" + by_page.to_string(index=False))
@@ -0,0 +1,200 @@
+"""
+Orq deployment calls with retries.
+
+Every deployments.invoke goes through invoke_deployment, which retries
+transient failures (timeouts, connection errors, 429 and 5xx) with capped
+exponential backoff and jitter. Each deployment has its own timeout and
+attempt limit, and all calls of a run share a retry budget, so an outage
+does not turn into a retry storm. A run (one process_excel_file call, one
+pass over a PDF's pages) starts with a full budget, see with_retry_budget.
+"""
+import contextvars
+import inspect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache, wraps
+
+from tenacity import (Retrying, before_sleep_log, retry_if_exception, stop_after_attempt, stop_after_delay,
+                      wait_exponential_jitter)
+
+from scripts.llm_ledger import current_ledger
+
+# HTTP statuses worth another attempt
+TRANSIENT_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+@dataclass(frozen=True)
+class DeploymentPolicy:
+    """Timeout and retry limits of one deployment."""
+    timeout_ms: int = 60000
+    max_attempts: int = 4
+    max_total_s: float = 300
+    backoff_initial_s: float = 1
+    backoff_max_s: float = 30
+
+
+DEPLOYMENT_POLICIES = {
+    "legionella-table-extraction-v2": DeploymentPolicy(timeout_ms=120000, max_attempts=4, max_total_s=600),
+    "legionella-table-evaluate": DeploymentPolicy(timeout_ms=30000, max_attempts=3),
+    "legionella-table-size": DeploymentPolicy(timeout_ms=30000, max_attempts=3),
+}
+
+DEFAULT_POLICY = DeploymentPolicy()
+
+
+class RetryBudget:
+    """Number of retries all calls may still spend together; thread safe."""
+
+    def __init__(self, max_retries):
+        self.remaining = max_retries
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Spend one retry, returning False if the budget is used up."""
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+def default_retry_budget():
+    """A full retry budget of ORQ_RETRY_BUDGET retries, default 50."""
+    return RetryBudget(int(os.environ.get("ORQ_RETRY_BUDGET", 50)))
+
+
+# Retry budget of the run in progress, None outside a run
+_run_budget = contextvars.ContextVar("retry_budget", default=None)
+
+
+@contextmanager
+def retry_budget_scope(budget=None):
+    """
+    Let the calls made inside share one retry budget, default a full one.
+
+    The budget is held in a context variable, so concurrent runs (e.g. two
+    Streamlit sessions) each have their own. Threads that do calls for the run
+    must be started with submit_in_context.
+    """
+    budget = budget or default_retry_budget()
+    token = _run_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _run_budget.reset(token)
+
+
+def with_retry_budget(function):
+    """Give every call of function a retry budget of its own, see retry_budget_scope."""
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        with retry_budget_scope():
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def submit_in_context(executor, function, *args, **kwargs):
+    """executor.submit, running function in a copy of the caller's context so it keeps the run's budget."""
+    return executor.submit(contextvars.copy_context().run, function, *args, **kwargs)
+
+
+@lru_cache(maxsize=None)
+def get_orq_client():
+    """
+    The process' Orq client, built on first use.
+
+    Importing the SDK and reading the key is deferred to the first LLM call, so
+    modules that call deployments import without credentials. ORQ_SERVER_URL
+    points the client at another server, e.g. the local scripts.orq_standin.
+
+    Raises:
+        ValueError: If ORQ_API_KEY is not set
+    """
+    from dotenv import load_dotenv
+    from orq_ai_sdk import Orq
+
+    load_dotenv()
+    api_key = os.environ.get("ORQ_API_KEY")
+    if not api_key:
+        logging.error("ORQ API key is missing from environment variables")
+        raise ValueError("ORQ_API_KEY must be set in environment variables")
+    return Orq(api_key=api_key, server_url=os.environ.get("ORQ_SERVER_URL"))
+
+
+def is_transient(exception):
+    """Whether a failed call may succeed when tried again."""
+    if isinstance(exception, (TimeoutError, ConnectionError)):
+        return True
+    status_code = getattr(exception, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(exception, "response", None), "status_code", None)
+    if status_code is not None:
+        return status_code in TRANSIENT_STATUS_CODES
+    # httpx's transport errors (ReadTimeout, ConnectError, ...) without importing httpx
+    return any(cls.__name__ in ("TransportError", "TimeoutException") for cls in type(exception).__mro__)
+
+
+def _accepts_timeout(invoke):
+    try:
+        return "timeout_ms" in inspect.signature(invoke).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def invoke_deployment(client, key, budget=None, **invoke_kwargs):
+    """
+    client.deployments.invoke(key=key, **invoke_kwargs), retried on transient failures.
+
+    Args:
+        client: Orq client
+        key (str): Deployment key, selects the DeploymentPolicy
+        budget (RetryBudget): Shared retry budget. Default the budget of the current
+            run, or a full budget for this call alone outside a run.
+        **invoke_kwargs: context, metadata, messages, ... of deployments.invoke
+
+    Returns:
+        The deployment's response
+
+    Raises:
+        The last exception, once the attempts, the time limit or the budget run out
+
+    Every call, failed or not, is recorded in the ledger of the run (llm_ledger.current_ledger).
+    """
+    policy = DEPLOYMENT_POLICIES.get(key, DEFAULT_POLICY)
+    budget = budget or _run_budget.get() or default_retry_budget()
+    invoke = client.deployments.invoke
+    if _accepts_timeout(invoke):
+        invoke_kwargs.setdefault("timeout_ms", policy.timeout_ms)
+
+    def budget_spent(retry_state):
+        if not budget.take():
+            logging.warning(f"Retry budget spent, not retrying {key}")
+            return True
+        return False
+
+    retrying = Retrying(
+        retry=retry_if_exception(is_transient),
+        stop=stop_after_attempt(policy.max_attempts) | stop_after_delay(policy.max_total_s) | budget_spent,
+        wait=wait_exponential_jitter(initial=policy.backoff_initial_s, max=policy.backoff_max_s),
+        before_sleep=before_sleep_log(logging.getLogger(__name__), logging.WARNING),
+        reraise=True,
+    )
+    model_choice = ((invoke_kwargs.get("context") or {}).get("model_choice") or [None])[0]
+    page = (invoke_kwargs.get("metadata") or {}).get("page-number")
+    ledger = current_ledger()
+    start = time.perf_counter()
+    try:
+        response = retrying(invoke, key=key, **invoke_kwargs)
+    except Exception as e:
+        if ledger is not None:
+            ledger.record(key, model_choice, page, time.perf_counter() - start,
+                          retrying.statistics.get("attempt_number", 1), messages=invoke_kwargs.get("messages"), error=e)
+        raise
+    if ledger is not None:
+        ledger.record(key, model_choice, page, time.perf_counter() - start, retrying.statistics.get("attempt_number", 1),
+                      response=response, messages=invoke_kwargs.get("messages"))
+    return response
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Orq deployments API, for offline load and behaviour tests.
+
+Serves POST /v2/deployments/invoke like Orq does, so the real SDK clients can be
+pointed at it with the ORQ_SERVER_URL environment variable:
+
+    python -m scripts.orq_standin --port 8765 --latency-median-ms 800 --error-rate 0.05
+    ORQ_SERVER_URL=http://localhost:8765 ORQ_API_KEY=offline python auto_process_pdfs.py --input-folder ./pdfs
+
+A request is answered with the recorded reply for the same deployment, model
+choice and prompt if the replay folder has one (the LLM response cache folder
+holds exactly these recordings), and otherwise with a synthesized reply that
+fits the deployment: an assets JSON built from the CSV table for the table
+extraction, 'True'/'False' for the table evaluation and '[columns]x[rows]' for
+the table size. Latencies are drawn from a lognormal distribution and a share
+of the requests fails with 429/5xx, all from a seeded generator. GET /stats
+returns the request counts and the peak number of concurrent requests.
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scripts.llm_cache import LLMResponseCache, make_cache_key, DEFAULT_CACHE_DIR
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+INVOKE_PATH = '/v2/deployments/invoke'
+TABLE_MARKER = 'This is the CSV table:'
+
+# Model reported for the model choices of the deployments
+MODELS = {
+    None: ('gpt-4o-mini', 'openai'),
+    'sonnet': ('claude-3-5-sonnet', 'anthropic'),
+}
+
+
+@dataclass
+class StandinConfig:
+    latency_median_ms: float = 500
+    latency_sigma: float = 0.5
+    error_rate: float = 0.0
+    table_rate: float = 0.5
+    replay_dir: str = DEFAULT_CACHE_DIR
+    seed: int = 0
+
+
+def prompt_text(messages):
+    """Text of the user messages of a request."""
+    parts = []
+    for message in messages or []:
+        content = message.get('content')
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(part.get('text', '') for part in content or [] if part.get('type') == 'text')
+    return ''.join(parts)
+
+
+def table_rows(prompt):
+    """
+    (sheet name, non-empty cells) of every data row of the prompt's CSV tables.
+
+    A packed prompt has its instructions after TABLE_MARKER and a 'Sheet: <name>'
+    line before every table; the instructions are skipped and the rows tagged
+    with the sheet of the preceding line. The first row of every table is its
+    header and is skipped too.
+    """
+    table = prompt.rsplit(TABLE_MARKER, 1)[-1]
+    first_sheet = re.search(r'^Sheet: ', table, re.MULTILINE)
+    if first_sheet:
+        table = table[first_sheet.start():]
+
+    sheet_name, header_seen = None, False
+    for row in csv.reader(io.StringIO(table)):
+        if not row:
+            continue
+        cells = [cell.strip() for cell in row if cell.strip()]
+        if len(cells) == 1 and cells[0].startswith('Sheet: '):
+            sheet_name, header_seen = cells[0][len('Sheet: '):], False
+            continue
+        if not header_seen:
+            header_seen = True
+            continue
+        if cells:
+            yield sheet_name, cells
+
+
+def synthesize_assets(prompt):
+    """Schema-valid assets JSON from the rows of the prompt's CSV tables that mention an asset."""
+    from scripts.asset_taxonomy import get_asset_term_matcher
+
+    matcher = get_asset_term_matcher()
+    assets = []
+    for sheet_name, cells in table_rows(prompt):
+        terms = [len(matcher.find(cell)) for cell in cells]
+        if not any(terms):
+            continue
+        # The cell with the most asset terms is the type, rooms also contain some
+        asset_type = cells[terms.index(max(terms))]
+        others = [cell for cell in cells if cell != asset_type and not cell.isdigit()]
+        counts = [cell for cell in cells if cell.isdigit() and int(cell) > 0]
+        asset = {
+            'asset_type': asset_type,
+            'asset_location': others[0] if others else 'Unknown',
+            'asset_count': counts[0] if counts else '1',
+        }
+        if sheet_name is not None:
+            asset['sheet_name'] = sheet_name
+        assets.append(asset)
+    return json.dumps({'assets': assets})
+
+
+class Standin:
+    """Reply, latency and failure generation, and the request statistics."""
+
+    def __init__(self, config):
+        self.config = config
+        self.replay = LLMResponseCache(config.replay_dir, ttl_seconds=None, max_entries=None)
+        self.random = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'replayed': 0, 'synthesized': 0, 'errors': 0, 'in_flight': 0,
+                      'peak_in_flight': 0, 'by_deployment': {}}
+
+    def draw(self):
+        """Latency in seconds, and an error status or None, for the next request."""
+        with self.lock:
+            latency = self.config.latency_median_ms / 1000 * math.exp(self.random.gauss(0, self.config.latency_sigma))
+            failed = self.random.random() < self.config.error_rate
+            status = self.random.choice([429, 500, 503]) if failed else None
+            is_table = self.random.random() < self.config.table_rate
+        return latency, status, is_table
+
+    def count(self, name, key=None, delta=1):
+        with self.lock:
+            self.stats[name] += delta
+            if name == 'in_flight':
+                self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.stats['in_flight'])
+            if key is not None:
+                self.stats['by_deployment'][key] = self.stats['by_deployment'].get(key, 0) + 1
+
+    def reply(self, key, model_choice, prompt, is_table):
+        recorded = self.replay.get(make_cache_key(key, model_choice, prompt))
+        if recorded is not None:
+            self.count('replayed')
+            return recorded
+
+        self.count('synthesized')
+        if key == 'legionella-table-evaluate':
+            return 'True' if is_table else 'False'
+        if key == 'legionella-table-size':
+            return '4x12'
+        return synthesize_assets(prompt)
+
+    def response(self, key, model_choice, content):
+        model, provider = MODELS.get(model_choice, MODELS[None])
+        return {
+            'id': uuid.uuid4().hex,
+            'created': datetime.now(timezone.utc).isoformat(),
+            'object': 'chat',
+            'model': model,
+            'provider': provider,
+            'is_final': True,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+        }
+
+
+def make_handler(standin):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                with standin.lock:
+                    self._send(200, standin.stats)
+            else:
+                self._send(404, {'message': 'Not found'})
+
+        def do_POST(self):
+            if self.path.split('?')[0] != INVOKE_PATH:
+                self._send(404, {'message': 'Not found'})
+                return
+
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            key = request.get('key')
+            model_choice = ((request.get('context') or {}).get('model_choice') or [None])[0]
+            latency, status, is_table = standin.draw()
+
+            standin.count('requests', key)
+            standin.count('in_flight')
+            try:
+                time.sleep(latency)
+                if status is not None:
+                    standin.count('errors')
+                    self._send(status, {'message': f'Stand-in failure {status}'})
+                    return
+                content = standin.reply(key, model_choice, prompt_text(request.get('messages')), is_table)
+                self._send(200, standin.response(key, model_choice, content))
+            finally:
+                standin.count('in_flight', delta=-1)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return Handler
+
+
+def make_server(config=None, host='127.0.0.1', port=8765):
+    """A ThreadingHTTPServer serving the stand-in; call serve_forever, e.g. in a thread."""
+    server = ThreadingHTTPServer((host, port), make_handler(Standin(config or StandinConfig())))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the Orq deployments API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-median-ms', type=float, default=500, help='Median response latency')
+    parser.add_argument('--latency-sigma', type=float, default=0.5,
+                        help='Spread of the lognormal latency distribution, 0 for a fixed latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 429/500/503')
+    parser.add_argument('--table-rate', type=float, default=0.5,
+                        help='Share of pages the table evaluation deployment answers True for')
+    parser.add_argument('--replay-dir', default=DEFAULT_CACHE_DIR,
+                        help='LLM response cache folder to replay recorded replies from')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = StandinConfig(args.latency_median_ms, args.latency_sigma, args.error_rate, args.table_rate,
+                           args.replay_dir, args.seed)
+    server = make_server(config, args.host, args.port)
+    logger.info(f"Orq stand-in listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,10 @@ import logging
 import sys
 import os
 from datetime import datetime
+from functools import lru_cache
 from dotenv import load_dotenv
 import PyPDF2
 import pandas as pd
-import streamlit as st
-import xlsxwriter
 
 # Define a monkeypatch function that will execute before importing Adobe SDK
 def apply_adobe_sdk_print_patch():
@@ -37,36 +36,48 @@ def apply_adobe_sdk_print_patch():
     # involve parsing the Python code and fixing the syntax properly.
     logging.info("Applying Adobe SDK print statement patch")
 
-# Apply the monkeypatch before importing Adobe modules
-apply_adobe_sdk_print_patch()
+@lru_cache(maxsize=None)
+def load_adobe_sdk():
+    """
+    Import the Adobe PDF Services SDK on first use, so importing this module stays cheap.
+
+    Returns:
+        bool: Whether the SDK imported; its classes are then available as module globals
+    """
+    global ServicePrincipalCredentials, ServiceApiException, ServiceUsageException, SdkException, CloudAsset, \
+        StreamAsset, PDFServices, PDFServicesMediaType, ExportPDFJob, ExportPDFParams, ExportPDFTargetFormat, \
+        ExportPDFResult
+
+    # Apply the monkeypatch before importing Adobe modules
+    apply_adobe_sdk_print_patch()
 
-# Import Adobe PDF Services modules
-try:
-    from adobe.pdfservices.operation.auth.service_principal_credentials import ServicePrincipalCredentials
-    from adobe.pdfservices.operation.exception.exceptions import ServiceApiException, ServiceUsageException, SdkException
-    from adobe.pdfservices.operation.io.cloud_asset import CloudAsset
-    from adobe.pdfservices.operation.io.stream_asset import StreamAsset
-    from adobe.pdfservices.operation.pdf_services import PDFServices
-    from adobe.pdfservices.operation.pdf_services_media_type import PDFServicesMediaType
-    from adobe.pdfservices.operation.pdfjobs.jobs.export_pdf_job import ExportPDFJob
-    from adobe.pdfservices.operation.pdfjobs.params.export_pdf.export_pdf_params import ExportPDFParams
-    from adobe.pdfservices.operation.pdfjobs.params.export_pdf.export_pdf_target_format import ExportPDFTargetFormat
-    from adobe.pdfservices.operation.pdfjobs.result.export_pdf_result import ExportPDFResult
-    adobe_sdk_available = True
-    logging.info("Successfully imported Adobe PDF Services SDK")
-except SyntaxError as e:
-    logging.error(f"SyntaxError importing Adobe SDK: {str(e)}")
-    adobe_sdk_available = False
-except Exception as e:
-    logging.error(f"Error importing Adobe SDK: {str(e)}")
-    adobe_sdk_available = False
+    # Import Adobe PDF Services modules
+    try:
+        from adobe.pdfservices.operation.auth.service_principal_credentials import ServicePrincipalCredentials
+        from adobe.pdfservices.operation.exception.exceptions import ServiceApiException, ServiceUsageException, SdkException
+        from adobe.pdfservices.operation.io.cloud_asset import CloudAsset
+        from adobe.pdfservices.operation.io.stream_asset import StreamAsset
+        from adobe.pdfservices.operation.pdf_services import PDFServices
+        from adobe.pdfservices.operation.pdf_services_media_type import PDFServicesMediaType
+        from adobe.pdfservices.operation.pdfjobs.jobs.export_pdf_job import ExportPDFJob
+        from adobe.pdfservices.operation.pdfjobs.params.export_pdf.export_pdf_params import ExportPDFParams
+        from adobe.pdfservices.operation.pdfjobs.params.export_pdf.export_pdf_target_format import ExportPDFTargetFormat
+        from adobe.pdfservices.operation.pdfjobs.result.export_pdf_result import ExportPDFResult
+        logging.info("Successfully imported Adobe PDF Services SDK")
+        return True
+    except SyntaxError as e:
+        logging.error(f"SyntaxError importing Adobe SDK: {str(e)}")
+        return False
+    except Exception as e:
+        logging.error(f"Error importing Adobe SDK: {str(e)}")
+        return False
 
 logging.basicConfig(level=logging.INFO)
 load_dotenv()
 
 class ExportPDFToExcel:
     def __init__(self):
-        if not adobe_sdk_available:
+        if not load_adobe_sdk():
             error_msg = "Adobe PDF Services SDK failed to initialize. Check previous error logs for details."
             logging.error(error_msg)
             raise RuntimeError(error_msg)
@@ -0,0 +1,284 @@
+import logging
+from functools import lru_cache
+
+from scripts.asset_taxonomy import ASSET_TYPES
+
+# Two different prompts per language, one for known assets, one for unknown assets
+
+PROMPT_UNKNOWN_IF_ASSETS = """Below is a table extracted from an excel file in a CSV format. 
+                            The table is part of a legionella risk assessment. Examine it carefully. 
+                            You should extract specific data from the table if is present. The data you
+                            are looking for is specific assets. Assets are water-related equipment, like taps, showers etc. but may vary from anything to dead ends for example.
+
+                            First examine the table and see if any assets are explicitly mentioned, with explicit locations.
+
+                            If that is the case examine the table again and extract each asset and extract the following:
+                            -Asset type (like taps, showers, dead ends, anything that is water/plumbing related etc)
+                            -Asset location (like Main School, etc)
+                            -Asset count (like 6x, 1x etc, just put the number here)
+
+                            Assets my have supply sources or supply to other assets, so be careful to not extract assets that are mentioned in combination with 'supply' and do not have an explicit location.
+                            Ignore these 'supply' related assets. If the location seems to be an asset, it is highly probable that it is a supply related asset. 
+                            Assets that are mentioned in combination with 'supply' are not assets may be ignored since these are already mentioned elsewhere.
+
+                            Also, for each asset table be thorough in  what information to extract. 'Type of outlet' for example may be ignored if 'asset' is mentioned explicitly in the table.
+
+                            Return the data in the following format:
+
+                            {{ "assets" : [ {{ "asset_type" : "asset_type", "asset_location" : "asset_location", "asset_count" : "asset_count" }}, {{ "asset_type" : "asset_type", "asset_location  " : "asset_location", "asset_count" : "asset_count"  }}, ...] }}
+                            If multiples of assets are mentioned (like (6x Toilets	Main School)) then return each asset as a separate row, like
+                            {{ "assets" : [ {{ "asset_type" : "Toilets", "asset_location" : "Main School", "asset_count" : "6" }}, .... }}
+                            
+
+
+                            Only include assets if the asset type and location combination are explicitly mentioned. If the location in combination with the asset type is not explicitly mentioned, then ignore the asset. You cannot return an asset without a location.
+                            Only give the name of the location, nothing else. Be as specific as possible about the location.
+                            The location needs to be a physical location in a building. If mulitple scopes of locations are mentinioned, start with biggest scope and then combine with smaller scopes, connected with a hyphen.
+                            For example: "Main School - Kitchen - Toilets"
+
+                            For the asset count, the default value is 1, unless it is explicitly mentioned.
+
+                            If no assets are found, return an empty list."""
+
+PROMPT_UNKNOWN_IF_ASSETS_NEDERLANDS = """Hieronder staat een tabel geëxtraheerd uit een Excel bestand in CSV formaat.
+                            De tabel is onderdeel van een legionella risicobeoordeling. Onderzoek deze zorgvuldig.
+                            Je moet specifieke data uit de tabel halen indien aanwezig. De data waar je
+                            naar zoekt zijn specifieke assets. Assets zijn watergerelateerde apparatuur, zoals kranen, douches etc. maar kunnen variëren van alles tot doodlopende leidingen bijvoorbeeld.
+
+                            Onderzoek eerst de tabel en kijk of er expliciet assets worden genoemd, met expliciete locaties.
+
+                            Als dat het geval is, onderzoek de tabel nogmaals en haal voor elk asset de volgende informatie eruit:
+                            -Asset type (zoals kranen, douches, doodlopende leidingen, alles wat water/loodgieterswerk gerelateerd is etc)
+                            -Asset locatie (zoals Hoofdschool, etc)
+                            -Asset aantal (zoals 6x, 1x etc, zet hier alleen het nummer)
+
+                            Assets kunnen voedingsbronnen hebben of andere assets voeden, dus wees voorzichtig met assets die genoemd worden in combinatie met 'toevoer' en geen expliciete locatie hebben.
+                            Negeer deze 'toevoer' gerelateerde assets. Als de locatie een asset lijkt te zijn, is het zeer waarschijnlijk dat het een toevoer gerelateerde asset is.
+                            Assets die genoemd worden in combinatie met 'toevoer' zijn geen assets en mogen genegeerd worden aangezien deze al elders genoemd zijn.
+
+                            Wees ook voor elke asset tabel grondig in welke informatie je extraheert. 'Type tappunt' bijvoorbeeld mag genegeerd worden als 'asset' expliciet genoemd wordt in de tabel.
+
+                            Retourneer de data in het volgende formaat:
+
+                            {{ "assets" : [ {{ "asset_type" : "asset_type", "asset_location" : "asset_location", "asset_count" : "asset_count" }}, {{ "asset_type" : "asset_type", "asset_location" : "asset_location", "asset_count" : "asset_count" }}, ...] }}
+                            Als er meerdere assets genoemd worden (zoals (6x Toiletten Hoofdschool)) retourneer dan elk asset als een aparte rij, zoals
+                            {{ "assets" : [ {{ "asset_type" : "Toiletten", "asset_location" : "Hoofdschool", "asset_count" : "6" }}, .... }}
+
+                            Neem alleen assets op als de combinatie van asset type en locatie expliciet genoemd wordt. Als de locatie in combinatie met het asset type niet expliciet genoemd wordt, negeer dan het asset. Je kunt geen asset retourneren zonder locatie.
+                            Geef alleen de naam van de locatie, niets anders. Wees zo specifiek mogelijk over de locatie.
+                            De locatie moet een fysieke locatie in een gebouw zijn. Als er meerdere niveaus van locaties genoemd worden, begin dan met het grootste niveau en combineer met kleinere niveaus, verbonden met een koppelteken.
+                            Bijvoorbeeld: "Hoofdschool - Keuken - Toiletten"
+
+                            Voor het asset aantal is de standaardwaarde 1, tenzij het expliciet anders genoemd wordt.
+
+                            Als er geen assets gevonden worden, retourneer dan een lege lijst."""
+
+#TODO: add sheet name, only include sub-tables if multiple tables.
+PROMPT_KNOWN_IF_ASSETS = """Below is a table extracted from an excel file in a CSV format. 
+                            The table is part of a legionella risk assessment. Examine it carefully. 
+                            You should extract specific data from the table if is present. The data you
+                            are looking for is specific assets. Assets are water/plumbing-related equipment, like taps, showers, dead ends etc.
+                            The tables are selected by a human, so they are extremely likely likely to contain assets. Take this into account when examing the table
+                            The tables are extracted from pages however, and one page may contain multiple tables.
+                            So it could be that case that you are examining a table from a page where another table contained the assets.
+                            In that case, you should not extract the assets from the table you are examining.
+                            
+
+                            First examine the table structure carefully.
+
+                            Then extract each asset and extract the following:
+                            -Asset type (like taps, showers, dead ends, anything that is water/plumbing related etc)
+                            -Asset location (like Main School, etc)
+                            -Asset count (like 6x, 1x etc, just put the number here)
+
+                            Assets my have supply sources or supply to other assets, so be careful to not extract assets that are mentioned in combination with 'supply' and do not have an explicit location.
+                            Ignore these 'supply' related assets. If the location seems to be an asset, it is highly probable that it is a supply related asset. 
+                            Assets that are mentioned in combination with 'supply' are not assets may be ignored since these are already mentioned elsewhere.
+
+                            Also, for each asset table be thorough in  what information to extract. 'Type of outlet' for example may be ignored if 'asset' is mentioned explicitly in the table.
+
+                            Return the data in the following format:
+
+                            {{ "assets" : [ {{ "asset_type" : "asset_type", "asset_location" : "asset_location", "asset_count" : "asset_count" }}, {{ "asset_type" : "asset_type", "asset_location  " : "asset_location", "asset_count" : "asset_count"  }}, ...] }}
+                            If multiples of assets are mentioned (like (6x Toilets	Main School)) then return each asset as a separate row, like
+                            {{ "assets" : [ {{ "asset_type" : "Toilets", "asset_location" : "Main School", "asset_count" : "6" }}, .... }}
+                            
+
+
+                            Only include assets if the asset type and location combination are explicitly mentioned. If the location in combination with the asset type is not explicitly mentioned, then ignore the asset. You cannot return an asset without a location.
+                            Only give the name of the location, nothing else. Be as specific as possible about the location.
+                            The location needs to be a physical location in a building. If mulitple scopes of locations are mentinioned, start with biggest scope and then combine with smaller scopes, connected with a hyphen.
+                            For example: "Main School - Kitchen - Toilets"
+
+                            For the asset count, the default value is 1, unless it is explicitly mentioned."""
+
+PROMPT_KNOWN_IF_ASSETS_NEDERLANDS = """Hieronder staat een tabel geëxtraheerd uit een Excel bestand in CSV formaat.
+                            De tabel is onderdeel van een legionella risicobeoordeling. Onderzoek deze zorgvuldig.
+                            Je moet specifieke data uit de tabel halen indien aanwezig. De data waar je
+                            naar zoekt zijn specifieke assets. Assets zijn watergerelateerde apparatuur, zoals kranen, douches, doodlopende leidingen etc.
+                            De tabellen zijn geselecteerd door een mens, dus het is zeer waarschijnlijk dat ze assets bevatten. Houd hier rekening mee bij het onderzoeken van de tabel.
+                            De tabellen zijn echter geëxtraheerd uit pagina's, en één pagina kan meerdere tabellen bevatten.
+                            Het zou dus kunnen dat je een tabel onderzoekt van een pagina waar een andere tabel de assets bevatte.
+                            In dat geval moet je geen assets extraheren uit de tabel die je onderzoekt.
+
+                            Onderzoek eerst de tabelstructuur zorgvuldig.
+
+                            Extraheer vervolgens voor elk asset de volgende informatie:
+                            -Asset type (zoals kranen, douches, doodlopende leidingen, alles wat water/loodgieterswerk gerelateerd is etc)
+                            -Asset locatie (zoals Hoofdschool, etc)
+                            -Asset aantal (zoals 6x, 1x etc, zet hier alleen het nummer)
+
+                            Assets kunnen voedingsbronnen hebben of andere assets voeden, dus wees voorzichtig met assets die genoemd worden in combinatie met 'toevoer' en geen expliciete locatie hebben.
+                            Negeer deze 'toevoer' gerelateerde assets. Als de locatie een asset lijkt te zijn, is het zeer waarschijnlijk dat het een toevoer gerelateerde asset is.
+                            Assets die genoemd worden in combinatie met 'toevoer' zijn geen assets en mogen genegeerd worden aangezien deze al elders genoemd zijn.
+
+                            Wees ook voor elke asset tabel grondig in welke informatie je extraheert. 'Type tappunt' bijvoorbeeld mag genegeerd worden als 'asset' expliciet genoemd wordt in de tabel.
+
+                            Retourneer de data in het volgende formaat:
+
+                            {{ "assets" : [ {{ "asset_type" : "asset_type", "asset_location" : "asset_location", "asset_count" : "asset_count" }}, {{ "asset_type" : "asset_type", "asset_location" : "asset_location", "asset_count" : "asset_count" }}, ...] }}
+                            Als er meerdere assets genoemd worden (zoals (6x Toiletten Hoofdschool)) retourneer dan elk asset als een aparte rij, zoals
+                            {{ "assets" : [ {{ "asset_type" : "Toiletten", "asset_location" : "Hoofdschool", "asset_count" : "6" }}, .... }}
+
+                            Neem alleen assets op als de combinatie van asset type en locatie expliciet genoemd wordt. Als de locatie in combinatie met het asset type niet expliciet genoemd wordt, negeer dan het asset. Je kunt geen asset retourneren zonder locatie.
+                            Geef alleen de naam van de locatie, niets anders. Wees zo specifiek mogelijk over de locatie.
+                            De locatie moet een fysieke locatie in een gebouw zijn. Als er meerdere niveaus van locaties genoemd worden, begin dan met het grootste niveau en combineer met kleinere niveaus, verbonden met een koppelteken.
+                            Bijvoorbeeld: "Hoofdschool - Keuken - Toiletten"
+
+                            Voor het asset aantal is de standaardwaarde 1, tenzij het expliciet anders genoemd wordt."""
+
+BASE_PROMPTS = {
+    ('english', False): PROMPT_UNKNOWN_IF_ASSETS,
+    ('english', True): PROMPT_KNOWN_IF_ASSETS,
+    ('nederlands', False): PROMPT_UNKNOWN_IF_ASSETS_NEDERLANDS,
+    ('nederlands', True): PROMPT_KNOWN_IF_ASSETS_NEDERLANDS,
+}
+
+# Text around the asset type list and the CSV table, laid out as in the original prompts
+TAXONOMY_INDENT = ' ' * 32
+
+TAXONOMY_INTROS = {
+    'english': '\n                            An asset can be any of the following (or a variation thereof) : \n',
+    'nederlands': '\n                            Een asset kan een van de volgende zijn (of een variant daarvan) : \n                            \n',
+}
+
+TABLE_INTROS = {
+    'english': '\n\n                                This is the CSV table:\n\n                                ',
+    'nederlands': '\n\n                            This is the CSV table:\n\n                                ',
+}
+
+TABLE_OUTROS = {
+    'english': '         \n\n                                If there are empty values in the CSV this could also be due to formerly merged/split cells, as this CSV was extracted from an Excel file. \n\n                                ONLY RETURN THE JSON, DO NOT RETURN ANYTHING ELSE.              ',
+    'nederlands': '         \n\n                                Als er lege waarden in de CSV staan, kan dit ook komen door eerder samengevoegde/gesplitste cellen, aangezien deze CSV is geëxtraheerd uit een Excel bestand.\n\n                                GEEF ALLEEN DE JSON TERUG, GEEF NIETS ANDERS TERUG.              ',
+}
+
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Rough token count of text, at about 4 characters per token."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class PromptTemplate:
+    """
+    Extraction prompt with everything but the CSV table filled in.
+
+    The base prompt and the asset type list are joined once, so rendering a sheet's
+    prompt is a single concatenation with its CSV table.
+    """
+
+    def __init__(self, language, assets_known):
+        self.language = language
+        self.assets_known = assets_known
+        self.header = BASE_PROMPTS[(language, assets_known)] + TAXONOMY_INTROS[language]
+        self.table_intro = TABLE_INTROS[language]
+        self.prefix = self.header + self.format_asset_types(ASSET_TYPES[language]) + self.table_intro
+        self.suffix = TABLE_OUTROS[language]
+        self.token_count = estimate_tokens(self.prefix + self.suffix)
+
+    @staticmethod
+    def format_asset_types(asset_types):
+        return '\n'.join(TAXONOMY_INDENT + asset_type for asset_type in asset_types)
+
+    def render(self, table, asset_types=None):
+        """
+        Full prompt for one CSV table.
+
+        Args:
+            table (str): The CSV table
+            asset_types (list): Asset types to list instead of the full taxonomy, e.g.
+                the candidates retrieved for this table. Default None lists all.
+        """
+        if asset_types is None:
+            return self.prefix + table + self.suffix
+        return self.header + self.format_asset_types(asset_types) + self.table_intro + table + self.suffix
+
+
+@lru_cache(maxsize=None)
+def get_prompt_template(language, assets_known):
+    """
+    Compiled extraction prompt for a language, built once per process.
+
+    Args:
+        language (str): 'english' or 'nederlands'
+        assets_known (bool): Whether the tables were selected by a human as containing assets
+
+    Returns:
+        PromptTemplate: template whose token_count is the estimated prompt size without the table
+    """
+    if language not in ASSET_TYPES:
+        raise ValueError(f"Unsupported language '{language}', choose from {sorted(ASSET_TYPES)}")
+
+    template = PromptTemplate(language, bool(assets_known))
+    logging.info(f"Compiled {language} prompt template (assets_known={bool(assets_known)}): ~{template.token_count} tokens before the table")
+    return template
+
+
+def prompt_token_counts():
+    """Estimated token count of every prompt template, to keep an eye on prompt growth."""
+    return {
+        (language, assets_known): get_prompt_template(language, assets_known).token_count
+        for language in ASSET_TYPES
+        for assets_known in (False, True)
+    }
+
+
+# Several small sheets can share one request; the models then tag every asset with its sheet
+PACKED_TABLES_INSTRUCTIONS = {
+    'english': """The CSV below contains several tables, each from its own sheet and each preceded by a line 'Sheet: <sheet name>'.
+Extract the assets of every table separately and add the sheet name of the table an asset comes from to the asset as "sheet_name", like
+{ "assets" : [ { "asset_type" : "Toilets", "asset_location" : "Main School", "asset_count" : "6", "sheet_name" : "page_3" }, .... }
+""",
+    'nederlands': """De CSV hieronder bevat meerdere tabellen, elk uit een eigen sheet en elk voorafgegaan door een regel 'Sheet: <sheetnaam>'.
+Extraheer de assets van elke tabel apart en voeg aan elk asset de sheetnaam van de tabel waar het vandaan komt toe als "sheet_name", zoals
+{ "assets" : [ { "asset_type" : "Toiletten", "asset_location" : "Hoofdschool", "asset_count" : "6", "sheet_name" : "page_3" }, .... }
+""",
+}
+
+
+def render_packed_tables(tables, language):
+    """
+    Table text for a request that carries several sheets.
+
+    Args:
+        tables (list): (sheet name, CSV string) tuples
+        language (str): 'english' or 'nederlands'
+    """
+    return PACKED_TABLES_INSTRUCTIONS[language] + '\n' + '\n'.join(f"Sheet: {sheet_name}\n{table}" for sheet_name, table in tables)
+
+
+# Asks the table extraction deployment for the column roles of a register: the
+# reply keeps the assets schema, with column names in place of the values
+COLUMN_ROLES_PROMPT = """Below are the header and the first rows of a table extracted from a legionella risk assessment, in CSV format.
+Determine which columns hold the asset type, the asset location and the asset count.
+
+Return a single asset whose fields are column names instead of values:
+{{ "assets" : [ {{ "asset_type" : "<column with the asset types>", "asset_location" : "<column(s) with the location, biggest scope first, separated by ' | '>", "asset_count" : "<column with the counts, or empty if there is none>" }} ] }}
+Use the column names exactly as they appear in the header.
+
+If the table is not a list with one asset per row, return an empty list.
+
+This is the CSV table:
+{table}"""
@@ -0,0 +1,69 @@
+import json
+import logging
+
+
+def logprob_confidence(logprobs):
+    """
+    Confidence of a reply from its token logprobs, using llm_confidence.
+
+    Args:
+        logprobs: The choice's logprobs as returned by the deployment, or None
+
+    Returns:
+        float: Lowest confidence over the reply's JSON fields (0-1), or None when
+        the deployment did not return logprobs
+    """
+    content = getattr(logprobs, "content", None) if logprobs is not None else None
+    if not content:
+        return None
+
+    from llm_confidence.logprobs_handler import LogprobsHandler
+
+    try:
+        handler = LogprobsHandler()
+        confidences = handler.process_logprobs(handler.format_logprobs(content))
+    except Exception as e:
+        logging.warning(f"Could not score reply logprobs: {str(e)}")
+        return None
+
+    values = [value for value in confidences.values() if isinstance(value, (int, float))]
+    return min(values) if values else None
+
+
+def structural_issues(content, assets_known=False):
+    """
+    Problems with the shape of a table extraction reply.
+
+    Args:
+        content (str): The model's reply
+        assets_known (bool): Whether the table was selected as containing assets, so
+            that an empty list is suspicious
+
+    Returns:
+        list: Descriptions of the problems, empty if the reply looks sound
+    """
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return ["reply is not valid JSON"]
+
+    assets = data.get("assets") if isinstance(data, dict) else None
+    if not isinstance(assets, list):
+        return ["reply has no assets list"]
+
+    issues = []
+    if not assets and assets_known:
+        issues.append("no assets in a table selected as containing assets")
+
+    for i, asset in enumerate(assets):
+        if not isinstance(asset, dict):
+            issues.append(f"asset {i} is not an object")
+            continue
+        for field in ("asset_type", "asset_location"):
+            if not str(asset.get(field) or "").strip():
+                issues.append(f"asset {i} has no {field}")
+        count = str(asset.get("asset_count", "")).strip()
+        if not count.isdigit() or int(count) == 0:
+            issues.append(f"asset {i} has asset_count '{count}'")
+
+    return issues
@@ -1,7 +1,151 @@
+import numpy as np
 import pandas as pd
 import os   
 
-def multiply_quantities(file_name, folder_path='./output'):
+from scripts.asset_taxonomy import get_canonical_index
+
+EXPANDED_COLUMNS = ['asset_type', 'asset_type_id', 'asset_location', 'sheet_name']
+COMPACT_COLUMNS = EXPANDED_COLUMNS + ['asset_count']
+
+
+def parse_quantities(counts):
+    """
+    Whole asset counts, NaN where a row has no usable count.
+
+    A count is parsed as a number and truncated ('2.7' -> 2), as int(float(count))
+    did; counts that are not numbers ('6x'), empty or infinite become NaN.
+    """
+    numeric = pd.to_numeric(counts, errors='coerce').astype(float)
+    # float() reads a few forms pandas rejects ('1_0', full-width digits); only the rejected rows are retried
+    retry = numeric.isna() & counts.notna()
+    if retry.any():
+        numeric[retry] = counts[retry].map(_float_or_nan)
+    return np.trunc(numeric.where(np.isfinite(numeric)))
+
+
+def _float_or_nan(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def compact_quantities(df):
+    """
+    The rows that stand for at least one physical asset, with their whole count.
+
+    Rows without an asset type, without a usable count or with a count below
+    one are skipped. This (type, location, count) table carries everything the
+    expanded table does, in a row per asset line instead of a row per asset.
+
+    Returns:
+        DataFrame: COMPACT_COLUMNS, in the order of df, asset_count as int
+    """
+    counts = parse_quantities(df['asset_count'])
+    keep = (df['asset_type'].notna() & (counts > 0)).to_numpy()
+
+    compact = df.loc[keep, EXPANDED_COLUMNS].reset_index(drop=True)
+    compact['asset_count'] = counts.to_numpy()[keep].astype(np.int64)
+    return compact
+
+
+def expand_compact(compact):
+    """Every row of a compact table repeated asset_count times, with a single take."""
+    repeats = compact['asset_count'].to_numpy(dtype=np.int64)
+    # Compact files written before the type IDs were carried have no asset_type_id
+    columns = [column for column in EXPANDED_COLUMNS if column in compact.columns]
+    return compact.iloc[np.repeat(np.arange(len(compact)), repeats)][columns].reset_index(drop=True)
+
+
+def expand_quantities(df):
+    """
+    One row per physical asset: every row of df repeated asset_count times.
+
+    The counts are parsed in one vectorized pass and the rows repeated with a
+    single take, so the cost is linear in the expanded rows.
+
+    Returns:
+        DataFrame: EXPANDED_COLUMNS, in the order of df
+    """
+    return expand_compact(compact_quantities(df))
+
+
+def iter_expanded(compact, chunk_rows=50000):
+    """
+    The expanded table of a compact table, in chunks of about chunk_rows rows.
+
+    Only one chunk is materialized at a time; a single asset line with a larger
+    count becomes a chunk of its own.
+    """
+    ends = np.cumsum(compact['asset_count'].to_numpy(dtype=np.int64))
+    start = 0
+    while start < len(compact):
+        base = ends[start - 1] if start else 0
+        stop = max(int(np.searchsorted(ends, base + chunk_rows, side='right')), start + 1)
+        yield expand_compact(compact.iloc[start:stop])
+        start = stop
+
+
+def write_expanded_workbook(compact, output_file, chunk_rows=50000):
+    """Stream the expanded table of a compact table into an Excel file, without building it in memory."""
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(output_file, {'constant_memory': True})
+    worksheet = workbook.add_worksheet('Sheet1')
+    header = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    worksheet.write_row(0, 0, [column for column in EXPANDED_COLUMNS if column in compact.columns], header)
+
+    row = 1
+    for chunk in iter_expanded(compact, chunk_rows):
+        for values in chunk.itertuples(index=False):
+            worksheet.write_row(row, 0, ['' if pd.isna(value) else value for value in values])
+            row += 1
+    workbook.close()
+
+
+def quantities_path(file_name, folder_path='./output', compact=False):
+    """Path of the multiplied quantities file, or of its compact form."""
+    suffix = 'assets-compact' if compact else 'assets-multiplied'
+    return os.path.join(folder_path, "5-MultipliedQuantities", f"{file_name}-{suffix}.xlsx")
+
+
+def load_expanded_assets(file_name, folder_path='./output'):
+    """
+    One row per physical asset of a processed file.
+
+    Reads the multiplied quantities file, or expands the compact file in memory
+    when only that was written.
+    """
+    expanded_file = quantities_path(file_name, folder_path)
+    if os.path.exists(expanded_file):
+        return pd.read_excel(expanded_file, header=0)
+    return expand_compact(pd.read_excel(quantities_path(file_name, folder_path, compact=True), header=0))
+
+
+def expand_compact_file(file_name, folder_path='./output'):
+    """Write the multiplied quantities file of a compact run, for consumers that need the per-asset rows."""
+    compact = pd.read_excel(quantities_path(file_name, folder_path, compact=True), header=0)
+    output_file = quantities_path(file_name, folder_path)
+    write_expanded_workbook(compact, output_file)
+    print("Expanded quantities streamed to:", output_file)
+    return output_file
+
+
+def multiply_quantities(file_name, folder_path='./output', compact=False, language='english'):
+    """
+    Write the reviewed assets of a file with their quantities multiplied out.
+
+    Args:
+        file_name (str): Base name of the file
+        folder_path (str): Output folder of the run
+        compact (bool): Write the compact (type, location, count) table as
+            '{file_name}-assets-compact.xlsx' instead of a row per asset. Consumers
+            expand it when they need per-asset rows, in memory with
+            load_expanded_assets or streamed to the multiplied file with
+            expand_compact_file. Default False.
+        language (str): Taxonomy language of the asset_type_id column
+            ('english' or 'nederlands'). Default 'english'.
+    """
     # Read the input Excel file from HumanReview folder
     input_file = f'{folder_path}/4-HumanReview/{file_name}-assets-data-human-review.xlsx'
     df = pd.read_excel(input_file, header=0)
@@ -12,43 +156,42 @@ def multiply_quantities(file_name, folder_path='./output'):
         print("Delete exists")
         df['delete'] = pd.to_numeric(df['delete'], errors='coerce').fillna(0).astype(int)
         df = df[df['delete'] != 1]
-    
-    # Create empty DataFrame for the expanded rows
-    expanded_df = pd.DataFrame(columns=['asset_type', 'asset_location', 'sheet_name'])
-    
-    # Iterate through each row
-    for _, row in df.iterrows():
-        # Skip if asset_type is empty or asset_count is empty
-        if pd.isna(row['asset_type']) or pd.isna(row['asset_count']):
-            continue
-            
-        # Convert asset_count to integer, default to 1 if not a valid number
-        try:
-            count = int(float(row['asset_count']))
-            if count <= 0:  # Skip if count is 0 or negative
-                continue
-        except (ValueError, TypeError):
-            continue  # Skip if conversion fails
-            
-        # Create count number of duplicates
-        for _ in range(count):
-            new_row = pd.DataFrame({
-                'asset_type': [row['asset_type']],
-                'asset_location': [row['asset_location']], 
-                'sheet_name': [row['sheet_name']]
-            })
-            expanded_df = pd.concat([expanded_df, new_row], ignore_index=True)
 
-    
+    # The reviewer may have corrected asset types, so the IDs are taken from the reviewed asset_type
+    df = df.assign(asset_type_id=get_canonical_index(language).ids(df['asset_type']))
     
     # Create output directory if it doesn't exist
     output_dir = os.path.join(folder_path, "5-MultipliedQuantities") 
     os.makedirs(output_dir, exist_ok=True)
+
+    if compact:
+        output_file = quantities_path(file_name, folder_path, compact=True)
+        compact_quantities(df).to_excel(output_file, index=False)
+
+        # A multiplied file of an earlier run would be read instead of this one
+        stale_file = quantities_path(file_name, folder_path)
+        if os.path.exists(stale_file):
+            os.remove(stale_file)
+
+        print("Compact DataFrame saved to:", output_file)
+        return
+
+    expanded_df = expand_quantities(df)
     
     # Save the expanded DataFrame
-    output_file = os.path.join(output_dir, f"{file_name}-assets-multiplied.xlsx")
+    output_file = quantities_path(file_name, folder_path)
     expanded_df.to_excel(output_file, index=False)
 
     print("Expanded DataFrame saved to:", output_file)
     
-    # return expanded_df
\ No newline at end of file
+    # return expanded_df
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Stream the per-asset rows of a compact quantities file to Excel')
+    parser.add_argument('file_name', help='Base name of the processed file')
+    parser.add_argument('--folder-path', default='./output', help='Output folder of the run')
+    args = parser.parse_args()
+
+    expand_compact_file(args.file_name, args.folder_path)
@@ -0,0 +1,117 @@
+"""
+Append-only checkpoint journal of process_excel_file.
+
+Every finished request (a sheet, a chunk or a pack of sheets) is appended as
+one JSON line as soon as its result is in, so a failed or interrupted run can
+be resumed without asking the LLMs for the finished sheets again.
+
+    {"options": {...}}                                  first line, the run options
+    {"key": "...", "results": [{"sheet_name": ..., "columns": [...], "rows": [...], "checked": false}]}
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import pandas as pd
+
+
+def task_key(task):
+    """Digest of a task's sheet names and tables, so a changed sheet is not resumed."""
+    digest = hashlib.sha256()
+    for sheet_name, df in task:
+        digest.update(str(sheet_name).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(df.to_csv(index=False).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SheetJournal:
+    """
+    JSONL journal of finished tasks, see the module docstring.
+
+    Args:
+        path (str): Journal file, e.g. '{output_dir}/{file_name}-journal.jsonl'
+        options (dict): Options that change the results; a journal written with
+            other options is not resumed
+    """
+
+    def __init__(self, path, options):
+        self.path = path
+        self.options = options
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Results of the finished tasks in the journal.
+
+        Returns:
+            dict: task key to {sheet name: (DataFrame, checked)}; empty if there is no
+            journal or it was written with other options
+        """
+        finished = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return finished
+
+        for i, line in enumerate(lines):
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A run that was killed mid-write leaves a partial last line
+                logging.warning(f"Skipping unreadable line {i + 1} of journal {self.path}")
+                continue
+            if i == 0:
+                if entry.get("options") != self.options:
+                    logging.info(f"Journal {self.path} was written with other options, not resuming")
+                    return {}
+                continue
+            finished[entry["key"]] = {
+                result["sheet_name"]: (pd.DataFrame(result["rows"], columns=result["columns"]), result["checked"])
+                for result in entry["results"]
+            }
+        return finished
+
+    def start(self, resume=False):
+        """Begin a new journal, or keep appending to a resumable one."""
+        with self._lock:
+            if resume and self.load():
+                self._trim_partial_line()
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"options": self.options}) + "\n")
+
+    def _trim_partial_line(self):
+        """Cut a partial last line left by a killed run, so the next record starts on a line of its own."""
+        with open(self.path, "rb+") as f:
+            content = f.read()
+            end = content.rfind(b"\n") + 1
+            if end < len(content):
+                logging.warning(f"Dropping the partial last line of journal {self.path}")
+                f.truncate(end)
+
+    def record(self, key, results):
+        """Append a finished task's results, {sheet name: (DataFrame, checked)}."""
+        entry = {
+            "key": key,
+            "results": [
+                {
+                    "sheet_name": sheet_name,
+                    "columns": [str(column) for column in df.columns],
+                    "rows": df.astype(object).where(df.notna(), None).values.tolist(),
+                    "checked": bool(checked),
+                }
+                for sheet_name, (df, checked) in results.items()
+            ],
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
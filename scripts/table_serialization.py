@@ -0,0 +1,110 @@
+import re
+
+import pandas as pd
+
+from scripts.prompts import estimate_tokens, CHARS_PER_TOKEN
+
+_WHITESPACE = re.compile(r'\s+')
+_NUMBER = re.compile(r'^-?\d+(\.\d+)?$')
+
+
+def normalize_header(column):
+    """Adobe's 'Unnamed: N' placeholders become empty, other headers get single spaces."""
+    column = str(column)
+    if column.startswith('Unnamed:'):
+        return ''
+    return _WHITESPACE.sub(' ', column).strip()
+
+
+def normalize_cell(value):
+    if pd.isna(value):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Counts read as 2.0 because of empty cells in the column
+        return str(int(value))
+    return _WHITESPACE.sub(' ', str(value)).strip()
+
+
+def compact_table(df, collapse_repeats=False):
+    """
+    Compact copy of a sheet's table for the prompt.
+
+    Drops empty rows, and columns that have neither a header nor a value, normalizes
+    headers and whitespace and writes whole-number floats as integers.
+
+    Args:
+        df (DataFrame): The sheet's table
+        collapse_repeats (bool): Blank out a text cell that repeats the cell above it,
+            as Adobe does when it fills formerly merged cells. Numbers are never
+            collapsed, so repeated counts survive. Default False.
+
+    Returns:
+        DataFrame: table of strings
+    """
+    compact = df.apply(lambda column: column.map(normalize_cell))
+    compact.columns = [normalize_header(column) for column in df.columns]
+
+    compact = compact.loc[(compact != '').any(axis=1)]
+    keep_columns = [i for i, column in enumerate(compact.columns)
+                    if column or (compact.iloc[:, i] != '').any()]
+    compact = compact.iloc[:, keep_columns]
+
+    if collapse_repeats and len(compact) > 1:
+        repeated = (compact == compact.shift(1)) & (compact != '')
+        repeated &= ~compact.apply(lambda column: column.str.match(_NUMBER))
+        compact = compact.mask(repeated, '')
+
+    return compact.reset_index(drop=True)
+
+
+def compact_table_csv(df, collapse_repeats=False):
+    """CSV string of compact_table(df)."""
+    return compact_table(df, collapse_repeats=collapse_repeats).to_csv(index=False)
+
+
+def serialize_table(df, compact=False, collapse_repeats=False):
+    """
+    CSV string of a sheet's table and the estimated tokens the compact form saved.
+
+    Returns:
+        Tuple of (CSV string, tokens saved compared to df.to_csv)
+    """
+    df_string = df.to_csv(index=False)
+    if not compact:
+        return df_string, 0
+
+    compact_string = compact_table_csv(df, collapse_repeats=collapse_repeats)
+    return compact_string, estimate_tokens(df_string) - estimate_tokens(compact_string)
+
+
+def split_table(df, max_tokens):
+    """
+    Split a sheet's table into row chunks of at most max_tokens estimated tokens.
+
+    Every chunk keeps the DataFrame's columns, so the header row is repeated in
+    each chunk's CSV. A table that fits is returned whole, and a single row larger
+    than the budget becomes its own chunk.
+
+    Args:
+        df (DataFrame): The sheet's table
+        max_tokens (int): Estimated token budget of one chunk's CSV
+
+    Returns:
+        list: DataFrames, in row order
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    header_chars = len(','.join(str(column) for column in df.columns)) + 1
+    # Characters of each row's CSV line: the cells plus the separators
+    row_chars = df.fillna('').astype(str).apply(lambda column: column.str.len()).sum(axis=1) + len(df.columns)
+    if header_chars + row_chars.sum() <= max_chars:
+        return [df]
+
+    chunks = []
+    start, chunk_chars = 0, header_chars
+    for i, chars in enumerate(row_chars):
+        if i > start and chunk_chars + chars > max_chars:
+            chunks.append(df.iloc[start:i])
+            start, chunk_chars = i, header_chars
+        chunk_chars += chars
+    chunks.append(df.iloc[start:])
+    return chunks
@@ -0,0 +1,115 @@
+"""
+Stitching of tables that continue over several page sheets.
+
+merge_excel_files writes one sheet per page (segment), so a long table becomes
+several sheets, and the later ones may have lost their header: pandas then reads
+the first data row as the header. A sheet continues the table before it when it
+has the same number of columns and either repeats the header or has a 'header'
+that looks like one more row of the table.
+"""
+import re
+
+import pandas as pd
+
+from scripts.asset_register import header_signature
+
+_NUMBER = re.compile(r'^-?\d+([.,]\d+)?x?$', re.IGNORECASE)
+
+# Rows of the previous table a header is compared with
+SAMPLE_ROWS = 20
+
+
+def _is_number(value):
+    return bool(_NUMBER.match(str(value).strip()))
+
+
+def header_fits_content(columns, previous, min_score=70):
+    """
+    Fraction of a sheet's headers that look like values of the previous table's columns.
+
+    A header fits a column when both are numeric, or when it is similar (RapidFuzz
+    token set ratio of at least min_score) to one of the column's last values.
+    Placeholder headers ('Unnamed: N') and empty values are not compared, so the
+    first data row of a sheet can be checked the same way.
+
+    Returns:
+        Tuple of (fitting headers, compared headers)
+    """
+    from rapidfuzz import fuzz, process, utils
+
+    fits, compared = 0, 0
+    for header, column in zip(columns, previous.columns):
+        if pd.isna(header) or str(header).startswith('Unnamed:'):
+            continue
+        values = [str(value) for value in previous[column].tail(SAMPLE_ROWS) if not pd.isna(value)]
+        if not values:
+            continue
+
+        compared += 1
+        numeric_column = sum(_is_number(value) for value in values) > len(values) / 2
+        if numeric_column:
+            fits += _is_number(header)
+        elif not _is_number(header):
+            match = process.extractOne(str(header), values, scorer=fuzz.token_set_ratio,
+                                       processor=utils.default_process, score_cutoff=min_score)
+            fits += match is not None
+    return fits, compared
+
+
+def continuation_kind(previous, df, min_fit=0.6):
+    """
+    How df continues the previous table.
+
+    Returns:
+        str: 'header' if df repeats the previous header, 'data' if df's header (or,
+        when that is all placeholders, its first row) fits the previous table's
+        values, or None if df starts a new table or nothing could be compared
+    """
+    if len(previous.columns) != len(df.columns) or previous.empty:
+        return None
+
+    signature = header_signature(df.columns)
+    if signature is not None and signature == header_signature(previous.columns):
+        return 'header'
+
+    fits, compared = header_fits_content(df.columns, previous)
+    if compared == 0 and not df.empty:
+        # A placeholder header says nothing; the first data row must then fit instead
+        fits, compared = header_fits_content(df.iloc[0].tolist(), previous)
+    if compared > 0 and fits / compared >= min_fit:
+        return 'data'
+    return None
+
+
+def header_as_row(df, columns):
+    """df's header, read by pandas from its first data row, as a row under the given columns."""
+    row = [None if str(header).startswith('Unnamed:') else header for header in df.columns]
+    return pd.DataFrame([row], columns=columns)
+
+
+def stitch_continuation_sheets(dfs, min_fit=0.6):
+    """
+    Merge consecutive sheets that continue one table into a single sheet.
+
+    Args:
+        dfs (dict): sheet name to DataFrame, in workbook order
+        min_fit (float): Fraction of a headerless sheet's first row that must look
+            like values of the previous table to count as a continuation
+
+    Returns:
+        dict: stitched sheet name ('page_12, page_13') to DataFrame, in workbook order
+    """
+    stitched = []
+    for sheet_name, df in dfs.items():
+        if stitched:
+            names, previous = stitched[-1]
+            kind = continuation_kind(previous, df, min_fit=min_fit)
+            if kind is not None:
+                rows = df.set_axis(previous.columns, axis=1)
+                if kind == 'data' and header_signature(df.columns) is not None:
+                    rows = pd.concat([header_as_row(df, previous.columns), rows], ignore_index=True)
+                stitched[-1] = (names + [sheet_name], pd.concat([previous, rows], ignore_index=True))
+                continue
+        stitched.append(([sheet_name], df))
+
+    return {', '.join(str(name) for name in names): df for names, df in stitched}
@@ -0,0 +1,24 @@
+import pandas as pd
+
+from scripts.asset_register import detect_column_roles, extract_register_assets
+
+
+def test_location_columns_are_joined_from_the_biggest_scope_down():
+    df = pd.DataFrame({
+        'Asset': ['Shower', 'Toilet', 'Sink'],
+        'Room': ['Kitchen', 'WC 1', 'Classroom'],
+        'Floor': ['Ground floor', 'First floor', 'Ground floor'],
+        'Building': ['Main School', 'Main School', 'Annex'],
+        'Qty': ['1', '2', '1'],
+    })
+
+    assets = extract_register_assets(df)
+
+    assert [asset['asset_location'] for asset in assets] == [
+        'Main School - Ground floor - Kitchen', 'Main School - First floor - WC 1', 'Annex - Ground floor - Classroom']
+
+
+def test_location_columns_of_the_same_scope_keep_their_order():
+    roles = detect_column_roles(['Outlet', 'Room name', 'Area', 'Room', 'Block'])
+
+    assert roles['asset_location'] == ['Block', 'Area', 'Room name', 'Room']
@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+
+from scripts.asset_taxonomy import get_asset_term_matcher
+
+
+@pytest.mark.parametrize('text', [
+    'vulnerable', 'Survey team', 'Emergency contact', 'Wellington Road', 'Handover', 'Leidinggevende',
+    'as well as', 'Breakfast club', 'Chairman', 'Bar chart', 'Spa Road', 'Put in place', 'Teamleider',
+])
+def test_contact_and_narrative_text_has_no_asset_terms(text):
+    assert get_asset_term_matcher().find(text) == []
+
+
+@pytest.mark.parametrize('text, term', [
+    ('Taps', 'taps'), ('WHB', 'whb'), ('Showers', 'shower'), ('douchemengkraan', 'douchemengkraan'),
+    ('Calorifiers', 'calorifier'), ('Wash hand basin', 'hand basin'), ('Kranen', 'kranen'), ('Bad (mengkraan)', 'mengkraan'),
+])
+def test_asset_words_plurals_and_compounds_are_found(text, term):
+    assert term in get_asset_term_matcher().find(text)
+
+
+def test_contact_sheet_is_not_an_asset_table():
+    contacts = pd.DataFrame({'Role': ['Emergency contact', 'Survey team'], 'Address': ['Wellington Road', 'Handover']})
+    assert not get_asset_term_matcher().matches_table(contacts)
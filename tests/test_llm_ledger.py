@@ -0,0 +1,40 @@
+import threading
+from types import SimpleNamespace
+
+from scripts.llm_ledger import CallLedger, current_ledger, ledger_scope
+from scripts.orq_invoke import invoke_deployment
+
+
+def client():
+    message = SimpleNamespace(content="[]")
+    usage = SimpleNamespace(prompt_tokens=1, completion_tokens=1)
+    response = SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+    return SimpleNamespace(deployments=SimpleNamespace(invoke=lambda key, **kwargs: response))
+
+
+def test_concurrent_runs_record_in_their_own_ledgers():
+    ledgers = [CallLedger(), CallLedger()]
+    start = threading.Barrier(len(ledgers))
+
+    def run(ledger, calls):
+        with ledger_scope(ledger):
+            start.wait()
+            for page in range(calls):
+                invoke_deployment(client(), "test-deployment", metadata={"page-number": page})
+
+    threads = [threading.Thread(target=run, args=(ledger, calls)) for ledger, calls in zip(ledgers, (2, 3))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [len(ledger) for ledger in ledgers] == [2, 3]
+    assert current_ledger() is None
+
+
+def test_calls_outside_a_run_are_not_recorded():
+    ledger = CallLedger()
+    with ledger_scope(ledger):
+        pass
+    invoke_deployment(client(), "test-deployment")
+    assert len(ledger) == 0
@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from scripts import orq_invoke
+from scripts.orq_invoke import (DeploymentPolicy, RetryBudget, invoke_deployment, retry_budget_scope,
+                                submit_in_context, with_retry_budget)
+
+KEY = "test-deployment"
+
+
+class ServiceUnavailable(Exception):
+    status_code = 503
+
+
+class FlakyClient:
+    """Orq client stand-in whose deployment fails with a 503 a number of times before replying."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+        self.deployments = SimpleNamespace(invoke=self.invoke)
+
+    def invoke(self, key, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ServiceUnavailable("service unavailable")
+        message = SimpleNamespace(content="[]")
+        usage = SimpleNamespace(prompt_tokens=1, completion_tokens=1)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setitem(orq_invoke.DEPLOYMENT_POLICIES, KEY,
+                        DeploymentPolicy(max_attempts=5, backoff_initial_s=0, backoff_max_s=0))
+
+
+def test_run_stops_retrying_once_its_budget_is_spent():
+    with retry_budget_scope(RetryBudget(2)):
+        with pytest.raises(ServiceUnavailable):
+            invoke_deployment(FlakyClient(failures=3), KEY)
+
+
+def test_second_run_gets_retries_again(monkeypatch):
+    monkeypatch.setenv("ORQ_RETRY_BUDGET", "2")
+
+    @with_retry_budget
+    def run(client):
+        return invoke_deployment(client, KEY)
+
+    with pytest.raises(ServiceUnavailable):
+        run(FlakyClient(failures=3))
+
+    client = FlakyClient(failures=2)
+    assert run(client).choices[0].message.content == "[]"
+    assert client.calls == 3
+
+
+def test_worker_threads_share_the_run_budget():
+    with retry_budget_scope(RetryBudget(1)) as budget:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            submit_in_context(executor, invoke_deployment, FlakyClient(failures=1), KEY).result()
+        assert budget.remaining == 0
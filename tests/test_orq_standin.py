@@ -0,0 +1,29 @@
+import json
+
+import pandas as pd
+
+from scripts.orq_standin import TABLE_MARKER, synthesize_assets
+from scripts.prompts import render_packed_tables
+
+
+def assets_of(prompt):
+    return json.loads(synthesize_assets(prompt))['assets']
+
+
+def test_packed_prompt_yields_table_rows_tagged_with_their_sheet():
+    first = pd.DataFrame({'Outlet': ['Shower', 'WHB'], 'Room': ['Gym', 'Toilets'], 'Qty': ['1', '3']})
+    second = pd.DataFrame({'Outlet': ['Tap'], 'Room': ['Kitchen'], 'Qty': ['2']})
+    tables = render_packed_tables([('page_1', first.to_csv(index=False)), ('page_2', second.to_csv(index=False))],
+                                  'english')
+
+    assets = assets_of(f"Extract the assets.\n{TABLE_MARKER}\n{tables}")
+
+    assert [(asset['asset_type'], asset['sheet_name']) for asset in assets] == [
+        ('Shower', 'page_1'), ('WHB', 'page_1'), ('Tap', 'page_2')]
+
+
+def test_header_row_is_not_an_asset():
+    table = pd.DataFrame({'Outlet': ['Shower'], 'Room': ['Gym'], 'Qty': ['1']}).to_csv(index=False)
+
+    assert assets_of(f"{TABLE_MARKER}\n{table}") == [
+        {'asset_type': 'Shower', 'asset_location': 'Gym', 'asset_count': '1'}]